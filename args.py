@@ -1,9 +1,46 @@
 import argparse
+import shlex
 import sys
 import os
-from colorama import Fore, Style
+from console import Fore, Style
 
-from start_sorting import start_args_sorting
+from start_sorting import (
+    start_args_converting,
+    start_args_migrating,
+    start_args_plan,
+    start_args_sorting,
+    start_args_undo,
+)
+from conversion import CONVERTER_BACKENDS, default_jobs, make_converter
+from sort import build_plan, build_scanner, source_folders
+from plan import (
+    PAIRED_CONVERSIONS,
+    export_plan,
+    load_plan,
+    plan_destination,
+    plan_sources,
+)
+from registry import GameRegistry
+from journal import JOURNAL_FILENAME, Journal, compact_journal
+from mover import LinkEngine, MoveEngine
+from dedup import dedup_library, duplicate_size
+from thumbnails import build_thumbnails, thumbnails_available
+from layout import LAYOUTS
+from watch import watch
+from profiling import DEFAULT_PROFILE_PATH, RunProfiler, format_report
+
+
+def split_command(value):
+    """
+    Splits a command line into its arguments, keeping the backslashes of the Windows paths.
+
+    Args:
+        value (str): The command line, the arguments containing spaces are quoted.
+
+    Returns:
+        list: The arguments of the command.
+    """
+    return [part.strip("\"'") for part in shlex.split(value, posix=False)]
 
 
 def parse_args():
@@ -14,7 +51,11 @@ def parse_args():
         argparse.Namespace or None: The parsed command line arguments as an argparse.Namespace object if there are any arguments, otherwise None.
     """
     parser = argparse.ArgumentParser(description="Organisateur de fichiers")
-    parser.add_argument("--src", help="Chemin du dossier source")
+    parser.add_argument(
+        "--src",
+        help="Chemin du dossier source, ou de plusieurs dossiers triés ensemble",
+        nargs="+",
+    )
     parser.add_argument("--dst", help="Chemin du dossier de destination")
     parser.add_argument(
         "--convert", help="Convertir les images JXR", action="store_true"
@@ -22,21 +63,279 @@ def parse_args():
     parser.add_argument(
         "--same_folder", help="Trier dans le même dossier", action="store_true"
     )
+    parser.add_argument(
+        "--paired_conversion",
+        help="Conversion des JXR qui ont déjà leur PNG : « convert » comme les autres, « skip » pour ne pas les convertir, « defer » pour les convertir en dernier",
+        choices=PAIRED_CONVERSIONS,
+        default="convert",
+    )
+    parser.add_argument(
+        "--jobs",
+        help="Nombre de conversions JXR en parallèle",
+        type=int,
+        default=default_jobs(),
+    )
+    parser.add_argument(
+        "--converter",
+        help="« process » pour lancer le convertisseur pour chaque image, « worker » pour le garder lancé entre les images",
+        choices=CONVERTER_BACKENDS,
+        default="process",
+    )
+    parser.add_argument(
+        "--converter_command",
+        help='Commande du convertisseur entre guillemets, comme "hdrfix.exe --worker" (par défaut hdrfix.exe), obligatoire avec --converter worker',
+        type=split_command,
+    )
+    parser.add_argument(
+        "--no_registry",
+        help="Ne pas réutiliser les jeux appris lors des tris précédents",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--watch",
+        help="Surveiller le dossier source et trier les captures dès leur arrivée",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--interval",
+        help="Délai en secondes entre deux vérifications en mode surveillance",
+        type=float,
+        default=2.0,
+    )
+    parser.add_argument(
+        "--dry_run",
+        help="Afficher le plan de tri sans déplacer de fichier",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--plan_out", help="Exporter le plan de tri (fichier .json ou .csv)"
+    )
+    parser.add_argument(
+        "--plan_in", help="Exécuter un plan de tri exporté (fichier .json ou .csv)"
+    )
+    parser.add_argument(
+        "--no_conversion_cache",
+        help="Reconvertir les images JXR même si leur conversion est à jour",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache_hash",
+        help="Comparer aussi le contenu des images JXR pour le cache de conversion",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--copy_streams",
+        help="Nombre de copies en parallèle par disque quand la destination est sur un autre disque",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "--verify",
+        help="Vérifier les copies vers un autre disque avant de supprimer les originaux",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--link",
+        help="Créer des liens vers les fichiers au lieu de les déplacer, les originaux restent en place",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--view",
+        help="Créer aussi une vue de liens dans ce dossier, organisée selon LAYOUT (« flat » ou « date »), avec --link",
+        nargs=2,
+        metavar=("LAYOUT", "DOSSIER"),
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--dedup",
+        help="Chercher les doublons des fichiers triés, et les remplacer par des liens avec « link »",
+        choices=["report", "link"],
+    )
+    parser.add_argument(
+        "--thumbnails",
+        help="Créer les miniatures des jeux triés (nécessite Pillow)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--layout",
+        help="Organisation des dossiers des jeux : « flat » ou « date » pour des sous-dossiers AAAA/MM",
+        choices=LAYOUTS,
+        default="flat",
+    )
+    parser.add_argument(
+        "--recursive",
+        help="Trier aussi les images des sous-dossiers du dossier source",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max_depth",
+        help="Nombre maximal de niveaux de sous-dossiers parcourus (implique --recursive)",
+        type=int,
+    )
+    parser.add_argument(
+        "--include",
+        help="Ne trier que les fichiers correspondant à ce motif, par exemple « Halo* » (répétable)",
+        action="append",
+    )
+    parser.add_argument(
+        "--exclude",
+        help="Ignorer les fichiers et dossiers correspondant à ce motif (répétable)",
+        action="append",
+    )
+    parser.add_argument(
+        "--report",
+        help="Écrire un rapport JSON des mesures de chaque étape du tri dans ce fichier",
+    )
+    parser.add_argument(
+        "--prometheus",
+        help="Écrire les mesures du tri dans ce fichier .prom pour le textfile collector de Prometheus",
+    )
+    parser.add_argument(
+        "--profile",
+        help=f"Profiler l'exécution avec cProfile et enregistrer le profil .prof (par défaut {DEFAULT_PROFILE_PATH})",
+        nargs="?",
+        const=DEFAULT_PROFILE_PATH,
+    )
+    parser.add_argument(
+        "--trace_memory",
+        "--trace-memory",
+        help="Suivre les allocations mémoire avec tracemalloc et afficher le pic par module",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no_journal",
+        help="Ne pas enregistrer les déplacements dans le journal de tri",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--undo",
+        help="Annuler les tris enregistrés dans le journal du dossier de destination",
+        action="store_true",
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    convert_parser = subparsers.add_parser(
+        "convert",
+        help="Convertir les images JXR manquantes ou obsolètes d'un dossier déjà trié",
+    )
+    convert_parser.add_argument(
+        "--dst", help="Chemin du dossier déjà trié", required=True
+    )
+    convert_parser.add_argument(
+        "--jobs",
+        help="Nombre de conversions JXR en parallèle",
+        type=int,
+        default=default_jobs(),
+    )
+    convert_parser.add_argument(
+        "--converter",
+        help="« process » pour lancer le convertisseur pour chaque image, « worker » pour le garder lancé entre les images",
+        choices=CONVERTER_BACKENDS,
+        default="process",
+    )
+    convert_parser.add_argument(
+        "--converter_command",
+        help='Commande du convertisseur entre guillemets, comme "hdrfix.exe --worker" (par défaut hdrfix.exe), obligatoire avec --converter worker',
+        type=split_command,
+    )
+    convert_parser.add_argument(
+        "--force", help="Reconvertir toutes les images JXR", action="store_true"
+    )
+    convert_parser.add_argument(
+        "--cache_hash",
+        help="Comparer aussi le contenu des images JXR pour le cache de conversion",
+        action="store_true",
+    )
+    dedup_parser = subparsers.add_parser(
+        "dedup", help="Chercher les captures en double d'un dossier déjà trié"
+    )
+    dedup_parser.add_argument(
+        "--dst", help="Chemin du dossier déjà trié", required=True
+    )
+    dedup_parser.add_argument(
+        "--jobs",
+        help="Nombre de fichiers lus en parallèle",
+        type=int,
+        default=default_jobs(),
+    )
+    dedup_parser.add_argument(
+        "--link",
+        help="Remplacer les doublons par des liens physiques vers l'original",
+        action="store_true",
+    )
+    thumbnails_parser = subparsers.add_parser(
+        "thumbnails",
+        help="Créer les miniatures manquantes ou obsolètes d'un dossier déjà trié (nécessite Pillow)",
+    )
+    thumbnails_parser.add_argument(
+        "--dst", help="Chemin du dossier déjà trié", required=True
+    )
+    thumbnails_parser.add_argument(
+        "--jobs",
+        help="Nombre d'images lues en parallèle",
+        type=int,
+        default=default_jobs(),
+    )
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Réorganiser un dossier déjà trié dans une autre organisation"
+    )
+    migrate_parser.add_argument(
+        "--dst", help="Chemin du dossier déjà trié", required=True
+    )
+    migrate_parser.add_argument(
+        "--layout",
+        help="Nouvelle organisation : « date » pour des sous-dossiers AAAA/MM, « flat » pour les retirer",
+        choices=LAYOUTS,
+        default="date",
+    )
+    migrate_parser.add_argument(
+        "--no_journal",
+        help="Ne pas enregistrer les déplacements dans le journal de tri",
+        action="store_true",
+    )
     return parser.parse_args() if len(sys.argv) > 1 else None
 
 
-def args_sorting(src_folder, dst_folder, do_convert):
+def args_sorting(
+    src_folder,
+    dst_folder,
+    do_convert,
+    jobs=1,
+    dry_run=False,
+    plan_out=None,
+    copy_streams=2,
+    verify=False,
+    **sort_options,
+):
     """
     Starts the sorting operation, only used when the script is run with command line arguments.
 
     Args:
-        src_folder (_type_): _description_
-        dst_folder (_type_): _description_
-        do_convert (_type_): _description_
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
+        dst_folder (str): The path of the destination folder.
+        do_convert (bool): Whether to convert the JXR images to PNG.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        dry_run (bool, optional): Whether to only show the move plan. Defaults to False.
+        plan_out (str, optional): The path of a `.json` or `.csv` file the move plan is exported to.
+        copy_streams (int, optional): The number of parallel copies per device when moving to another device. Defaults to 2.
+        verify (bool, optional): Whether to compare the checksums of the copies before deleting the sources. Defaults to False.
+        **sort_options: The other keyword arguments of `sort_files`.
     """
-    if not os.path.exists(src_folder):
+    missing = [
+        folder for folder in source_folders(src_folder) if not os.path.exists(folder)
+    ]
+    if missing and isinstance(src_folder, str):
         print(Fore.RED + "Erreur ❌ Le dossier source n'existe pas." + Style.RESET_ALL)
         return
+    if missing:
+        print(
+            Fore.RED
+            + f"Erreur ❌ Ces dossiers sources n'existent pas : {', '.join(missing)}"
+            + Style.RESET_ALL
+        )
+        return
 
     if not os.path.exists(dst_folder):
         print(
@@ -46,15 +345,14 @@ def args_sorting(src_folder, dst_folder, do_convert):
         )
         return
 
-    file_list = [
-        entry
-        for entry in os.scandir(src_folder)
-        if entry.is_file()
-        and not entry.name.startswith(".")
-        and entry.name != "desktop.ini"
-    ]
-    total_files = len(file_list)
-    if total_files == 0:
+    scan = build_scanner(
+        src_folder,
+        dst_folder,
+        sort_options.get("include"),
+        sort_options.get("exclude"),
+        sort_options.get("max_depth", 0),
+    )
+    if next(scan(), None) is None:
         print(
             Fore.RED
             + "Erreur ❌ Le dossier source ne contient pas d'images à trier."
@@ -62,25 +360,656 @@ def args_sorting(src_folder, dst_folder, do_convert):
         )
         return
 
-    print(Fore.YELLOW + "Tri en cours..." + Style.RESET_ALL)
+    mover = (
+        LinkEngine() if sort_options.get("link") else MoveEngine(copy_streams, verify)
+    )
+    try:
+        if dry_run or plan_out:
+            args_planning(
+                src_folder,
+                dst_folder,
+                do_convert,
+                jobs,
+                dry_run,
+                plan_out,
+                sort_options.get("use_registry", True),
+                sort_options.get("use_journal", True),
+                mover,
+                sort_options.get("layout", "flat"),
+                scan,
+                sort_options.get("paired_conversion", "convert"),
+                sort_options.get("converter"),
+                sort_options.get("use_conversion_cache", True),
+                sort_options.get("cache_hash", False),
+            )
+            return
+
+        print(Fore.YELLOW + "Tri en cours..." + Style.RESET_ALL)
 
-    start_args_sorting(
+        duplicates = []
+        thumbnails = []
+        failures = start_args_sorting(
+            src_folder,
+            dst_folder,
+            do_convert,
+            jobs,
+            mover=mover,
+            on_duplicates=lambda groups, freed: duplicates.append((groups, freed)),
+            on_thumbnails=thumbnails.append,
+            **sort_options,
+        )
+    finally:
+        mover.close()
+    print_conversion_failures(failures)
+    print_copy_throughput(mover)
+    print_links(mover)
+    for groups, freed in duplicates:
+        print_duplicates(groups, freed, sort_options.get("dedup") == "link")
+    for result in thumbnails:
+        print_thumbnails(result)
+    for path in (sort_options.get("report_path"), sort_options.get("prometheus_path")):
+        if path:
+            print(Fore.GREEN + f"Rapport de tri écrit : {path}" + Style.RESET_ALL)
+    print(Fore.GREEN + "Le tri des fichiers est terminé !" + Style.RESET_ALL)
+
+
+def args_planning(
+    src_folder,
+    dst_folder,
+    do_convert,
+    jobs,
+    dry_run,
+    plan_out,
+    use_registry=True,
+    use_journal=True,
+    mover=None,
+    layout="flat",
+    scan=None,
+    paired_conversion="convert",
+    converter=None,
+    use_conversion_cache=True,
+    cache_hash=False,
+):
+    """
+    Builds the move plan of the source folders, then exports, shows or executes it.
+
+    Args:
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
+        dst_folder (str): The path of the destination folder.
+        do_convert (bool): Whether to convert the JXR images to PNG.
+        jobs (int): The number of conversions to run at the same time.
+        dry_run (bool): Whether to only show or export the plan.
+        plan_out (str or None): The path of a `.json` or `.csv` file the plan is exported to.
+        use_registry (bool, optional): Whether to reuse the games learned by the previous runs. Defaults to True.
+        use_journal (bool, optional): Whether to record the moves and conversions, so they can be undone. Defaults to True.
+        mover (MoveEngine, optional): Copies the files changing device in the background.
+        layout (str, optional): "flat", or "date" to add `YYYY/MM` subfolders. Defaults to "flat".
+        scan (function, optional): Returns a new iterator over the files to sort, see `build_scanner`.
+        paired_conversion (str, optional): "skip" to not convert the JXR of the captures with an acceptable PNG.
+            Defaults to "convert", a deferred conversion is planned like the others.
+        converter (ProcessConverter or WorkerConverter, optional): Converts the JXR images, `hdrfix.exe` if `None`.
+        use_conversion_cache (bool, optional): Whether to skip the conversions that are still up to date. Defaults to True.
+        cache_hash (bool, optional): Whether the conversion cache also compares the content of the JXR files. Defaults to False.
+    """
+    registry = GameRegistry.load(dst_folder) if use_registry else None
+    plan = build_plan(
         src_folder,
         dst_folder,
         do_convert,
-        total_files,
-        file_list,
+        registry=registry,
+        layout=layout,
+        scan=scan,
+        paired_conversion=paired_conversion,
     )
+
+    if plan_out:
+        export_plan(plan, plan_out)
+        print(Fore.GREEN + f"Plan de tri exporté : {plan_out}" + Style.RESET_ALL)
+    elif dry_run:
+        for item in plan:
+            conversion = f" (+ {item.conv_path})" if item.conv_path else ""
+            print(f"{item.src_path} -> {item.dst_path}{conversion}")
+
+    if dry_run:
+        games = len({item.game_name for item in plan})
+        print(
+            Fore.YELLOW
+            + f"{len(plan)} fichier(s) à trier dans {games} jeu(x), aucun fichier déplacé."
+            + Style.RESET_ALL
+        )
+        return
+
+    journal = Journal.open(dst_folder) if use_journal else None
+    if journal is not None:
+        journal.begin(src_folder, dst_folder)
+    try:
+        args_execute_plan(
+            plan,
+            jobs,
+            journal,
+            mover,
+            converter,
+            dst_folder,
+            use_conversion_cache,
+            cache_hash,
+            use_journal,
+        )
+    finally:
+        if journal is not None:
+            journal.end()
+            journal.close()
+    if registry is not None:
+        registry.save()
+
+
+def args_execute_plan(
+    plan,
+    jobs=1,
+    journal=None,
+    mover=None,
+    converter=None,
+    dst_folder=None,
+    use_conversion_cache=True,
+    cache_hash=False,
+    use_journal=True,
+):
+    """
+    Executes a move plan, loaded from a file if `plan` is a path.
+
+    Args:
+        plan (list or str): The `PlanItem` of the plan, or the path of an exported plan.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        journal (Journal, optional): Records every move and conversion, the journal of the destination
+            folder is opened if `None`.
+        mover (MoveEngine, optional): Copies the files changing device in the background,
+            a new one is used if `None`.
+        converter (ProcessConverter or WorkerConverter, optional): Converts the JXR images, `hdrfix.exe` if `None`.
+        dst_folder (str, optional): The path of the destination folder, found from the plan if `None`.
+        use_conversion_cache (bool, optional): Whether to skip the conversions that are still up to date. Defaults to True.
+        cache_hash (bool, optional): Whether the conversion cache also compares the content of the JXR files. Defaults to False.
+        use_journal (bool, optional): Whether to record the moves and conversions when no `journal` is given,
+            so the operation can be resumed or undone. Defaults to True.
+    """
+    if isinstance(plan, str):
+        try:
+            plan = load_plan(plan)
+        except (OSError, ValueError, KeyError) as error:
+            print(
+                Fore.RED
+                + f"Erreur ❌ Le plan de tri ne peut pas être lu : {error}"
+                + Style.RESET_ALL
+            )
+            return
+
+    dst_folder = dst_folder or plan_destination(plan)
+    if dst_folder is None:
+        print(Fore.RED + "Erreur ❌ Le plan de tri est vide." + Style.RESET_ALL)
+        return
+
+    print(Fore.YELLOW + "Tri en cours..." + Style.RESET_ALL)
+    own_journal = journal is None and use_journal
+    if own_journal:
+        os.makedirs(dst_folder, exist_ok=True)
+        journal = Journal.open(dst_folder)
+        journal.begin(plan_sources(plan), dst_folder)
+    own_mover = mover is None
+    if own_mover:
+        mover = MoveEngine()
+    status = "failed"
+    try:
+        failures = start_args_plan(
+            plan,
+            jobs,
+            journal,
+            mover,
+            converter,
+            dst_folder,
+            use_conversion_cache,
+            cache_hash,
+        )
+        status = "done"
+    finally:
+        if own_mover:
+            mover.close()
+        if own_journal:
+            journal.end(status)
+            journal.close()
+            if status == "done":
+                compact_journal(journal.path)
+    print_conversion_failures(failures)
+    print_copy_throughput(mover)
+    print_links(mover)
     print(Fore.GREEN + "Le tri des fichiers est terminé !" + Style.RESET_ALL)
 
 
+def args_converting(dst_folder, jobs=1, force=False, cache_hash=False, converter=None):
+    """
+    Converts the missing or out of date JXR conversions of an already sorted folder.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        force (bool, optional): Whether to convert every JXR image. Defaults to False.
+        cache_hash (bool, optional): Whether to also compare the content of the JXR images. Defaults to False.
+        converter (ProcessConverter or WorkerConverter, optional): Converts the JXR images, `hdrfix.exe` if `None`.
+    """
+    if not os.path.isdir(dst_folder):
+        print(
+            Fore.RED
+            + "Erreur ❌ Le dossier de destination n'existe pas."
+            + Style.RESET_ALL
+        )
+        return
+
+    print(Fore.YELLOW + "Conversion en cours..." + Style.RESET_ALL)
+    failures, skipped = start_args_converting(
+        dst_folder, jobs, force, cache_hash, converter
+    )
+    print_conversion_failures(failures)
+    print(
+        Fore.GREEN
+        + f"La conversion est terminée ! ({skipped} image(s) déjà à jour)"
+        + Style.RESET_ALL
+    )
+
+
+def args_dedup(dst_folder, jobs=1, link=False):
+    """
+    Finds the duplicate captures of an already sorted folder, and replaces them by hardlinks if asked.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        jobs (int, optional): The number of files read at the same time. Defaults to 1.
+        link (bool, optional): Whether to replace the duplicates by hardlinks. Defaults to False.
+    """
+    if not os.path.isdir(dst_folder):
+        print(
+            Fore.RED
+            + "Erreur ❌ Le dossier de destination n'existe pas."
+            + Style.RESET_ALL
+        )
+        return
+
+    print(Fore.YELLOW + "Recherche des doublons..." + Style.RESET_ALL)
+    groups, (freed, failed) = dedup_library(dst_folder, jobs, link)
+    print_duplicates(groups, freed, link)
+    for path in failed:
+        print(Fore.RED + f"  - {path} n'a pas pu être remplacé" + Style.RESET_ALL)
+
+
+def print_duplicates(groups, freed, link=False):
+    """
+    Prints the duplicate captures and the space they take.
+
+    Args:
+        groups (list): The `DuplicateGroup` of every set of identical files.
+        freed (int): The number of bytes freed by the hardlinks.
+        link (bool, optional): Whether the duplicates were replaced by hardlinks. Defaults to False.
+    """
+    if not groups:
+        print(Fore.GREEN + "Aucun doublon trouvé." + Style.RESET_ALL)
+        return
+
+    for group in groups:
+        print(f"  - {group.paths[0]}")
+        for path in group.paths[1:]:
+            print(f"    = {path}")
+    if link:
+        print(
+            Fore.GREEN
+            + f"{len(groups)} groupe(s) de doublons remplacés par des liens, "
+            + f"{freed / (1024 * 1024):.1f} Mo libérés."
+            + Style.RESET_ALL
+        )
+    else:
+        print(
+            Fore.YELLOW
+            + f"{len(groups)} groupe(s) de doublons, "
+            + f"{duplicate_size(groups) / (1024 * 1024):.1f} Mo récupérables."
+            + Style.RESET_ALL
+        )
+
+
+def args_thumbnails(dst_folder, jobs=1):
+    """
+    Builds the missing or out of date thumbnails of an already sorted folder.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        jobs (int, optional): The number of images read at the same time. Defaults to 1.
+    """
+    if not os.path.isdir(dst_folder):
+        print(
+            Fore.RED
+            + "Erreur ❌ Le dossier de destination n'existe pas."
+            + Style.RESET_ALL
+        )
+        return
+
+    print(Fore.YELLOW + "Création des miniatures..." + Style.RESET_ALL)
+    print_thumbnails(build_thumbnails(dst_folder, jobs))
+
+
+def print_thumbnails(result):
+    """
+    Prints the number of built thumbnails and the images that could not be read.
+
+    Args:
+        result (ThumbnailResult): The result of `build_thumbnails`.
+    """
+    for path, message in result.failures:
+        print(Fore.RED + f"  - {path} {message}" + Style.RESET_ALL)
+    print(
+        Fore.GREEN
+        + f"{result.made} miniature(s) créée(s), {result.reused} déjà à jour."
+        + Style.RESET_ALL
+    )
+
+
+def args_migrating(dst_folder, layout="date", use_journal=True):
+    """
+    Moves the captures of an already sorted folder to another layout.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        layout (str, optional): "date" for `YYYY/MM` subfolders, "flat" to remove them. Defaults to "date".
+        use_journal (bool, optional): Whether to record the moves, so they can be undone. Defaults to True.
+    """
+    if not os.path.isdir(dst_folder):
+        print(
+            Fore.RED
+            + "Erreur ❌ Le dossier de destination n'existe pas."
+            + Style.RESET_ALL
+        )
+        return
+
+    print(Fore.YELLOW + "Réorganisation en cours..." + Style.RESET_ALL)
+    journal = Journal.open(dst_folder) if use_journal else None
+    if journal is not None:
+        journal.begin(dst_folder, dst_folder)
+    status = "failed"
+    try:
+        moved, skipped = start_args_migrating(dst_folder, layout, journal)
+        status = "done"
+    finally:
+        if journal is not None:
+            journal.end(status)
+            journal.close()
+
+    for src_path, dst_path in skipped:
+        print(Fore.RED + f"  - {src_path} -> {dst_path}" + Style.RESET_ALL)
+    if skipped:
+        print(
+            Fore.RED
+            + f"Erreur ❌ {len(skipped)} fichier(s) n'ont pas pu être déplacés."
+            + Style.RESET_ALL
+        )
+    print(Fore.GREEN + f"{moved} fichier(s) déplacé(s)." + Style.RESET_ALL)
+
+
+def args_undo(dst_folder):
+    """
+    Puts back the files moved by the sorting operations recorded in the journal of a destination folder.
+
+    Args:
+        dst_folder (str): The path of the destination folder.
+    """
+    if not os.path.exists(os.path.join(dst_folder, JOURNAL_FILENAME)):
+        print(
+            Fore.RED
+            + "Erreur ❌ Aucun journal de tri dans le dossier de destination."
+            + Style.RESET_ALL
+        )
+        return
+
+    restored, skipped = start_args_undo(dst_folder)
+    for src_path, dst_path in skipped:
+        print(Fore.RED + f"  - {dst_path} -> {src_path}" + Style.RESET_ALL)
+    if skipped:
+        print(
+            Fore.RED
+            + f"Erreur ❌ {len(skipped)} fichier(s) n'ont pas pu être restaurés, le journal est conservé."
+            + Style.RESET_ALL
+        )
+    print(Fore.GREEN + f"{restored} fichier(s) restauré(s)." + Style.RESET_ALL)
+
+
+def print_conversion_failures(failures):
+    """
+    Prints the conversions that did not succeed.
+
+    Args:
+        failures (list): The `ConversionFailure` of every failed conversion.
+    """
+    if not failures:
+        return
+
+    print(
+        Fore.RED
+        + f"Erreur ❌ {len(failures)} conversion(s) JXR ont échoué :"
+        + Style.RESET_ALL
+    )
+    for failure in failures:
+        code = "?" if failure.returncode is None else failure.returncode
+        print(f"  - {failure.src_path} (code {code}) {failure.message}")
+
+
+def print_copy_throughput(mover):
+    """
+    Prints the amount of data copied to another device and its speed.
+
+    Args:
+        mover (MoveEngine): The move engine of the sorting operation.
+    """
+    if not mover.copied_files:
+        return
+
+    print(
+        Fore.YELLOW
+        + f"{mover.copied_files} fichier(s) copié(s) vers un autre disque : "
+        + f"{mover.copied_bytes / (1024 * 1024):.1f} Mo à {mover.throughput():.1f} Mo/s"
+        + Style.RESET_ALL
+    )
+
+
+def print_links(mover):
+    """
+    Prints the number of links created instead of moving the files.
+
+    Args:
+        mover (MoveEngine): The move engine of the sorting operation.
+    """
+    if not isinstance(mover, LinkEngine):
+        return
+
+    print(
+        Fore.YELLOW
+        + f"{mover.hardlinks} lien(s) physique(s) et {mover.symlinks} lien(s) symbolique(s) créé(s), "
+        + "les fichiers sources n'ont pas été déplacés."
+        + Style.RESET_ALL
+    )
+
+
+def args_watching(src_folder, dst_folder, do_convert, jobs=1, interval=2.0, **options):
+    """
+    Sorts the captures of the source folder as they arrive, until the user presses Ctrl+C.
+
+    Args:
+        src_folder (str): The path of the source folder.
+        dst_folder (str): The path of the destination folder.
+        do_convert (bool): Whether to convert the JXR images to PNG.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        interval (float, optional): The delay between two checks, in seconds. Defaults to 2.
+        **options: The other keyword arguments of `watch`.
+    """
+    if not os.path.isdir(src_folder) or not os.path.isdir(dst_folder):
+        print(
+            Fore.RED
+            + "Erreur ❌ Les dossiers source et de destination doivent exister."
+            + Style.RESET_ALL
+        )
+        return
+
+    def on_batch(count, error):
+        if error:
+            print(Fore.RED + f"Erreur ❌ {error}" + Style.RESET_ALL)
+        else:
+            print(Fore.GREEN + f"{count} fichier(s) trié(s)" + Style.RESET_ALL)
+
+    print(
+        Fore.YELLOW
+        + "Surveillance du dossier source... (Ctrl+C pour arrêter)"
+        + Style.RESET_ALL
+    )
+    # Ctrl+C stops `watch` itself, which still returns the failed conversions.
+    failures = watch(
+        src_folder,
+        dst_folder,
+        do_convert,
+        jobs,
+        interval=interval,
+        on_batch=on_batch,
+        on_thumbnails=print_thumbnails,
+        **options,
+    )
+    print_conversion_failures(failures)
+    print(Fore.GREEN + "Surveillance arrêtée." + Style.RESET_ALL)
+
+
+def print_profile(report):
+    """
+    Prints the hotspots and the memory peak of a profiled run.
+
+    Args:
+        report (ProfileReport): The report of the `RunProfiler`.
+    """
+    print(Fore.YELLOW + "Profil de l'exécution :" + Style.RESET_ALL)
+    for line in format_report(report):
+        print(line)
+
+
 def check_args(args):
     """
     Checks if the command line arguments are valid and starts the sorting operation if they are.
 
+    With `--profile` or `--trace_memory`, the whole operation runs under a `RunProfiler`.
+
     Args:
         args (argparse.Namespace): The parsed command line arguments.
     """
+    if not (args.profile or args.trace_memory):
+        run_args(args)
+        return
+
+    profiler = RunProfiler(args.profile, args.trace_memory)
+    with profiler:
+        run_args(args)
+    print_profile(profiler.report())
+
+
+def run_args(args):
+    """
+    Checks the command line arguments and starts the operation they ask for.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    if args.jobs < 1:
+        print(
+            Fore.RED
+            + "Erreur ❌ Le nombre de conversions en parallèle doit être au moins 1."
+            + Style.RESET_ALL
+        )
+        return
+
+    if args.command != "convert" and args.copy_streams < 1:
+        print(
+            Fore.RED
+            + "Erreur ❌ Le nombre de copies en parallèle doit être au moins 1."
+            + Style.RESET_ALL
+        )
+        return
+
+    try:
+        converter = make_converter(args.converter, args.converter_command)
+    except ValueError as error:
+        print(Fore.RED + f"Erreur ❌ {error}." + Style.RESET_ALL)
+        return
+
+    if args.command == "convert":
+        args_converting(args.dst, args.jobs, args.force, args.cache_hash, converter)
+        return
+
+    if args.command == "dedup":
+        args_dedup(args.dst, args.jobs, args.link)
+        return
+
+    if args.command == "migrate":
+        args_migrating(args.dst, args.layout, not args.no_journal)
+        return
+
+    if (args.command == "thumbnails" or args.thumbnails) and not thumbnails_available():
+        print(
+            Fore.RED
+            + "Erreur ❌ Pillow doit être installé pour créer les miniatures (pip install Pillow)."
+            + Style.RESET_ALL
+        )
+        return
+
+    if args.command == "thumbnails":
+        args_thumbnails(args.dst, args.jobs)
+        return
+
+    if args.plan_in:
+        mover = (
+            LinkEngine() if args.link else MoveEngine(args.copy_streams, args.verify)
+        )
+        try:
+            args_execute_plan(
+                args.plan_in,
+                args.jobs,
+                mover=mover,
+                converter=converter,
+                use_conversion_cache=not args.no_conversion_cache,
+                cache_hash=args.cache_hash,
+                use_journal=not args.no_journal,
+            )
+        finally:
+            mover.close()
+        return
+
+    if args.src and len(args.src) > 1 and (args.same_folder or args.watch):
+        print(
+            Fore.RED
+            + "Erreur ❌ --same_folder et --watch n'acceptent qu'un seul dossier source."
+            + Style.RESET_ALL
+        )
+        return
+    if args.link and args.watch:
+        print(
+            Fore.RED
+            + "Erreur ❌ --link ne peut pas être utilisé avec --watch, les captures resteraient à trier."
+            + Style.RESET_ALL
+        )
+        return
+    if args.view and not args.link:
+        print(Fore.RED + "Erreur ❌ --view nécessite --link." + Style.RESET_ALL)
+        return
+    if args.view and (args.dry_run or args.plan_out):
+        print(
+            Fore.RED
+            + "Erreur ❌ --view ne peut pas être utilisé avec --dry_run ou --plan_out."
+            + Style.RESET_ALL
+        )
+        return
+    for view_layout, _ in args.view:
+        if view_layout not in LAYOUTS:
+            print(
+                Fore.RED
+                + f"Erreur ❌ Organisation de vue inconnue : {view_layout} (« flat » ou « date »)."
+                + Style.RESET_ALL
+            )
+            return
     if args.same_folder:
         if args.dst:
             print(
@@ -89,7 +1018,7 @@ def check_args(args):
                 + Style.RESET_ALL
             )
         if args.src:
-            args.dst = args.src
+            args.dst = args.src[0]
         else:
             print(
                 Fore.RED
@@ -102,8 +1031,55 @@ def check_args(args):
                 + Style.RESET_ALL
             )
             return
+    if args.undo:
+        if args.dst:
+            args_undo(args.dst)
+        else:
+            print(
+                Fore.RED
+                + "Erreur ❌ Le chemin du dossier de destination doit être fourni."
+                + Style.RESET_ALL
+            )
+        return
+    if args.max_depth is not None and args.max_depth < 0:
+        print(
+            Fore.RED
+            + "Erreur ❌ La profondeur maximale ne peut pas être négative."
+            + Style.RESET_ALL
+        )
+        return
     if args.src and args.dst:
-        args_sorting(args.src, args.dst, args.convert)
+        sorting = args_watching if args.watch else args_sorting
+        options = {
+            "use_registry": not args.no_registry,
+            "use_conversion_cache": not args.no_conversion_cache,
+            "cache_hash": args.cache_hash,
+            "use_journal": not args.no_journal,
+            "copy_streams": args.copy_streams,
+            "verify": args.verify,
+            "dedup": args.dedup,
+            "thumbnails": args.thumbnails,
+            "layout": args.layout,
+            "paired_conversion": args.paired_conversion,
+            "converter": converter,
+            "link": args.link,
+            "views": [tuple(view) for view in args.view],
+            "include": args.include,
+            "exclude": args.exclude,
+            "max_depth": (
+                args.max_depth
+                if args.max_depth is not None
+                else None if args.recursive else 0
+            ),
+            "report_path": args.report,
+            "prometheus_path": args.prometheus,
+        }
+        if args.watch:
+            options["interval"] = args.interval
+        else:
+            options.update(dry_run=args.dry_run, plan_out=args.plan_out)
+        src = args.src[0] if len(args.src) == 1 else args.src
+        sorting(src, args.dst, args.convert, args.jobs, **options)
     else:
         print(
             Fore.RED
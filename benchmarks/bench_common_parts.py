@@ -0,0 +1,68 @@
+"""
+Benchmark of `common_filename_part` on synthetic Game Bar file names.
+
+Usage: python -m benchmarks.bench_common_parts [--sizes 1000 10000 100000 1000000] [--legacy-max 20000]
+"""
+
+import argparse
+import os
+import re
+import time
+from collections import Counter
+
+from benchmarks.library import generate_names
+from game_names import clean_filename, common_filename_part
+
+def legacy_common_filename_part(files):
+    """
+    The previous quadratic implementation, kept to compare the timings.
+
+    Args:
+        files (list): The names of the files.
+
+    Returns:
+        list: The common parts of the names.
+    """
+    counter = Counter(
+        [
+            re.match(r"(.*?\D)\d", f).group(1).strip()
+            for f in files
+            if re.match(r"(.*?\D)\d", f)
+        ]
+    )
+    common_parts = []
+    for s in [s for s in counter.keys() if counter[s] > 2]:
+        matches = [f for f in files if f.startswith(s)]
+        common_part = os.path.commonprefix(matches).rsplit(" ", 1)[0].strip()
+        common_parts.append(clean_filename(common_part))
+    return common_parts
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000]
+    )
+    parser.add_argument("--legacy-max", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'names':>10} {'clusters':>9} {'new (s)':>10} {'legacy (s)':>11}")
+    for size in args.sizes:
+        names = generate_names(size)
+        parts, elapsed = timed(common_filename_part, names)
+        legacy = "-"
+        if size <= args.legacy_max:
+            legacy_parts, legacy_elapsed = timed(legacy_common_filename_part, names)
+            assert sorted(set(legacy_parts)) == sorted(parts)
+            legacy = f"{legacy_elapsed:.3f}"
+        print(f"{size:>10} {len(parts):>9} {elapsed:>10.3f} {legacy:>11}")
+
+
+if __name__ == "__main__":
+    main()
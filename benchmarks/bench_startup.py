@@ -0,0 +1,85 @@
+"""
+Benchmark of the startup time of a headless command line run, as started by a scheduled task.
+
+Usage: python -m benchmarks.bench_startup [--repeat 20]
+
+The command line exits right after its checks, with a missing source folder, so only the startup is
+timed. It is compared to the same run importing the gui first, like `main.py` used to do.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MISSING_FOLDER = os.path.join(ROOT, "missing-benchmark-folder")
+CLI_ARGS = ["--src", MISSING_FOLDER, "--dst", MISSING_FOLDER]
+HEAVY_MODULES = ("tkinter", "ttkthemes", "colorama", "tqdm", "PIL")
+RUN_MAIN = (
+    "import runpy, sys; sys.argv = ['main.py'] + sys.argv[1:]; "
+    "runpy.run_path('main.py', run_name='__main__')"
+)
+CHECK_MODULES = (
+    f"; print('modules:', *[m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+)
+COMMANDS = {
+    "headless": [sys.executable, "main.py"] + CLI_ARGS,
+    "with gui import": [sys.executable, "-c", "import gui; " + RUN_MAIN] + CLI_ARGS,
+}
+
+
+def time_command(command, repeat):
+    """
+    Runs a command several times, with its output redirected like a scheduled task.
+
+    Args:
+        command (list): The command.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The median time in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def loaded_modules(command):
+    """
+    Returns the heavy modules imported by a command.
+
+    Args:
+        command (list): A command of `COMMANDS`.
+
+    Returns:
+        str: The names of the imported modules of `HEAVY_MODULES`.
+    """
+    if command[1] == "main.py":
+        command = [command[0], "-c", RUN_MAIN] + command[2:]
+    command = command[:2] + [command[2] + CHECK_MODULES] + command[3:]
+    result = subprocess.run(
+        command, cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return result.stdout.rsplit("modules:", 1)[-1].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'run':<18} {'median (s)':>10}  heavy modules")
+    for name, command in COMMANDS.items():
+        elapsed = time_command(command, args.repeat)
+        modules = loaded_modules(command) or "-"
+        print(f"{name:<18} {elapsed:>10.3f}  {modules}")
+
+
+if __name__ == "__main__":
+    main()
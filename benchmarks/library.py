@@ -0,0 +1,143 @@
+"""
+Generator of synthetic capture libraries, laid out like an Xbox Game Bar capture folder.
+
+Usage: python -m benchmarks.library FOLDER [--count 10000] [--games 300] [--payload sparse] [--steam 0.1]
+"""
+
+import argparse
+import os
+import random
+
+TITLE_WORDS = (
+    "Star Wars Jedi Survivor Halo Infinite Forza Horizon Cyberpunk Elden Ring Skull And "
+    "Bones Avatar Frontiers of Pandora Red Dead Redemption Assassin's Creed Valhalla Mirage "
+    "Starfield Baldur's Gate Hogwarts Legacy Diablo Sea Thieves Minecraft Legends Ghost "
+    "Tsushima Spider Man Final Fantasy Rebirth Dragon Dogma Alan Wake Control Hitman"
+).split()
+# Typical sizes of a 4K HDR capture, used for the sparse payloads.
+PAYLOAD_SIZES = {"png": 12 * 1024 * 1024, "jxr": 8 * 1024 * 1024}
+SMALL_PAYLOAD_SIZE = 4096
+PAYLOADS = ("empty", "small", "sparse")
+
+
+def game_titles(games, rng):
+    """
+    Makes up distinct game titles from common title words.
+
+    Args:
+        games (int): The number of titles.
+        rng (random.Random): The random generator.
+
+    Returns:
+        list: The sorted titles.
+    """
+    titles = set()
+    while len(titles) < games:
+        titles.add(" ".join(rng.sample(TITLE_WORDS, rng.randint(2, 4))))
+    return sorted(titles)
+
+
+def timestamp(rng):
+    return (
+        f"{rng.randint(1, 28):02d}_{rng.randint(1, 12):02d}_{rng.randint(2019, 2024)} "
+        f"{rng.randint(0, 23):02d}_{rng.randint(0, 59):02d}_{rng.randint(0, 59):02d}"
+    )
+
+
+def generate_names(count, games=300, seed=42, steam=0.0):
+    """
+    Generates capture names, by PNG and JXR pairs.
+
+    The games follow a Zipf distribution, like a real library where a few games hold most of the
+    captures. With `steam`, part of the captures get the `APPID_YYYYMMDDhhmmss_N.png` names of the
+    uncompressed Steam screenshots instead.
+
+    Args:
+        count (int): The number of names to generate.
+        games (int, optional): The number of different games. Defaults to 300.
+        seed (int, optional): The seed of the random generator. Defaults to 42.
+        steam (float, optional): The share of Steam screenshots, between 0 and 1. Defaults to 0.
+
+    Returns:
+        list: The generated names, half PNG and half JXR for the Game Bar captures.
+    """
+    rng = random.Random(seed)
+    titles = game_titles(games, rng)
+    app_ids = [rng.randint(200000, 2500000) for _ in titles]
+    weights = [1 / (rank + 1) for rank in range(games)]
+    names = []
+    for index in rng.choices(range(games), weights, k=count):
+        if len(names) >= count:
+            break
+        if rng.random() < steam:
+            names.append(
+                f"{app_ids[index]}_{rng.randint(2019, 2024)}{rng.randint(1, 12):02d}"
+                f"{rng.randint(1, 28):02d}{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}"
+                f"{rng.randint(0, 59):02d}_1.png"
+            )
+            continue
+        stamp = timestamp(rng)
+        names.append(f"{titles[index]} {stamp}.png")
+        names.append(f"{titles[index]} {stamp}.jxr")
+    return names[:count]
+
+
+def write_payload(path, payload):
+    """
+    Writes the content of a generated capture.
+
+    Args:
+        path (str): The path of the file.
+        payload (str): "empty", "small" for a few random bytes, or "sparse" for a sparse file of the
+            size of a real capture, which takes no disk space on most filesystems.
+    """
+    with open(path, "wb") as file:
+        if payload == "small":
+            file.write(os.urandom(SMALL_PAYLOAD_SIZE))
+        elif payload == "sparse":
+            file.truncate(PAYLOAD_SIZES.get(path.rsplit(".", 1)[-1], SMALL_PAYLOAD_SIZE))
+
+
+def generate_library(
+    folder, count, games=300, payload="empty", seed=42, steam=0.0, names=None
+):
+    """
+    Creates a capture folder with `count` generated captures.
+
+    Args:
+        folder (str): The path of the folder, created if needed.
+        count (int): The number of files.
+        games (int, optional): The number of different games. Defaults to 300.
+        payload (str, optional): "empty", "small" or "sparse", see `write_payload`. Defaults to "empty".
+        seed (int, optional): The seed of the random generator. Defaults to 42.
+        steam (float, optional): The share of Steam screenshots, between 0 and 1. Defaults to 0.
+        names (list, optional): The names of the files, generated if `None`.
+
+    Returns:
+        list: The names of the created files.
+    """
+    os.makedirs(folder, exist_ok=True)
+    names = names or generate_names(count, games, seed, steam)
+    for name in names:
+        write_payload(os.path.join(folder, name), payload)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("folder")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--payload", choices=PAYLOADS, default="sparse")
+    parser.add_argument("--steam", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    names = generate_library(
+        args.folder, args.count, args.games, args.payload, args.seed, args.steam
+    )
+    print(f"{len(names)} captures created in {args.folder}")
+
+
+if __name__ == "__main__":
+    main()
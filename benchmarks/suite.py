@@ -0,0 +1,184 @@
+"""
+Benchmark suite of the sorting steps, compared to stored baselines.
+
+Usage: python -m benchmarks.suite [--sizes 1000 10000] [--only NAME ...] [--threshold 0.25] [--update]
+
+Exits with code 1 when a benchmark is slower than its baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.library import generate_library, generate_names
+from folders import create_folder_structure
+from game_names import clean_filename, common_filename_part, find_game_name
+from sort import sort_files
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+STUB_CONVERTER = [
+    sys.executable,
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "hdrfix_stub.py"),
+]
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_THRESHOLD = 0.25
+# The end-to-end sort creates real files, bigger libraries are left to `--sizes`.
+SORT_MAX_SIZE = 10000
+
+
+def bench_clean_filename(names, folder):
+    for name in names:
+        clean_filename(name)
+
+
+def bench_common_filename_part(names, folder):
+    common_filename_part(names)
+
+
+def bench_find_game_name(names, folder):
+    common_parts = common_filename_part(names)
+    for name in names:
+        find_game_name(name, common_parts)
+
+
+def bench_create_folder_structure(names, folder):
+    common_parts = common_filename_part(names)
+    for name in names:
+        create_folder_structure(
+            folder, find_game_name(name, common_parts), name.rsplit(".", 1)[-1]
+        )
+
+
+def bench_sort_files(names, folder):
+    src_folder = os.path.join(folder, "src")
+    dst_folder = os.path.join(folder, "dst")
+    generate_library(src_folder, len(names), names=names)
+    os.makedirs(dst_folder)
+    start = time.perf_counter()
+    sort_files(
+        src_folder,
+        dst_folder,
+        True,
+        lambda *args: None,
+        jobs=os.cpu_count() or 1,
+        converter=STUB_CONVERTER,
+    )
+    return time.perf_counter() - start
+
+
+BENCHMARKS = {
+    "clean_filename": bench_clean_filename,
+    "common_filename_part": bench_common_filename_part,
+    "find_game_name": bench_find_game_name,
+    "create_folder_structure": bench_create_folder_structure,
+    "sort_files": bench_sort_files,
+}
+
+
+def run_benchmark(name, size, repeat=3, seed=42):
+    """
+    Runs a benchmark on generated names and keeps the best time.
+
+    Each run gets a new temporary folder, so the files of a run do not slow the next one.
+
+    Args:
+        name (str): The name of the benchmark, a key of `BENCHMARKS`.
+        size (int): The number of capture names.
+        repeat (int, optional): The number of runs. Defaults to 3.
+        seed (int, optional): The seed of the generated names. Defaults to 42.
+
+    Returns:
+        float: The best time in seconds.
+    """
+    names = generate_names(size, seed=seed, steam=0.05)
+    timings = []
+    for _ in range(repeat):
+        folder = tempfile.mkdtemp(prefix="bench_")
+        try:
+            start = time.perf_counter()
+            # The benchmarks with a setup return their own timing.
+            elapsed = BENCHMARKS[name](names, folder)
+            timings.append(
+                elapsed if elapsed is not None else time.perf_counter() - start
+            )
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return min(timings)
+
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(baselines, path=BASELINES_PATH):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def compare(results, baselines, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares timings to their baselines.
+
+    Args:
+        results (dict): The timings in seconds, by `"name@size"` key.
+        baselines (dict): The baseline timings, by the same keys.
+        threshold (float, optional): The accepted slowdown, 0.25 for 25% slower. Defaults to 0.25.
+
+    Returns:
+        list: The `(key, timing, baseline)` of every regression.
+    """
+    return [
+        (key, timing, baselines[key])
+        for key, timing in sorted(results.items())
+        if key in baselines and timing > baselines[key] * (1 + threshold)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument(
+        "--update", action="store_true", help="Stores the timings as the new baselines"
+    )
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baselines)
+    results = {}
+    print(f"{'benchmark':<24} {'size':>8} {'time (s)':>10} {'baseline':>10}")
+    for name in args.only or BENCHMARKS:
+        for size in args.sizes:
+            if name == "sort_files" and size > SORT_MAX_SIZE and not args.only:
+                continue
+            key = f"{name}@{size}"
+            results[key] = run_benchmark(name, size, args.repeat)
+            baseline = baselines.get(key)
+            baseline = f"{baseline:.4f}" if baseline is not None else "-"
+            print(f"{name:<24} {size:>8} {results[key]:>10.4f} {baseline:>10}")
+
+    if args.update:
+        baselines.update({key: round(timing, 4) for key, timing in results.items()})
+        save_baselines(baselines, args.baselines)
+        print(f"Baselines saved in {args.baselines}")
+        return 0
+
+    regressions = compare(results, baselines, args.threshold)
+    for key, timing, baseline in regressions:
+        print(f"Regression: {key} took {timing:.4f}s, baseline {baseline:.4f}s")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import sys
+
+
+class _NoStyle:
+    """
+    Stands in for the `Fore` and `Style` of colorama when the output is not a terminal:
+    every color is an empty string, so the logs of the scheduled runs stay plain.
+    """
+
+    def __getattr__(self, name):
+        return ""
+
+
+class NullProgressBar:
+    """
+    A progress bar that shows nothing, with the attributes of `tqdm` used by the sorting operations.
+    """
+
+    def __init__(self, total=0, **options):
+        self.total = total
+        self.n = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def update(self, count=1):
+        self.n += count
+
+    def refresh(self):
+        pass
+
+
+if sys.stdout is not None and sys.stdout.isatty():
+    from colorama import Fore, Style
+else:
+    Fore = Style = _NoStyle()
+
+
+def progress_bar(**options):
+    """
+    Creates a `tqdm` progress bar when the progress is written to a terminal, else a `NullProgressBar`.
+
+    tqdm is only imported for the terminals, so the headless runs start faster.
+
+    Args:
+        **options: The keyword arguments of `tqdm`.
+
+    Returns:
+        tqdm or NullProgressBar: The progress bar, to use as a context manager.
+    """
+    if sys.stderr is None or not sys.stderr.isatty():
+        return NullProgressBar(**options)
+
+    from tqdm import tqdm
+
+    return tqdm(**options)
@@ -0,0 +1,769 @@
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from hashing import file_digest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+HDRFIX_PATH = os.path.join(SCRIPT_DIR, "hdrfix.exe")
+CONVERSION_CACHE_FILENAME = ".conversion_cache.json"
+
+# The batches sent at once to a worker converter.
+WORKER_BATCH_SIZE = 16
+CONVERTER_BACKENDS = ("process", "worker")
+
+ConversionFailure = namedtuple(
+    "ConversionFailure", ["src_path", "returncode", "message"]
+)
+ConversionResult = namedtuple("ConversionResult", ["returncode", "message"])
+
+
+def default_jobs():
+    """
+    Returns the default number of conversion workers.
+
+    Returns:
+        int: The number of CPUs available, at least 1.
+    """
+    return max(1, os.cpu_count() or 1)
+
+
+def conversion_path(dst_folder, game_name, filename, subfolders=()):
+    """
+    Returns the path of the converted SDR image for the specified JXR file.
+
+    Args:
+        dst_folder (str): The path of the destination folder.
+        game_name (str): The name of the game folder.
+        filename (str): The name of the JXR file.
+        subfolders (tuple, optional): The subfolders of the JXR file in its `JXR` folder, like `("2024", "02")`.
+
+    Returns:
+        str: The path of the `-sdr.png` file in the `Conv` folder.
+    """
+    return os.path.join(
+        dst_folder,
+        game_name,
+        "Conv",
+        *subfolders,
+        os.path.splitext(filename)[0] + "-sdr.png",
+    )
+
+
+def converter_version(command=None):
+    """
+    Returns a short identifier of the converter, which changes whenever one of its files changes.
+
+    Args:
+        command (list, optional): The converter command. Defaults to `[HDRFIX_PATH]`.
+
+    Returns:
+        str: The identifier, built from the size and modification time of the files of the command.
+    """
+    digest = hashlib.sha1()
+    for part in command or [HDRFIX_PATH]:
+        digest.update(os.path.basename(part).encode())
+        try:
+            stat = os.stat(part)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        except OSError:
+            continue
+    return digest.hexdigest()[:16]
+
+
+class ConversionCache:
+    """
+    Remembers the conversions already done, so an up to date `-sdr.png` is not converted again.
+
+    A conversion is up to date when its output exists and the source JXR and the converter did not
+    change since. The source is compared by size and modification time, and, with `use_hash`,
+    by content when only its modification time changed.
+
+    Args:
+        path (str): The path of the cache file.
+        root (str): The folder the cached paths are relative to.
+        version (str): The identifier of the converter, see `converter_version`.
+        use_hash (bool, optional): Whether to also compare the content of the sources. Defaults to False.
+        entries (dict, optional): The cached conversions.
+    """
+
+    def __init__(self, path, root, version, use_hash=False, entries=None):
+        self.path = path
+        self.root = root
+        self.version = version
+        self.use_hash = use_hash
+        self.entries = dict(entries or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root, command=None, use_hash=False):
+        """
+        Loads the conversion cache of the specified destination folder.
+
+        Args:
+            root (str): The path of the destination folder.
+            command (list, optional): The converter command. Defaults to `[HDRFIX_PATH]`.
+            use_hash (bool, optional): Whether to also compare the content of the sources. Defaults to False.
+
+        Returns:
+            ConversionCache: The cache, empty if the file does not exist or cannot be read.
+        """
+        path = os.path.join(root, CONVERSION_CACHE_FILENAME)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entries = json.load(file).get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            entries = {}
+        return cls(path, root, converter_version(command), use_hash, entries)
+
+    def _key(self, path):
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        if relative.startswith(os.pardir):
+            relative = os.path.abspath(path)
+        return relative.replace(os.sep, "/")
+
+    def is_fresh(self, src_path, dst_path):
+        """
+        Returns whether the conversion of `src_path` into `dst_path` is still up to date.
+
+        Args:
+            src_path (str): The path of the JXR file.
+            dst_path (str): The path of the converted PNG file.
+
+        Returns:
+            bool: True if the conversion can be skipped.
+        """
+        key = self._key(src_path)
+        with self._lock:
+            entry = self.entries.get(key)
+        if (
+            not entry
+            or entry.get("version") != self.version
+            or entry.get("output") != self._key(dst_path)
+            or not os.path.exists(dst_path)
+        ):
+            return False
+
+        try:
+            stat = os.stat(src_path)
+        except OSError:
+            return False
+        if stat.st_size != entry.get("size"):
+            return False
+        if stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+        if self.use_hash and entry.get("hash") == file_digest(src_path):
+            with self._lock:
+                entry["mtime_ns"] = stat.st_mtime_ns
+            return True
+        return False
+
+    def record(self, src_path, dst_path):
+        """
+        Remembers a successful conversion.
+
+        Args:
+            src_path (str): The path of the JXR file.
+            dst_path (str): The path of the converted PNG file.
+        """
+        stat = os.stat(src_path)
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "version": self.version,
+            "output": self._key(dst_path),
+        }
+        if self.use_hash:
+            entry["hash"] = file_digest(src_path)
+        with self._lock:
+            self.entries[self._key(src_path)] = entry
+
+    def relocate(self, moves):
+        """
+        Follows moved files, so their conversions stay up to date.
+
+        Args:
+            moves (dict): The new path of every moved JXR or converted PNG file, by old path.
+        """
+        keys = {self._key(old): self._key(new) for old, new in moves.items()}
+        with self._lock:
+            self.entries = {
+                keys.get(key, key): dict(
+                    entry, output=keys.get(entry.get("output"), entry.get("output"))
+                )
+                for key, entry in self.entries.items()
+            }
+
+    def save(self):
+        """
+        Writes the cache, replacing the previous file atomically.
+        """
+        with self._lock:
+            data = {"entries": dict(self.entries)}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class ProcessConverter:
+    """
+    Starts the converter once per file, with the source and destination paths appended to its
+    command, like `hdrfix.exe`.
+
+    Args:
+        command (list, optional): The converter command. Defaults to `[HDRFIX_PATH]`.
+    """
+
+    batch_size = 1
+
+    def __init__(self, command=None):
+        self.command = list(command or [HDRFIX_PATH])
+
+    def convert(self, jobs):
+        """
+        Converts JXR files, one process after the other.
+
+        Args:
+            jobs (list): The `(src_path, dst_path)` of the files to convert.
+
+        Returns:
+            list: The `ConversionResult` of every job, in the same order. The message is the last
+                line printed by a failed conversion, the return code is `None` if it could not run.
+        """
+        results = []
+        for src_path, dst_path in jobs:
+            try:
+                result = subprocess.run(
+                    self.command + [src_path, dst_path],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    errors="replace",
+                )
+            except OSError as error:
+                results.append(ConversionResult(None, str(error)))
+                continue
+            output = result.stdout.strip().splitlines()
+            message = output[-1] if output and result.returncode != 0 else ""
+            results.append(ConversionResult(result.returncode, message))
+        return results
+
+    def close(self):
+        pass
+
+
+class WorkerError(Exception):
+    """
+    Raised when a worker converter crashed, hung or broke the protocol.
+    """
+
+
+class _Worker:
+    """
+    A running worker converter, read by a thread so its replies can be waited for with a timeout.
+    """
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        self.last_used = time.monotonic()
+        self._lines = queue.Queue()
+        self._last_id = 0
+        threading.Thread(
+            target=self._read, name="converter-worker", daemon=True
+        ).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, message, timeout):
+        self._last_id += 1
+        line = json.dumps(dict(message, id=self._last_id)) + "\n"
+        try:
+            self.process.stdin.write(line)
+            self.process.stdin.flush()
+        except (OSError, ValueError) as error:
+            raise WorkerError(f"Le convertisseur ne répond plus : {error}") from error
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise WorkerError(
+                    f"Le convertisseur n'a pas répondu en {timeout:g} s"
+                ) from None
+            if line is None:
+                raise WorkerError(
+                    f"Le convertisseur s'est arrêté (code {self.process.poll()})"
+                )
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                # Anything else the worker prints is ignored.
+                continue
+            if isinstance(reply, dict) and reply.get("id") == self._last_id:
+                self.last_used = time.monotonic()
+                return reply
+
+    def close(self, timeout=5.0):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+
+class WorkerConverter:
+    """
+    Keeps one long-lived converter process per conversion thread, so the start-up of the converter
+    and of its decoder is paid once per thread instead of once per file.
+
+    The worker reads one JSON request per line on its stdin and writes one JSON reply per line on
+    its stdout, with the `id` of the request:
+
+    - `{"id": 1, "jobs": [[src_path, dst_path], ...]}` converts a batch of files, the reply is
+      `{"id": 1, "results": [[returncode, message], ...]}` in the same order.
+    - `{"id": 2, "ping": true}` is a health check, the reply is `{"id": 2, "pong": true}`.
+
+    The worker stops when its stdin is closed. A worker idle for `health_interval` seconds is
+    pinged before its next batch. A worker that crashes, hangs or breaks the protocol is killed
+    and restarted, and the files of its batch are converted again one by one, so only the file
+    that crashed it fails. `hdrfix_stub.py --worker` is a local stand-in speaking this protocol.
+
+    Args:
+        command (list): The command starting a worker.
+        batch_size (int, optional): The number of files sent in one request. Defaults to 16.
+        job_timeout (float, optional): The number of seconds a file may take before the worker is
+            considered hung. Defaults to 120.
+        health_interval (float, optional): The number of idle seconds before a worker is pinged.
+            Defaults to 30.
+        ping_timeout (float, optional): The number of seconds a worker has to answer a ping.
+            Defaults to 5.
+    """
+
+    def __init__(
+        self,
+        command,
+        batch_size=WORKER_BATCH_SIZE,
+        job_timeout=120.0,
+        health_interval=30.0,
+        ping_timeout=5.0,
+    ):
+        self.command = list(command)
+        self.batch_size = max(1, batch_size)
+        self.job_timeout = job_timeout
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.started = 0
+        self.restarts = 0
+        self._local = threading.local()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _discard(self, worker, restart=True):
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if restart:
+                self.restarts += 1
+        self._local.worker = None
+
+    def _worker(self):
+        worker = getattr(self._local, "worker", None)
+        if worker is not None and not worker.alive():
+            self._discard(worker, restart=worker in self._workers)
+            worker = None
+        if (
+            worker is not None
+            and time.monotonic() - worker.last_used >= self.health_interval
+            and not self._ping(worker)
+        ):
+            self._discard(worker)
+            worker = None
+        if worker is None:
+            worker = self._local.worker = _Worker(self.command)
+            with self._lock:
+                self._workers.append(worker)
+                self.started += 1
+        return worker
+
+    def _ping(self, worker):
+        try:
+            return bool(worker.request({"ping": True}, self.ping_timeout).get("pong"))
+        except WorkerError:
+            return False
+
+    def _send(self, jobs):
+        worker = self._worker()
+        try:
+            reply = worker.request(
+                {"jobs": [list(job) for job in jobs]}, self.job_timeout * len(jobs)
+            )
+            results = [
+                ConversionResult(returncode, message)
+                for returncode, message in reply["results"]
+            ]
+        except (KeyError, TypeError, ValueError) as error:
+            self._discard(worker)
+            raise WorkerError(
+                f"Réponse invalide du convertisseur : {error}"
+            ) from error
+        except WorkerError:
+            self._discard(worker)
+            raise
+        if len(results) != len(jobs):
+            self._discard(worker)
+            raise WorkerError("Réponse invalide du convertisseur")
+        return results
+
+    def convert(self, jobs):
+        """
+        Converts JXR files on the worker of the calling thread, starting it if needed.
+
+        Args:
+            jobs (list): The `(src_path, dst_path)` of the files to convert.
+
+        Returns:
+            list: The `ConversionResult` of every job, in the same order. The return code is `None`
+                if the worker could not start or crashed on this file.
+        """
+        try:
+            return self._send(jobs)
+        except OSError as error:
+            return [ConversionResult(None, str(error)) for _ in jobs]
+        except WorkerError as error:
+            if len(jobs) == 1:
+                return [ConversionResult(None, str(error))]
+        return [self.convert([job])[0] for job in jobs]
+
+    def close(self):
+        """
+        Stops the workers, they are started again by the next conversion.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+def make_converter(backend="process", command=None, **options):
+    """
+    Creates the converter selected by the configuration.
+
+    Args:
+        backend (str, optional): "process" to start the converter once per file, "worker" to keep
+            it running between the files. Defaults to "process".
+        command (list, optional): The converter command. Defaults to `[HDRFIX_PATH]`, required by
+            the "worker" backend.
+        **options: The other arguments of `WorkerConverter`.
+
+    Returns:
+        ProcessConverter or WorkerConverter: The converter.
+
+    Raises:
+        ValueError: If the backend is unknown, or the "worker" backend has no command.
+    """
+    if backend == "process":
+        return ProcessConverter(command)
+    if backend == "worker":
+        if not command:
+            raise ValueError("Le convertisseur « worker » nécessite une commande")
+        return WorkerConverter(command, **options)
+    raise ValueError(f"Convertisseur inconnu : {backend}")
+
+
+def as_converter(converter=None):
+    """
+    Returns the converter of a converter command, or the converter itself.
+
+    Args:
+        converter (list or ProcessConverter or WorkerConverter, optional): A converter, or the
+            command of a `ProcessConverter`. Defaults to `hdrfix.exe`.
+
+    Returns:
+        ProcessConverter or WorkerConverter: The converter.
+    """
+    if hasattr(converter, "convert"):
+        return converter
+    return ProcessConverter(converter)
+
+
+class ConversionPool:
+    """
+    Runs JXR conversions in the background on a bounded number of workers.
+
+    Each worker only waits on its own converter process, so threads are enough to keep
+    several cores busy while the caller keeps moving files. The conversions are handed to the
+    workers in batches of `converter.batch_size` files, the last partial batch is sent by `flush`.
+
+    Args:
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        command (list, optional): The converter command, the source and destination paths are appended to it.
+            Defaults to `[HDRFIX_PATH]`.
+        cache (ConversionCache, optional): Skips the conversions that are still up to date, saved by `join` and `cancel`.
+        force (bool, optional): Whether to convert every file and only update the cache. Defaults to False.
+        journal (Journal, optional): Records every queued and finished conversion.
+        metrics (RunMetrics, optional): Records the bytes, latency and exit code of every conversion.
+        converter (ProcessConverter or WorkerConverter, optional): Converts the files instead of `command`,
+            closed by `join` and `cancel`.
+    """
+
+    def __init__(
+        self,
+        jobs=1,
+        command=None,
+        cache=None,
+        force=False,
+        journal=None,
+        metrics=None,
+        converter=None,
+    ):
+        self.converter = converter or ProcessConverter(command)
+        self.command = self.converter.command
+        self.cache = cache
+        self.force = force
+        self.journal = journal
+        self.metrics = metrics
+        self.failures = []
+        self.submitted = 0
+        self.completed = 0
+        self.skipped = 0
+        self._batch = []
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, jobs), thread_name_prefix="conversion"
+        )
+
+    def submit(self, src_path, dst_path):
+        """
+        Queues the conversion of `src_path` into `dst_path`.
+
+        Args:
+            src_path (str): The path of the JXR file.
+            dst_path (str): The path of the converted PNG file.
+        """
+        if self.journal is not None:
+            self.journal.queued(src_path, dst_path)
+        with self._condition:
+            self.submitted += 1
+            self._batch.append((src_path, dst_path))
+            if len(self._batch) < self.converter.batch_size:
+                return
+            batch, self._batch = self._batch, []
+        self._executor.submit(self._convert, batch)
+
+    def flush(self):
+        """
+        Hands the conversions waiting for a full batch to the workers.
+        """
+        with self._condition:
+            batch, self._batch = self._batch, []
+        if batch:
+            self._executor.submit(self._convert, batch)
+
+    def _convert(self, batch):
+        # The jobs not counted as completed yet, they fail if the batch raises.
+        pending = list(batch)
+        message = "Le convertisseur n'a pas donné de résultat"
+        try:
+            self._convert_batch(pending)
+        except Exception as error:
+            message = str(error) or repr(error)
+        finally:
+            with self._condition:
+                for src_path, _ in pending:
+                    self.failures.append(ConversionFailure(src_path, None, message))
+                self.completed += len(pending)
+                self._condition.notify_all()
+
+    def _convert_batch(self, pending):
+        jobs = []
+        for src_path, dst_path in list(pending):
+            size = 0
+            if self.metrics is not None:
+                try:
+                    size = os.path.getsize(src_path)
+                except OSError:
+                    pass
+            if (
+                self.cache is not None
+                and not self.force
+                and self.cache.is_fresh(src_path, dst_path)
+            ):
+                if self.metrics is not None:
+                    self.metrics.skip("convert", size)
+                if self.journal is not None:
+                    self.journal.converted(src_path, dst_path, 0, cached=True)
+                with self._condition:
+                    self.skipped += 1
+                    self.completed += 1
+                    pending.remove((src_path, dst_path))
+                    self._condition.notify_all()
+            else:
+                jobs.append((src_path, dst_path, size))
+        if not jobs:
+            return
+
+        start = time.perf_counter()
+        results = self.converter.convert([job[:2] for job in jobs])
+        # The files of a batch are converted by one process, they share its time.
+        latency = (time.perf_counter() - start) / len(jobs)
+        for (src_path, dst_path, size), result in zip(jobs, results):
+            self._finish(src_path, dst_path, size, latency, result, pending)
+
+    def _finish(self, src_path, dst_path, size, latency, result, pending):
+        failure = None
+        if result.returncode != 0:
+            failure = ConversionFailure(src_path, result.returncode, result.message)
+        if self.metrics is not None:
+            self.metrics.observe("convert", latency, size)
+            self.metrics.exit_code(result.returncode)
+
+        if self.journal is not None:
+            self.journal.converted(src_path, dst_path, result.returncode)
+        if failure is None and self.cache is not None:
+            try:
+                self.cache.record(src_path, dst_path)
+            except OSError:
+                pass
+
+        with self._condition:
+            if failure:
+                self.failures.append(failure)
+            self.completed += 1
+            pending.remove((src_path, dst_path))
+            self._condition.notify_all()
+
+    def progress(self):
+        """
+        Returns the number of finished and queued conversions.
+
+        Returns:
+            tuple: `(completed, submitted)`.
+        """
+        with self._condition:
+            return self.completed, self.submitted
+
+    def join(self, update_progress=None, interval=0.1, cancel_event=None):
+        """
+        Waits for every queued conversion to finish.
+
+        Args:
+            update_progress (function, optional): Called with `(completed, submitted)` while waiting.
+            interval (float, optional): The delay between two progress reports, in seconds. Defaults to 0.1.
+            cancel_event (threading.Event, optional): Stops waiting when set, the conversions not started yet are dropped.
+
+        Returns:
+            list: The `ConversionFailure` of every conversion that did not succeed.
+        """
+        self.flush()
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return self.cancel()
+            with self._condition:
+                if self.completed < self.submitted:
+                    self._condition.wait(interval)
+                completed, submitted = self.completed, self.submitted
+            if update_progress:
+                update_progress(completed, submitted)
+            if completed >= submitted:
+                break
+
+        self._executor.shutdown(wait=True)
+        self.converter.close()
+        self._save_cache()
+        return list(self.failures)
+
+    def _save_cache(self):
+        if self.cache is not None:
+            try:
+                self.cache.save()
+            except OSError:
+                pass
+
+    def cancel(self):
+        """
+        Drops the conversions that have not started yet and waits for the running ones.
+
+        Returns:
+            list: The `ConversionFailure` of every finished conversion that did not succeed.
+        """
+        with self._condition:
+            self._batch = []
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.converter.close()
+        self._save_cache()
+        with self._condition:
+            return list(self.failures)
+
+
+def open_pool(
+    dst_folder,
+    jobs=1,
+    command=None,
+    use_cache=True,
+    use_hash=False,
+    force=False,
+    journal=None,
+    metrics=None,
+):
+    """
+    Creates a conversion pool using the conversion cache of the specified destination folder.
+
+    Args:
+        dst_folder (str): The path of the destination folder.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        command (list or ProcessConverter or WorkerConverter, optional): The converter, or the converter
+            command. Defaults to `[HDRFIX_PATH]`.
+        use_cache (bool, optional): Whether to skip the conversions that are still up to date. Defaults to True.
+        use_hash (bool, optional): Whether the cache also compares the content of the sources. Defaults to False.
+        force (bool, optional): Whether to convert every file and only update the cache. Defaults to False.
+        journal (Journal, optional): Records every queued and finished conversion.
+        metrics (RunMetrics, optional): Records the bytes, latency and exit code of every conversion.
+
+    Returns:
+        ConversionPool: The pool.
+    """
+    converter = as_converter(command)
+    cache = (
+        ConversionCache.load(dst_folder, converter.command, use_hash)
+        if use_cache
+        else None
+    )
+    return ConversionPool(
+        jobs,
+        cache=cache,
+        force=force,
+        journal=journal,
+        metrics=metrics,
+        converter=converter,
+    )
@@ -0,0 +1,197 @@
+import os
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from hashing import file_digest, partial_digest
+
+PARTIAL_BLOCK_SIZE = 64 * 1024
+DEDUP_EXTENSIONS = ("jxr", "png")
+
+DuplicateGroup = namedtuple("DuplicateGroup", ["size", "paths"])
+
+
+def _regroup(groups, key, jobs):
+    """
+    Splits every group by the value of `key`, computed on a thread pool, and drops the singletons.
+    """
+    paths = [path for group in groups for path in group[1]]
+    if not paths:
+        return []
+    sizes = {path: size for size, group in groups for path in group}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        keys = list(executor.map(lambda path: key(path, sizes[path]), paths))
+
+    buckets = defaultdict(list)
+    for path, value in zip(paths, keys):
+        if value is not None:
+            buckets[(sizes[path], value)].append(path)
+    return [(size, group) for (size, _), group in buckets.items() if len(group) > 1]
+
+
+def _partial_key(path, size):
+    try:
+        return partial_digest(path, size, PARTIAL_BLOCK_SIZE)
+    except OSError:
+        return None
+
+
+def _full_key(path, size):
+    try:
+        return file_digest(path)
+    except OSError:
+        return None
+
+
+def find_duplicates(paths, jobs=4):
+    """
+    Finds the files with the same content.
+
+    The files are grouped by size, then by the hash of their first and last blocks, and only the
+    files still colliding are hashed in full, so most files are never read entirely. Files sharing
+    the same inode are already linked and count as one.
+
+    Args:
+        paths (iterable): The paths of the files to compare.
+        jobs (int, optional): The number of files hashed at the same time. Defaults to 4.
+
+    Returns:
+        list: The `DuplicateGroup` of every set of identical files, their paths sorted so the first one is kept.
+    """
+    by_size = defaultdict(dict)
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size:
+            by_size[stat.st_size].setdefault((stat.st_dev, stat.st_ino), path)
+
+    groups = [
+        (size, sorted(files.values()))
+        for size, files in by_size.items()
+        if len(files) > 1
+    ]
+    groups = _regroup(groups, _partial_key, jobs)
+    groups = [
+        (size, group) for size, group in groups if size <= 2 * PARTIAL_BLOCK_SIZE
+    ] + _regroup(
+        [(size, group) for size, group in groups if size > 2 * PARTIAL_BLOCK_SIZE],
+        _full_key,
+        jobs,
+    )
+    return sorted(
+        (DuplicateGroup(size, sorted(group)) for size, group in groups),
+        key=lambda group: group.paths[0],
+    )
+
+
+def link_duplicates(groups):
+    """
+    Replaces the duplicates by hardlinks to the first file of their group.
+
+    Every duplicate is replaced atomically, so it is never missing even if the operation is interrupted.
+
+    Args:
+        groups (list): The `DuplicateGroup` returned by `find_duplicates`.
+
+    Returns:
+        tuple: The number of freed bytes and the list of the paths that could not be linked.
+    """
+    freed = 0
+    failed = []
+    for group in groups:
+        original = group.paths[0]
+        for path in group.paths[1:]:
+            tmp_path = path + ".link"
+            try:
+                os.link(original, tmp_path)
+                os.replace(tmp_path, path)
+                freed += group.size
+            except OSError:
+                failed.append(path)
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+    return freed, failed
+
+
+def duplicate_size(groups):
+    """
+    Returns the space taken by the duplicates, the first file of every group excluded.
+
+    Args:
+        groups (list): The `DuplicateGroup` returned by `find_duplicates`.
+
+    Returns:
+        int: The number of bytes.
+    """
+    return sum(group.size * (len(group.paths) - 1) for group in groups)
+
+
+def library_files(folder):
+    """
+    Yields the PNG and JXR files of a folder and its subfolders.
+
+    Args:
+        folder (str): The path of the folder.
+
+    Yields:
+        str: The paths of the files.
+    """
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for name in files:
+            if (
+                not name.startswith(".")
+                and os.path.splitext(name)[1].lower()[1:] in DEDUP_EXTENSIONS
+            ):
+                yield os.path.join(root, name)
+
+
+def find_new_duplicates(new_paths, jobs=4):
+    """
+    Finds the duplicates of freshly sorted files among them and the files of their folders.
+
+    Args:
+        new_paths (iterable): The paths of the freshly sorted files.
+        jobs (int, optional): The number of files hashed at the same time. Defaults to 4.
+
+    Returns:
+        list: The `DuplicateGroup` holding at least one of the new files.
+    """
+    new_paths = set(new_paths)
+    candidates = set(new_paths)
+    for folder in {os.path.dirname(path) for path in new_paths}:
+        try:
+            with os.scandir(folder) as entries:
+                candidates.update(
+                    entry.path
+                    for entry in entries
+                    if entry.is_file()
+                    and os.path.splitext(entry.name)[1].lower()[1:] in DEDUP_EXTENSIONS
+                )
+        except OSError:
+            continue
+    return [
+        group
+        for group in find_duplicates(candidates, jobs)
+        if not new_paths.isdisjoint(group.paths)
+    ]
+
+
+def dedup_library(folder, jobs=4, link=False):
+    """
+    Finds the duplicate captures of a folder, and links them together if asked.
+
+    Args:
+        folder (str): The path of the folder.
+        jobs (int, optional): The number of files hashed at the same time. Defaults to 4.
+        link (bool, optional): Whether to replace the duplicates by hardlinks. Defaults to False.
+
+    Returns:
+        tuple: The `DuplicateGroup` list and the result of `link_duplicates`, `(0, [])` if `link` is False.
+    """
+    groups = find_duplicates(library_files(folder), jobs)
+    return groups, link_duplicates(groups) if link else (0, [])
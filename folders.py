@@ -1,5 +1,4 @@
 import os
-from tkinter import filedialog
 
 
 def create_folder_structure(base_folder, folder_name, file_ext):
@@ -31,6 +30,8 @@ def select_folder(var):
     Args:
         var (str): The variable to set to the path of the selected folder.
     """
+    from tkinter import filedialog
+
     folder_path = filedialog.askdirectory()
     if folder_path != "":
         var.set(folder_path)
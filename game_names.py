@@ -1,12 +1,80 @@
 import os
 import re
-from collections import Counter
+from bisect import bisect_left
+from collections import Counter, deque
+from functools import lru_cache
+
+DEFAULT_GAME_NAME = "Default"
+DEFAULT_PREFIXES = ("Ce PC", "Photos", "Screenshot")
+GAME_PREFIX_PATTERN = re.compile(r"(.*?\D)\d")
+ONLY_NUMBERS_PATTERN = re.compile(r"\d+(_\d+)*")
+CLEAN_PATTERN = re.compile(
+    r"(\s*\d{1,2}_\d{1,2}_\d{2,4}(?:\s*\d{1,2}_\d{1,2}_\d{1,2})?\s*)"
+    r"|(\s*-\s*\d+\.\d+\.\d+\.\d+\s*\(.*?\)\s*)"
+    r"|(\s-.*|Screenshot.*|\s*(?:\([Cc]\)|©).*)"
+)
+# The underscores become spaces, and the runs of spaces a single one.
+SPACES_PATTERN = re.compile(r"[\s_]+")
+# The `dd_mm_yyyy hh_mm_ss.ext` timestamp ending the Game Bar captures.
+DATE_PATTERN = re.compile(r"[0-9]{1,2}_[0-9]{1,2}_[0-9]{4}")
+TIME_EXTENSION_PATTERN = re.compile(
+    r"[0-9]{1,2}_[0-9]{1,2}_[0-9]{1,2}(\.[A-Za-z0-9]{1,5})?"
+)
+# The parts of `CLEAN_PATTERN` that remove everything up to the end of the name.
+UNSAFE_HEAD_MARKERS = ("-", "Screenshot", "(C)", "(c)", "©")
+CLEAN_CACHE_SIZE = 4096
+
+
+def _clean(filename):
+    if ONLY_NUMBERS_PATTERN.fullmatch(filename):
+        return filename.split("_", 1)[0]
+
+    return SPACES_PATTERN.sub(" ", CLEAN_PATTERN.sub("", filename)).strip()
+
+
+@lru_cache(maxsize=CLEAN_CACHE_SIZE)
+def _clean_head(head):
+    # The timestamp is not part of the head, only its trailing spaces are removed with the
+    # extension, see `clean_filename`.
+    return SPACES_PATTERN.sub(" ", CLEAN_PATTERN.sub("", head)).lstrip()
+
+
+def _split_timestamp(filename):
+    """
+    Splits a Game Bar name in the part before its timestamp and its extension.
+
+    The split is only done when cleaning the part before the timestamp gives the same result as
+    cleaning the whole name: it must not end with a character the cleaning patterns could carry
+    over the timestamp, nor contain the start of a pattern removing the end of the name.
+
+    Args:
+        filename (str): The name of the file.
+
+    Returns:
+        tuple or None: The `(head, extension)` of the name, `None` if it cannot be split.
+    """
+    parts = filename.rsplit(" ", 2)
+    if len(parts) != 3:
+        return None
+    head, date, time_and_extension = parts
+    match = TIME_EXTENSION_PATTERN.fullmatch(time_and_extension)
+    if not match or not DATE_PATTERN.fullmatch(date):
+        return None
+    last = head[-1:]
+    if not last or last == "_" or last.isspace() or last.isdigit():
+        return None
+    if any(marker in head for marker in UNSAFE_HEAD_MARKERS):
+        return None
+    return head, match.group(1) or ""
 
 
 def clean_filename(filename):
     """
     Cleans up a filename by removing certain patterns.
 
+    The captures of a game only differ by their timestamp, so the part of their name before it is
+    cleaned once and kept in an LRU cache.
+
     Args:
         filename (str): The name of the file to be cleaned.
 
@@ -18,57 +86,246 @@ def clean_filename(filename):
         >>> clean_filename(filename)
         'Example File.txt'
     """
-    if re.fullmatch(r"\d+(_\d+)*", filename):
-        return re.search(r"\d+", filename).group()
+    split = _split_timestamp(filename)
+    if split is None:
+        return _clean(filename)
+
+    head, extension = split
+    cleaned_head = _clean_head(head)
+    return cleaned_head + extension if extension else cleaned_head.rstrip()
 
-    pattern = (
-        r"(\s*\d{1,2}_\d{1,2}_\d{2,4}(?:\s*\d{1,2}_\d{1,2}_\d{1,2})?\s*)"
-        r"|(\s*-\s*\d+\.\d+\.\d+\.\d+\s*\(.*?\)\s*)"
-        r"|(\s-.*|Screenshot.*)"
-    )
-    cleaned_filename = re.sub(pattern, "", filename).strip()
 
-    cleaned_filename = cleaned_filename.replace("_", " ")
+def clean_many(names):
+    """
+    Cleans up several filenames, every distinct name being cleaned once.
 
-    cleaned_filename = re.sub(r"\s+", " ", cleaned_filename).strip()
+    Args:
+        names (iterable): The names of the files.
 
-    return cleaned_filename
+    Returns:
+        list: The cleaned names, in the same order.
+    """
+    names = list(names)
+    cleaned = {name: clean_filename(name) for name in dict.fromkeys(names)}
+    return [cleaned[name] for name in names]
 
 
-def common_filename_part(folder_path):
+def common_filename_part(entries, min_count=3):
     """
-    Returns a list of common parts of filenames in the specified folder.
+    Returns a list of common parts of filenames in the specified entries.
+
+    The names are sorted once, so every file starting with a candidate prefix is a contiguous
+    range found by binary search, and the common part of that range is the common prefix of
+    its first and last names. The whole operation is O(N log N).
 
     Args:
-        folder_path (str): The path of the folder containing the files.
+        entries (iterable or str): The already scanned file names or `os.DirEntry`, or the path of a folder to list.
+        min_count (int, optional): The number of files a prefix needs to be considered a game. Defaults to 3.
 
     Returns:
-        common_parts (list): A list of common parts of filenames in the specified folder.
+        common_parts (list): A list of common parts of filenames in the specified entries, sorted by name.
     """
-    files = os.listdir(folder_path)
+    if isinstance(entries, str):
+        entries = os.listdir(entries)
 
-    counter = Counter(
-        [
-            re.match(r"(.*?\D)\d", f).group(1).strip()
-            for f in files
-            if re.match(r"(.*?\D)\d", f)
-        ]
-    )
+    names = sorted(getattr(entry, "name", entry) for entry in entries)
 
-    common_strings = [s for s in counter.keys() if counter[s] > 2]
+    counter = Counter()
+    for name in names:
+        match = GAME_PREFIX_PATTERN.match(name)
+        if match:
+            counter[match.group(1).strip()] += 1
 
     common_parts = []
-    for s in common_strings:
-        matches = [f for f in files if f.startswith(s)]
-        common_part = os.path.commonprefix(matches).rsplit(" ", 1)[0].strip()
+    for prefix, count in counter.items():
+        if count < min_count:
+            continue
 
-        cleaned_common_part = clean_filename(common_part)
+        start = bisect_left(names, prefix)
+        end = bisect_left(names, prefix + "\U0010ffff", start)
+        if start >= end:
+            # Only names starting with spaces have this prefix once it is stripped.
+            continue
+        common_part = os.path.commonprefix([names[start], names[end - 1]])
+        cleaned_common_part = clean_filename(common_part.rsplit(" ", 1)[0].strip())
 
-        common_parts.append(cleaned_common_part)
+        if cleaned_common_part and cleaned_common_part not in common_parts:
+            common_parts.append(cleaned_common_part)
 
     return common_parts
 
 
+def stream_common_parts(names, min_count=3):
+    """
+    Returns the same common parts as `common_filename_part`, without keeping the names in memory.
+
+    The names are read twice: the first pass counts the candidate prefixes, the second one keeps
+    the smallest and largest name starting with each kept prefix, whose common prefix is the common
+    part of the whole range. The memory used only depends on the number of prefixes.
+
+    Args:
+        names (function): Called without argument, returns a new iterator over the file names.
+        min_count (int, optional): The number of files a prefix needs to be considered a game. Defaults to 3.
+
+    Returns:
+        common_parts (list): A list of common parts of the file names, sorted by name.
+    """
+    counter = Counter()
+    first_names = {}
+    for name in names():
+        match = GAME_PREFIX_PATTERN.match(name)
+        if match:
+            prefix = match.group(1).strip()
+            counter[prefix] += 1
+            if prefix not in first_names or name < first_names[prefix]:
+                first_names[prefix] = name
+
+    prefixes = {prefix for prefix, count in counter.items() if count >= min_count}
+    lengths = sorted({len(prefix) for prefix in prefixes})
+    stems = {prefix[:length] for prefix in prefixes for length in lengths}
+    lows = {}
+    highs = {}
+    for name in names():
+        for length in lengths:
+            prefix = name[:length]
+            if length > len(name) or prefix not in stems:
+                break
+            if prefix in prefixes:
+                low = lows.get(prefix)
+                if low is None:
+                    lows[prefix] = highs[prefix] = name
+                elif name < low:
+                    lows[prefix] = name
+                elif name > highs[prefix]:
+                    highs[prefix] = name
+
+    common_parts = []
+    for prefix in sorted(prefixes, key=first_names.get):
+        if prefix not in lows:
+            # Only names starting with spaces have this prefix once it is stripped.
+            continue
+        common_part = os.path.commonprefix([lows[prefix], highs[prefix]])
+        cleaned_common_part = clean_filename(common_part.rsplit(" ", 1)[0].strip())
+
+        if cleaned_common_part and cleaned_common_part not in common_parts:
+            common_parts.append(cleaned_common_part)
+
+    return common_parts
+
+
+class GameMatcher:
+    """
+    Finds game names in filenames with an Aho-Corasick automaton built once from the common parts.
+
+    A cleaned filename is read a single time whatever the number of games. When several games
+    appear in it, the longest one wins, ties going to the first one in `common_parts`.
+
+    Args:
+        common_parts (list): A list of common parts of filenames in the specified folder.
+    """
+
+    def __init__(self, common_parts):
+        self.common_parts = list(common_parts)
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+
+        for index, game_name in enumerate(self.common_parts):
+            if not game_name:
+                continue
+            node = 0
+            for char in game_name:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._best[node] = self._better(self._best[node], index)
+
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._best[child] = self._better(
+                    self._best[child], self._best[self._fail[child]]
+                )
+                pending.append(child)
+
+    def _better(self, first, second):
+        if first is None or second is None:
+            return second if first is None else first
+        first_key = (-len(self.common_parts[first]), first)
+        second_key = (-len(self.common_parts[second]), second)
+        return first if first_key <= second_key else second
+
+    def search(self, text):
+        """
+        Returns the game name found in the specified text.
+
+        Args:
+            text (str): An already cleaned filename.
+
+        Returns:
+            str or None: The longest game name contained in `text`, `None` if there is none.
+        """
+        node = 0
+        best = None
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            best = self._better(best, self._best[node])
+        return None if best is None else self.common_parts[best]
+
+    def match(self, filename):
+        """
+        Finds the name of the game of the specified file.
+
+        Args:
+            filename (str): The name of the current file.
+
+        Returns:
+            str: The name of the game, "Default" if none of the common parts matches.
+        """
+        return self._match_cleaned(clean_filename(filename))
+
+    def _match_cleaned(self, cleaned_filename):
+        if cleaned_filename.startswith(DEFAULT_PREFIXES):
+            return DEFAULT_GAME_NAME
+
+        return self.search(cleaned_filename) or DEFAULT_GAME_NAME
+
+    def match_many(self, names):
+        """
+        Finds the name of the game of every specified file.
+
+        The names are cleaned by `clean_many`, and the automaton only reads every distinct cleaned
+        name once.
+
+        Args:
+            names (list): The names of the files.
+
+        Returns:
+            list: The name of the game of every file, in the same order.
+        """
+        cleaned_names = clean_many(names)
+        games = {
+            cleaned: self._match_cleaned(cleaned)
+            for cleaned in dict.fromkeys(cleaned_names)
+        }
+        return [games[cleaned] for cleaned in cleaned_names]
+
+
+@lru_cache(maxsize=8)
+def _cached_matcher(common_parts):
+    return GameMatcher(common_parts)
+
+
 def find_game_name(filename, common_parts):
     """
     Finds the name of the game in the specified common_parts.
@@ -80,13 +337,4 @@ def find_game_name(filename, common_parts):
     Returns:
         str: The name of the game in the specified common_parts.
     """
-    cleaned_filename = clean_filename(filename)
-
-    if any(cleaned_filename.startswith(s) for s in ["Ce PC", "Photos", "Screenshot"]):
-        return "Default"
-
-    for game_name in common_parts:
-        if game_name in cleaned_filename:
-            return game_name
-
-    return "Default"
+    return _cached_matcher(tuple(common_parts)).match(filename)
@@ -1,10 +1,18 @@
 import os
+import queue
+import threading
 from tkinter import ttk, messagebox
 from ttkthemes import ThemedTk
 import tkinter as tk
 
 from folders import select_folder
 from start_sorting import start_gui_sorting
+from conversion import default_jobs
+from scanner import scan_files
+from profiling import format_report
+
+# The delay between two reads of the messages of the sorting thread, in milliseconds.
+GUI_POLL_INTERVAL = 100
 
 
 def create_main_window(root):
@@ -55,6 +63,8 @@ def create_container(root):
     container.rowconfigure(4, weight=1)
     container.rowconfigure(5, weight=1)
     container.rowconfigure(6, weight=1)
+    container.rowconfigure(7, weight=1)
+    container.rowconfigure(8, weight=1)
     return container
 
 
@@ -103,16 +113,47 @@ def build_gui(root, container):
     same_dir_check.grid(row=2, column=0, sticky="nsew", pady=(0, 10), padx=(0, 10))
     same_dir_check.bind("<Button-1>", lambda event: dis())
 
+    link_var = tk.BooleanVar(value=False)
+    link_check = ttk.Checkbutton(
+        container,
+        text="Créer des liens sans déplacer les originaux",
+        variable=link_var,
+    )
+    link_check.grid(row=2, column=1, sticky="nsew", pady=(0, 10), padx=(0, 10))
+
     convert_var = tk.BooleanVar(value=True)
     convert_check = ttk.Checkbutton(
         container, text="Convertir les images JXR", variable=convert_var
     )
     convert_check.grid(row=3, column=0, sticky="nsew", pady=(0, 10), padx=(0, 10))
 
+    jobs_frame = ttk.Frame(container)
+    jobs_frame.grid(row=3, column=1, sticky="nsew", pady=(0, 10), padx=(0, 10))
+    jobs_label = ttk.Label(jobs_frame, text="Conversions en parallèle :")
+    jobs_label.pack(side="left", padx=(0, 10))
+    jobs_var = tk.IntVar(value=default_jobs())
+    jobs_spinbox = ttk.Spinbox(
+        jobs_frame, from_=1, to=64, textvariable=jobs_var, width=5, state="readonly"
+    )
+    jobs_spinbox.pack(side="left")
+
+    profile_var = tk.BooleanVar(value=False)
+    profile_check = ttk.Checkbutton(
+        container, text="Profiler le tri (temps et mémoire)", variable=profile_var
+    )
+    profile_check.grid(row=4, column=0, sticky="nsew", pady=(0, 10), padx=(0, 10))
+
     def sort():
         if same_dir.get():
             dst_var.set(src_var.get())
-        start_sorting(src_var.get(), dst_var.get(), convert_var.get())
+        start_sorting(
+            src_var.get(),
+            dst_var.get(),
+            convert_var.get(),
+            jobs_var.get(),
+            profile_var.get(),
+            link_var.get(),
+        )
 
     start_button = ttk.Button(
         container,
@@ -132,13 +173,25 @@ def build_gui(root, container):
         row=6, column=0, sticky="nsew", pady=(0, 10), padx=(0, 10), columnspan=2
     )
 
+    conversion_bar = ttk.Progressbar(container, orient="horizontal", mode="determinate")
+    conversion_bar.grid(
+        row=7, column=0, sticky="nsew", pady=(0, 10), padx=(0, 10), columnspan=2
+    )
+    conversion_label = ttk.Label(container, text="")
+    conversion_label.grid(
+        row=8, column=0, sticky="nsew", pady=(0, 10), padx=(0, 10), columnspan=2
+    )
+
     widgets = [
         src_button,
         src_entry,
         dst_button,
         dst_entry,
         same_dir_check,
+        link_check,
         convert_check,
+        jobs_spinbox,
+        profile_check,
     ]
 
     def update_progress_bar(
@@ -149,9 +202,14 @@ def build_gui(root, container):
         progress_label[
             "text"
         ] = f"Traités : {current_value}/{max_value} | Temps écoulé : {elapsed_time:.2f} s | ETA : {estimated_time_remaining:.2f} s"
-        progress_bar.update()
+
+    def update_conversion_bar(completed, submitted):
+        conversion_bar["maximum"] = max(submitted, 1)
+        conversion_bar["value"] = completed
+        conversion_label["text"] = f"Conversions JXR : {completed}/{submitted}"
 
     saved_states = {}
+    sorting = {"cancel_event": None, "closing": False}
 
     def save_widget_states(widgets):
         for widget in widgets:
@@ -169,15 +227,81 @@ def build_gui(root, container):
             same_dir_check.bind("<Button-1>", lambda event: None)
 
     def cancel_sorting_operation():
-        global cancel_sorting
-        cancel_sorting = True
-        start_button.configure(text="Démarrer le tri", command=lambda: sort())
+        if sorting["cancel_event"] is not None:
+            sorting["cancel_event"].set()
+            start_button.configure(text="Annulation...", state="disabled")
+
+    def close_window():
+        if sorting["cancel_event"] is None:
+            root.destroy()
+        else:
+            sorting["closing"] = True
+            cancel_sorting_operation()
+
+    root.protocol("WM_DELETE_WINDOW", close_window)
+
+    def poll_messages(messages):
+        latest = {}
+        end = None
+        while True:
+            try:
+                kind, values = messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind in ("done", "error"):
+                end = (kind, values)
+            else:
+                latest[kind] = values
+
+        if "progress" in latest:
+            update_progress_bar(*latest["progress"])
+        if "conversion" in latest:
+            update_conversion_bar(*latest["conversion"])
+        if "profile" in latest:
+            sorting["profile"] = latest["profile"]
+        if end is None:
+            root.after(GUI_POLL_INTERVAL, poll_messages, messages)
+        else:
+            finish_sorting(*end)
+
+    def show_profile():
+        report = sorting.pop("profile", None)
+        if report is not None:
+            messagebox.showinfo("Profil du tri", "\n".join(format_report(report)))
+
+    def finish_sorting(kind, result):
+        cancelled = sorting["cancel_event"].is_set()
+        sorting["cancel_event"] = None
+        if sorting["closing"]:
+            root.destroy()
+            return
+
         restore_widget_states(widgets, saved_states)
+        root.title("Organisateur de fichiers")
+        start_button.configure(text="Démarrer le tri", state="normal")
 
-    def start_sorting(src_folder, dst_folder, do_convert):
-        global cancel_sorting
-        cancel_sorting = False
+        if kind == "error":
+            messagebox.showerror("Erreur", f"Le tri des fichiers a échoué : {result}")
+            return
+        if cancelled:
+            messagebox.showinfo("Annulé", "Le tri des fichiers a été annulé.")
+        else:
+            messagebox.showinfo("Terminé", "Le tri des fichiers est terminé !")
+        show_profile()
 
+        if result:
+            details = "\n".join(
+                f"{os.path.basename(failure.src_path)} (code {failure.returncode})"
+                for failure in result[:20]
+            )
+            messagebox.showwarning(
+                "Conversions échouées",
+                f"{len(result)} conversion(s) JXR ont échoué :\n{details}",
+            )
+
+    def start_sorting(
+        src_folder, dst_folder, do_convert, jobs, profile=False, link=False
+    ):
         if not os.path.exists(src_folder):
             messagebox.showerror("Erreur", "Le dossier source n'existe pas.")
             return
@@ -186,45 +310,31 @@ def build_gui(root, container):
             messagebox.showerror("Erreur", "Le dossier de destination n'existe pas.")
             return
 
-        file_list = [
-            entry
-            for entry in os.scandir(src_folder)
-            if entry.is_file()
-            and not entry.name.startswith(".")
-            and entry.name != "desktop.ini"
-        ]
-        total_files = len(file_list)
-        if total_files == 0:
+        if next(scan_files(src_folder), None) is None:
             messagebox.showerror(
                 "Erreur", "Le dossier source ne contient pas d'images à trier."
             )
             return
 
         root.title("Tri en cours...")
-        start_button.configure(
-            text="Annuler", command=lambda: cancel_sorting_operation()
-        )
+        start_button.configure(text="Annuler")
 
-        saved_states = save_widget_states(widgets)
+        save_widget_states(widgets)
         set_widget_state(widgets, "disabled")
 
+        messages = queue.Queue()
+        sorting["cancel_event"] = threading.Event()
         start_gui_sorting(
             src_folder,
             dst_folder,
             do_convert,
-            update_progress_bar,
-            total_files,
-            file_list,
+            messages,
+            jobs,
+            sorting["cancel_event"],
+            profile,
+            link,
         )
-
-        restore_widget_states(widgets, saved_states)
-        root.title("Organisateur de fichiers")
-        start_button.configure(text="Démarrer le tri")
-
-        if cancel_sorting:
-            messagebox.showinfo("Annulé", "Le tri des fichiers a été annulé.")
-        else:
-            messagebox.showinfo("Terminé", "Le tri des fichiers est terminé !")
+        root.after(GUI_POLL_INTERVAL, poll_messages, messages)
 
 
 def load_tk():
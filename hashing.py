@@ -0,0 +1,43 @@
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path, algorithm="sha1"):
+    """
+    Returns the hexadecimal digest of the content of a file.
+
+    Args:
+        path (str): The path of the file.
+        algorithm (str, optional): The `hashlib` algorithm. Defaults to "sha1".
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def partial_digest(path, size, block_size=64 * 1024, algorithm="sha1"):
+    """
+    Returns the hexadecimal digest of the first and last blocks of a file.
+
+    Args:
+        path (str): The path of the file.
+        size (int): The size of the file.
+        block_size (int, optional): The size of the hashed blocks. Defaults to 64 KB.
+        algorithm (str, optional): The `hashlib` algorithm. Defaults to "sha1".
+
+    Returns:
+        str: The hexadecimal digest, the one of the whole content if the file is smaller than two blocks.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file:
+        digest.update(file.read(block_size))
+        if size > 2 * block_size:
+            file.seek(size - block_size)
+        digest.update(file.read(block_size))
+    return digest.hexdigest()
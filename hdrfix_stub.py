@@ -0,0 +1,58 @@
+"""
+Stand-in for `hdrfix.exe` used by the tests: `python hdrfix_stub.py SRC DST`.
+
+Copies SRC to DST, or exits with code 1 when the name of SRC contains "corrupt". The process dies
+without answering when the name of SRC contains "crash".
+
+With `python hdrfix_stub.py --worker`, it stays alive and speaks the protocol of
+`conversion.WorkerConverter`: one JSON request per line on stdin, one JSON reply per line on
+stdout, until stdin is closed.
+"""
+
+import json
+import os
+import shutil
+import sys
+
+
+def convert(src_path, dst_path):
+    if "crash" in src_path:
+        os._exit(3)
+    if "corrupt" in src_path:
+        return 1, f"hdrfix: cannot decode {src_path}"
+    shutil.copyfile(src_path, dst_path)
+    return 0, ""
+
+
+def serve(requests, replies):
+    # The state kept between two jobs, like the decoder of a real converter.
+    converted = 0
+    for line in requests:
+        request = json.loads(line)
+        if request.get("ping"):
+            reply = {"id": request["id"], "pong": True, "converted": converted}
+        else:
+            results = []
+            for src_path, dst_path in request["jobs"]:
+                try:
+                    results.append(convert(src_path, dst_path))
+                except OSError as error:
+                    results.append((1, f"hdrfix: {error}"))
+                converted += 1
+            reply = {"id": request["id"], "results": results}
+        replies.write(json.dumps(reply) + "\n")
+        replies.flush()
+    return 0
+
+
+def main(argv):
+    if argv[1:] == ["--worker"]:
+        return serve(sys.stdin, sys.stdout)
+    returncode, message = convert(argv[1], argv[2])
+    if message:
+        print(message)
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,296 @@
+import json
+import os
+import threading
+import time
+
+from mover import move_file
+
+JOURNAL_FILENAME = ".sort_journal.jsonl"
+
+
+class Journal:
+    """
+    Appends every move and conversion of the sorting operations to a JSON lines file.
+
+    Each record is written before the operation it describes and flushed to the OS right away,
+    so a crashed or cancelled run can be resumed or undone. The records only reach the disk with
+    `os.fsync` every `sync_every` records or `sync_interval` seconds, which keeps the overhead low.
+
+    Args:
+        path (str): The path of the journal file.
+        sync_every (int, optional): The number of records between two fsyncs. Defaults to 256.
+        sync_interval (float, optional): The maximum number of seconds between two fsyncs. Defaults to 1.
+    """
+
+    def __init__(self, path, sync_every=256, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def open(cls, dst_folder, **options):
+        """
+        Opens the journal of the specified destination folder.
+
+        Args:
+            dst_folder (str): The path of the destination folder.
+            **options: The other arguments of `Journal`.
+
+        Returns:
+            Journal: The journal, new records are appended to the existing ones.
+        """
+        return cls(os.path.join(dst_folder, JOURNAL_FILENAME), **options)
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if (
+                self._pending >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval
+            ):
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def begin(self, src_folder, dst_folder):
+        """
+        Records the start of a sorting operation.
+
+        Args:
+            src_folder (str or list): The path of the source folder, or the paths of the source folders.
+            dst_folder (str): The path of the destination folder.
+        """
+        self._write(
+            {"op": "begin", "src": src_folder, "dst": dst_folder, "time": time.time()}
+        )
+
+    def end(self, status="done"):
+        """
+        Records the end of a sorting operation and writes the journal to the disk.
+
+        Args:
+            status (str, optional): How the operation ended. Defaults to "done".
+        """
+        self._write({"op": "end", "status": status, "time": time.time()})
+        with self._lock:
+            self._sync()
+
+    def move(self, src_path, dst_path):
+        """
+        Records a move, before it happens.
+
+        Args:
+            src_path (str): The path of the file in the source folder.
+            dst_path (str): The path of the file in the destination folder.
+        """
+        self._write({"op": "move", "src": src_path, "dst": dst_path})
+
+    def link(self, src_path, dst_path):
+        """
+        Records a link to a file left in the source folder, before it is created.
+
+        Args:
+            src_path (str): The path of the file in the source folder.
+            dst_path (str): The path of the link in the destination folder.
+        """
+        self._write({"op": "link", "src": src_path, "dst": dst_path})
+
+    def queued(self, src_path, dst_path):
+        """
+        Records a conversion waiting to be done.
+
+        Args:
+            src_path (str): The path of the JXR file.
+            dst_path (str): The path of the converted PNG file.
+        """
+        self._write({"op": "queue", "src": src_path, "dst": dst_path})
+
+    def converted(self, src_path, dst_path, returncode, cached=False):
+        """
+        Records a finished conversion.
+
+        Args:
+            src_path (str): The path of the JXR file.
+            dst_path (str): The path of the converted PNG file.
+            returncode (int or None): The exit code of the converter, `None` if it could not run.
+            cached (bool, optional): Whether the conversion was skipped because it was up to date. Defaults to False.
+        """
+        record = {"op": "convert", "src": src_path, "dst": dst_path, "code": returncode}
+        if cached:
+            record["cached"] = True
+        self._write(record)
+
+    def close(self):
+        """
+        Writes the journal to the disk and closes it.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+
+def read_journal(path):
+    """
+    Reads the records of a journal, ignoring a last line cut by a crash.
+
+    Args:
+        path (str): The path of the journal file.
+
+    Returns:
+        list: The records, in the order they were written.
+    """
+    records = []
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+    except OSError:
+        pass
+    return records
+
+
+def pending_conversions(records):
+    """
+    Returns the conversions that were queued but never finished.
+
+    A conversion that finished is not resumed even if it failed, so a broken JXR is not converted
+    again by every sort, and neither are the conversions of a run that ended with "done".
+
+    Args:
+        records (list): The records of a journal.
+
+    Returns:
+        list: The `(src_path, dst_path)` of the conversions to resume.
+    """
+    pending = {}
+    for record in records:
+        op = record.get("op")
+        key = (record.get("src"), record.get("dst"))
+        if op == "queue":
+            pending[key] = True
+        elif op == "convert":
+            pending.pop(key, None)
+        elif op == "end" and record.get("status") == "done":
+            pending.clear()
+    return list(pending)
+
+
+def compact_journal(path):
+    """
+    Rewrites a journal without the records that are no longer needed, once a run ended cleanly.
+
+    The records of the finished conversions are only kept when they were skipped as up to date,
+    which `undo_journal` needs to keep their output. The moves, links and queued conversions are
+    all kept, so the journal can still be undone. The file is replaced atomically.
+
+    Args:
+        path (str): The path of the journal file.
+
+    Returns:
+        int: The number of removed records, 0 if the journal could not be rewritten.
+    """
+    records = read_journal(path)
+    kept = [
+        record
+        for record in records
+        if record.get("op") != "convert" or record.get("cached")
+    ]
+    if len(kept) == len(records):
+        return 0
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            for record in kept:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except OSError:
+        # The journal is left as it was, it is only bigger.
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return 0
+    return len(records) - len(kept)
+
+
+def undo_journal(dst_folder, update_progress=None):
+    """
+    Puts back every file moved by the sorting operations of a journal and deletes their conversions.
+
+    The moves are replayed in reverse order. A move is only undone when its file is still at its
+    destination and its source path is free. A link is removed when it is a symlink or still the
+    same file as its source, so a file whose source was deleted since is kept. The conversions
+    skipped because they were already up to date are kept. The journal is removed once everything
+    is undone.
+
+    Args:
+        dst_folder (str): The path of the destination folder holding the journal.
+        update_progress (function, optional): Called with `(current, total)` after every move.
+
+    Returns:
+        tuple: The number of restored files and removed links, and the list of the `(src_path, dst_path)`
+            that could not be restored.
+    """
+    path = os.path.join(dst_folder, JOURNAL_FILENAME)
+    records = read_journal(path)
+    moves = [record for record in records if record.get("op") in ("move", "link")]
+    queued = {record.get("dst") for record in records if record.get("op") == "queue"}
+    cached = {record["dst"] for record in records if record.get("cached")}
+
+    restored = 0
+    skipped = []
+    for current, record in enumerate(reversed(moves), start=1):
+        src_path, dst_path = record["src"], record["dst"]
+        if record.get("op") == "link":
+            try:
+                if os.path.islink(dst_path) or os.path.samefile(src_path, dst_path):
+                    os.remove(dst_path)
+                    restored += 1
+                else:
+                    skipped.append((src_path, dst_path))
+            except OSError:
+                if os.path.lexists(dst_path):
+                    skipped.append((src_path, dst_path))
+        elif os.path.exists(dst_path) and not os.path.exists(src_path):
+            try:
+                os.makedirs(os.path.dirname(src_path), exist_ok=True)
+                move_file(dst_path, src_path)
+                restored += 1
+            except OSError:
+                skipped.append((src_path, dst_path))
+        elif not os.path.exists(src_path):
+            skipped.append((src_path, dst_path))
+        if update_progress:
+            update_progress(current, len(moves))
+
+    # After the links, so the links to the conversions are still the same files as them.
+    for conv_path in queued - cached:
+        try:
+            os.remove(conv_path)
+        except OSError:
+            pass
+
+    if not skipped:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return restored, skipped
@@ -0,0 +1,169 @@
+import os
+import re
+import time
+
+from conversion import CONVERSION_CACHE_FILENAME, ConversionCache
+
+LAYOUTS = ("flat", "date")
+# The date of the `dd_mm_yyyy hh_mm_ss` timestamp removed by `clean_filename`.
+CAPTURE_DATE_PATTERN = re.compile(r"(?<!\d)(\d{1,2})_(\d{1,2})_(\d{4}|\d{2})(?!\d)")
+
+
+def capture_date(filename):
+    """
+    Returns the year and month of the timestamp of a capture name.
+
+    The timestamp is read as `dd_mm_yyyy`, or as `mm_dd_yyyy` when the day cannot be a month.
+
+    Args:
+        filename (str): The name of the file.
+
+    Returns:
+        tuple or None: The year and month, `None` if the name has no valid timestamp.
+    """
+    match = CAPTURE_DATE_PATTERN.search(filename)
+    if not match:
+        return None
+
+    day, month, year = (int(part) for part in match.groups())
+    if month > 12 and day <= 12:
+        day, month = month, day
+    if not 1 <= month <= 12 or not 1 <= day <= 31:
+        return None
+    if year < 100:
+        year += 2000
+    return year, month
+
+
+def layout_subfolders(filename, path=None, layout="flat"):
+    """
+    Returns the subfolders a capture goes to inside its `PNG`, `JXR` or `Conv` folder.
+
+    Args:
+        filename (str): The name of the file.
+        path (str, optional): The current path of the file, its modification time is used when its name has no timestamp.
+        layout (str, optional): "flat" for no subfolder, "date" for `YYYY/MM` subfolders. Defaults to "flat".
+
+    Returns:
+        tuple: The names of the subfolders, empty for the flat layout.
+    """
+    if layout == "flat":
+        return ()
+
+    date = capture_date(filename)
+    if date is None:
+        try:
+            mtime = os.stat(path).st_mtime if path else time.time()
+        except OSError:
+            mtime = time.time()
+        date = time.localtime(mtime)[:2]
+    return f"{date[0]:04d}", f"{date[1]:02d}"
+
+
+def _library_files(folder):
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        for name in sorted(files):
+            if not name.startswith("."):
+                yield os.path.join(root, name)
+
+
+def plan_migration(dst_folder, layout="date"):
+    """
+    Works out where every file of a sorted folder goes in the specified layout.
+
+    The conversions follow the folder of their JXR file when it is found, so both always end up
+    in the same month.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        layout (str, optional): The new layout, "date" or "flat". Defaults to "date".
+
+    Returns:
+        list: The `(src_path, dst_path)` of every file that is not already at its place.
+    """
+    moves = []
+    with os.scandir(dst_folder) as entries:
+        games = sorted(
+            entry.path
+            for entry in entries
+            if entry.is_dir() and not entry.name.startswith(".")
+        )
+
+    for game_folder in games:
+        jxr_subfolders = {}
+        for subfolder in ("JXR", "PNG", "Conv"):
+            root = os.path.join(game_folder, subfolder)
+            if not os.path.isdir(root):
+                continue
+            for path in _library_files(root):
+                filename = os.path.basename(path)
+                stem = os.path.splitext(filename)[0]
+                parts = None
+                if subfolder == "Conv" and stem.endswith("-sdr"):
+                    parts = jxr_subfolders.get(stem[: -len("-sdr")])
+                if parts is None:
+                    parts = layout_subfolders(filename, path, layout)
+                if subfolder == "JXR":
+                    jxr_subfolders[stem] = parts
+                new_path = os.path.join(root, *parts, filename)
+                if new_path != path:
+                    moves.append((path, new_path))
+    return moves
+
+
+def _remove_empty_folders(folders, dst_folder):
+    for folder in sorted(folders, key=len, reverse=True):
+        while len(os.path.relpath(folder, dst_folder).split(os.sep)) > 2:
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+            folder = os.path.dirname(folder)
+
+
+def migrate_layout(dst_folder, layout="date", journal=None, update_progress=None):
+    """
+    Moves the files of a sorted folder to the specified layout, in a single batched pass.
+
+    Every move is planned first, then every new folder is created at once and the files are renamed.
+    The emptied folders are removed and the conversion cache follows the moved files, so nothing has
+    to be converted again.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        layout (str, optional): The new layout, "date" or "flat". Defaults to "date".
+        journal (Journal, optional): Records every move, so the migration can be undone.
+        update_progress (function, optional): Called with `(current, total)` after every file.
+
+    Returns:
+        tuple: The number of moved files and the list of the `(src_path, dst_path)` that could not be moved.
+    """
+    dst_folder = os.path.abspath(dst_folder)
+    moves = plan_migration(dst_folder, layout)
+    for folder in sorted({os.path.dirname(new_path) for _, new_path in moves}):
+        os.makedirs(folder, exist_ok=True)
+
+    moved = {}
+    skipped = []
+    for current, (path, new_path) in enumerate(moves, start=1):
+        if os.path.exists(new_path):
+            skipped.append((path, new_path))
+        else:
+            if journal is not None:
+                journal.move(path, new_path)
+            try:
+                os.rename(path, new_path)
+                moved[path] = new_path
+            except OSError:
+                skipped.append((path, new_path))
+        if update_progress:
+            update_progress(current, len(moves))
+
+    _remove_empty_folders({os.path.dirname(path) for path in moved}, dst_folder)
+
+    if moved and os.path.exists(os.path.join(dst_folder, CONVERSION_CACHE_FILENAME)):
+        cache = ConversionCache.load(dst_folder)
+        cache.relocate(moved)
+        cache.save()
+    return len(moved), skipped
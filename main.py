@@ -1,4 +1,3 @@
-from gui import load_tk
 from args import check_args, parse_args
 
 
@@ -9,12 +8,15 @@ def main():
     Calls the `check_args` function if the script is run with command line arguments.
 
     Calls the `build_gui` function if the script is run without command line arguments.
+    The gui is only imported then, so the headless runs never load tkinter and the themes.
     """
     args = parse_args()
 
     if args:
         check_args(args)
     else:
+        from gui import load_tk
+
         load_tk()
 
 
@@ -0,0 +1,352 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+REPORT_VERSION = 1
+# The upper bounds of the latency histograms, in seconds.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+STAGES = ("scan", "names", "match", "mkdir", "move", "convert")
+PROMETHEUS_PREFIX = "games_captures"
+
+
+class Histogram:
+    """
+    Counts the observed values in fixed buckets, like a Prometheus histogram.
+
+    Args:
+        buckets (tuple, optional): The sorted upper bounds of the buckets. Defaults to `LATENCY_BUCKETS`.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Returns the number of values lower than or equal to every bound, the last bound being infinity.
+
+        Returns:
+            list: The `(bound, count)` of every bucket.
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class StageMetrics:
+    """
+    The counters of one stage of a run.
+
+    `expected` is the number of bytes known to be coming to the stage, so the remaining work can be
+    estimated while the source folder is still being scanned.
+
+    Args:
+        name (str): The name of the stage.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.expected = 0
+        self.skipped = 0
+        self.first = None
+        self.last = None
+        self.latency = Histogram()
+
+    def rate(self):
+        """
+        Returns the measured throughput of the stage, between its first and its last item.
+
+        The wall time is used rather than the sum of the latencies, so the stages running on several
+        workers get their real throughput.
+
+        Returns:
+            float: The bytes per second, 0 if it cannot be measured yet.
+        """
+        if not self.bytes or self.first is None or self.last <= self.first:
+            return 0.0
+        return self.bytes / (self.last - self.first)
+
+    def remaining(self):
+        return max(0, self.expected - self.bytes)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 6),
+            "skipped": self.skipped,
+            "bytes_per_second": round(self.rate(), 1),
+            "latency": {
+                "buckets": [
+                    [bound if bound != float("inf") else "+Inf", count]
+                    for bound, count in self.latency.cumulative()
+                ],
+                "sum": round(self.latency.sum, 6),
+                "count": self.latency.count,
+            },
+        }
+
+
+class RunMetrics:
+    """
+    Collects the counts, bytes, latencies and converter exit codes of every stage of a run.
+
+    The methods can be called from any thread. The report is written as JSON by `write_json` and in
+    the Prometheus text format by `write_prometheus`, for the textfile collector of node_exporter.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.ended = None
+        self.status = None
+        self.exit_codes = Counter()
+        self._stages = {name: StageMetrics(name) for name in STAGES}
+        self._start = time.perf_counter()
+        self._duration = None
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """
+        Returns the counters of a stage, created on first use.
+
+        Args:
+            name (str): The name of the stage.
+
+        Returns:
+            StageMetrics: The counters of the stage.
+        """
+        with self._lock:
+            if name not in self._stages:
+                self._stages[name] = StageMetrics(name)
+            return self._stages[name]
+
+    def observe(self, name, seconds, size=0, count=1):
+        """
+        Records `count` items processed by a stage in `seconds`.
+
+        Args:
+            name (str): The name of the stage.
+            seconds (float): The time spent on the items.
+            size (int, optional): The number of bytes of the items. Defaults to 0.
+            count (int, optional): The number of items. Defaults to 1.
+        """
+        stage = self.stage(name)
+        now = time.perf_counter()
+        with self._lock:
+            stage.count += count
+            stage.bytes += size
+            stage.seconds += seconds
+            stage.latency.observe(seconds)
+            if stage.first is None:
+                stage.first = now - seconds
+            stage.last = now
+
+    @contextmanager
+    def timer(self, name, size=0, count=1):
+        """
+        Times the block it wraps and records it with `observe`.
+
+        Args:
+            name (str): The name of the stage.
+            size (int, optional): The number of bytes processed by the block. Defaults to 0.
+            count (int, optional): The number of items processed by the block. Defaults to 1.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, size, count)
+
+    def expect(self, name, size):
+        """
+        Records bytes that a stage will have to process.
+
+        Args:
+            name (str): The name of the stage.
+            size (int): The number of bytes.
+        """
+        stage = self.stage(name)
+        with self._lock:
+            stage.expected += size
+
+    def skip(self, name, size=0):
+        """
+        Records an item a stage did not have to process, like an up to date conversion.
+
+        Args:
+            name (str): The name of the stage.
+            size (int, optional): The number of bytes that were expected for the item. Defaults to 0.
+        """
+        stage = self.stage(name)
+        with self._lock:
+            stage.skipped += 1
+            stage.expected -= size
+
+    def exit_code(self, code):
+        """
+        Records the exit code of a converter process, `None` if it could not be started.
+
+        Args:
+            code (int or None): The exit code.
+        """
+        with self._lock:
+            self.exit_codes["error" if code is None else str(code)] += 1
+
+    def eta(self):
+        """
+        Estimates the time left from the bytes left and the measured throughput of every stage.
+
+        The stages run at the same time, so the run ends with the slowest one.
+
+        Returns:
+            float or None: The seconds left, `None` if no stage has a measured throughput yet.
+        """
+        estimates = []
+        with self._lock:
+            for stage in self._stages.values():
+                rate = stage.rate()
+                if stage.expected and rate:
+                    estimates.append(stage.remaining() / rate)
+        return max(estimates) if estimates else None
+
+    def finish(self, status):
+        """
+        Marks the end of the run.
+
+        Args:
+            status (str): "done", "cancelled" or "failed".
+        """
+        self.ended = time.time()
+        self.status = status
+        self._duration = time.perf_counter() - self._start
+
+    def duration(self):
+        if self.ended is not None:
+            return self._duration
+        return time.perf_counter() - self._start
+
+    def as_dict(self):
+        """
+        Returns the report of the run.
+
+        Returns:
+            dict: The status, times, exit codes and counters of every stage.
+        """
+        with self._lock:
+            return {
+                "version": REPORT_VERSION,
+                "status": self.status,
+                "started": self.started,
+                "ended": self.ended,
+                "duration": round(self.duration(), 6),
+                "exit_codes": dict(self.exit_codes),
+                "stages": {
+                    name: stage.as_dict() for name, stage in self._stages.items()
+                },
+            }
+
+    def write_json(self, path):
+        """
+        Writes the report of the run as JSON.
+
+        Args:
+            path (str): The path of the report.
+        """
+        _write_atomic(
+            path, json.dumps(self.as_dict(), ensure_ascii=False, indent=1) + "\n"
+        )
+
+    def prometheus_lines(self):
+        """
+        Returns the report of the run in the Prometheus text format.
+
+        Returns:
+            list: The lines of the report.
+        """
+        prefix = PROMETHEUS_PREFIX
+        report = self.as_dict()
+        stages = report["stages"]
+        lines = [
+            f"# HELP {prefix}_run_timestamp_seconds End of the last sorting run.",
+            f"# TYPE {prefix}_run_timestamp_seconds gauge",
+            f"{prefix}_run_timestamp_seconds {report['ended'] or time.time():.3f}",
+            f"# HELP {prefix}_run_duration_seconds Duration of the last sorting run.",
+            f"# TYPE {prefix}_run_duration_seconds gauge",
+            f"{prefix}_run_duration_seconds {report['duration']}",
+            f"# HELP {prefix}_run_status Status of the last sorting run.",
+            f"# TYPE {prefix}_run_status gauge",
+        ]
+        for status in ("done", "cancelled", "failed"):
+            value = int(report["status"] == status)
+            lines.append(f'{prefix}_run_status{{status="{status}"}} {value}')
+
+        for metric, key, help_text in (
+            ("stage_items", "count", "Items processed by each stage."),
+            ("stage_bytes", "bytes", "Bytes processed by each stage."),
+            ("stage_skipped_items", "skipped", "Items skipped by each stage."),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for name, stage in stages.items():
+                lines.append(f'{prefix}_{metric}{{stage="{name}"}} {stage[key]}')
+
+        lines.append(
+            f"# HELP {prefix}_stage_latency_seconds Latency of the items of each stage."
+        )
+        lines.append(f"# TYPE {prefix}_stage_latency_seconds histogram")
+        for name, stage in stages.items():
+            for bound, count in stage["latency"]["buckets"]:
+                lines.append(
+                    f'{prefix}_stage_latency_seconds_bucket{{stage="{name}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'{prefix}_stage_latency_seconds_sum{{stage="{name}"}} {stage["latency"]["sum"]}'
+            )
+            lines.append(
+                f'{prefix}_stage_latency_seconds_count{{stage="{name}"}} {stage["latency"]["count"]}'
+            )
+
+        lines.append(
+            f"# HELP {prefix}_conversion_exit_codes Exit codes of the converter processes."
+        )
+        lines.append(f"# TYPE {prefix}_conversion_exit_codes gauge")
+        for code, count in sorted(report["exit_codes"].items()):
+            lines.append(f'{prefix}_conversion_exit_codes{{code="{code}"}} {count}')
+        return lines
+
+    def write_prometheus(self, path):
+        """
+        Writes the report of the run in the Prometheus text format.
+
+        The file is replaced at once, so the textfile collector never reads half of it.
+
+        Args:
+            path (str): The path of the file, ending with `.prom` for the textfile collector.
+        """
+        _write_atomic(path, "\n".join(self.prometheus_lines()) + "\n")
+
+
+def _write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,395 @@
+import errno
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+from hashing import file_digest
+
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+# The copies waiting for a copy thread, per pair of devices.
+MAX_PENDING_COPIES = 1024
+
+
+# The errors meaning a kernel copy is not supported between these two files.
+FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSOCK,
+}
+
+
+def _copy_file_range(src_fd, dst_fd, count):
+    return os.copy_file_range(src_fd, dst_fd, count)
+
+
+def _sendfile(src_fd, dst_fd, count):
+    return os.sendfile(dst_fd, src_fd, None, count)
+
+
+def _read_write(src_fd, dst_fd, count):
+    data = os.read(src_fd, count)
+    view = memoryview(data)
+    while view:
+        view = view[os.write(dst_fd, view) :]
+    return len(data)
+
+
+def _kernel_copy(src_fd, dst_fd, size):
+    """
+    Copies `size` bytes between two file descriptors, from and to their current positions.
+
+    Uses `os.copy_file_range`, which lets the filesystem share or copy the blocks itself, then
+    `os.sendfile`, which copies them inside the kernel, and falls back to plain reads and writes
+    when the OS or the filesystems support neither, or when a method stops before the end.
+
+    Raises:
+        OSError: If fewer than `size` bytes could be copied, like when the source was truncated.
+    """
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(_copy_file_range)
+    if sys.platform.startswith("linux"):
+        methods.append(_sendfile)
+    methods.append(_read_write)
+
+    copied = 0
+    for method in methods:
+        chunk_size = COPY_CHUNK_SIZE if method is not _read_write else READ_CHUNK_SIZE
+        try:
+            while copied < size:
+                count = method(src_fd, dst_fd, min(chunk_size, size - copied))
+                if not count:
+                    # Stopped early, the next method goes on from the same positions.
+                    break
+                copied += count
+        except OSError as error:
+            if method is _read_write or error.errno not in FALLBACK_ERRNOS:
+                raise
+        if copied >= size:
+            break
+    if copied != size:
+        raise OSError(errno.EIO, f"Copie incomplète : {copied} octet(s) sur {size}")
+    return copied
+
+
+def copy_file(src_path, dst_path):
+    """
+    Copies a file and its modification time with a kernel copy.
+
+    Args:
+        src_path (str): The path of the file to copy.
+        dst_path (str): The path of the copy.
+
+    Returns:
+        int: The number of copied bytes.
+    """
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        size = os.fstat(src.fileno()).st_size
+        copied = _kernel_copy(src.fileno(), dst.fileno(), size)
+    shutil.copystat(src_path, dst_path)
+    return copied
+
+
+def _copy_and_replace(src_path, dst_path, verify=False):
+    part_path = dst_path + ".part"
+    try:
+        copied = copy_file(src_path, part_path)
+        src_size, part_size = os.stat(src_path).st_size, os.stat(part_path).st_size
+        if part_size != src_size:
+            raise OSError(
+                errno.EIO,
+                f"La copie fait {part_size} octet(s) au lieu de {src_size}",
+                src_path,
+            )
+        if verify and file_digest(src_path, "blake2b") != file_digest(
+            part_path, "blake2b"
+        ):
+            raise OSError(
+                errno.EIO, "La copie ne correspond pas à l'original", src_path
+            )
+        os.replace(part_path, dst_path)
+    except BaseException:
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+        raise
+    os.remove(src_path)
+    return copied
+
+
+def move_file(src_path, dst_path, verify=False):
+    """
+    Moves a file with `os.rename`, or copies it then deletes it when it changes filesystem.
+
+    Args:
+        src_path (str): The path of the file to move.
+        dst_path (str): Its new path, its folder must exist.
+        verify (bool, optional): Whether to compare the checksums of the source and the copy. Defaults to False.
+    """
+    try:
+        os.rename(src_path, dst_path)
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+        _copy_and_replace(src_path, dst_path, verify)
+
+
+# The errors meaning the filesystem does not support hardlinks, like FAT32 and exFAT.
+HARDLINK_FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EACCES,
+    errno.EMLINK,
+    errno.EOPNOTSUPP,
+    errno.ENOSYS,
+}
+
+
+def link_file(src_path, dst_path, symbolic=False):
+    """
+    Links a file at a new path and leaves it in place, replacing what is at that path.
+
+    The link is created next to its destination then renamed in place, so sorting again into
+    the same folder replaces the previous links, or keeps them when they already link the file.
+
+    Args:
+        src_path (str): The path of the file to link.
+        dst_path (str): The path of the link, its folder must exist.
+        symbolic (bool, optional): Whether to create a symlink to the absolute path of the file
+            instead of a hardlink. Defaults to False.
+    """
+    try:
+        if symbolic:
+            if os.readlink(dst_path) == os.path.abspath(src_path):
+                return
+        elif not os.path.islink(dst_path) and os.path.samefile(src_path, dst_path):
+            # Renaming a hardlink over another link of the same file does nothing.
+            return
+    except OSError:
+        pass
+
+    part_path = dst_path + ".part"
+    try:
+        os.remove(part_path)
+    except FileNotFoundError:
+        pass
+    if symbolic:
+        os.symlink(os.path.abspath(src_path), part_path)
+    else:
+        os.link(src_path, part_path)
+    try:
+        os.replace(part_path, dst_path)
+    except BaseException:
+        os.remove(part_path)
+        raise
+
+
+class MoveEngine:
+    """
+    Moves files with `os.rename` when possible, and copies them across filesystems otherwise.
+
+    Copies between two devices run in the background. Each pair of devices has its own queue and
+    `streams_per_device` copy threads, and at most `streams_per_device` copies read from the same
+    device at the same time, so a slow HDD is not flooded with random I/O and the copies from a
+    fast SSD are not held back behind those of the HDD. `move` only waits when `max_pending`
+    copies are already queued for the same pair.
+    A copy is written next to its destination, optionally verified by checksum, renamed in place,
+    and only then is the source deleted.
+
+    Args:
+        streams_per_device (int, optional): The number of parallel copies per device. Defaults to 2.
+        verify (bool, optional): Whether to compare the checksums of the source and the copy. Defaults to False.
+        max_pending (int, optional): The number of copies queued per pair of devices. Defaults to 1024.
+    """
+
+    def __init__(
+        self, streams_per_device=2, verify=False, max_pending=MAX_PENDING_COPIES
+    ):
+        self.streams_per_device = max(1, streams_per_device)
+        self.verify = verify
+        self.max_pending = max(1, max_pending)
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.copy_time = 0.0
+        self._devices = {}
+        self._slots = {}
+        self._queues = {}
+        self._threads = []
+        self._pending = 0
+        self._errors = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def _device(self, path):
+        folder = os.path.dirname(os.path.abspath(path))
+        device = self._devices.get(folder)
+        if device is None:
+            device = os.stat(folder).st_dev
+            self._devices[folder] = device
+        return device
+
+    def _queue(self, devices):
+        with self._lock:
+            copies = self._queues.get(devices)
+            if copies is None:
+                slot = self._slots.setdefault(
+                    devices[0], threading.BoundedSemaphore(self.streams_per_device)
+                )
+                copies = self._queues[devices] = queue.Queue(self.max_pending)
+                for _ in range(self.streams_per_device):
+                    thread = threading.Thread(
+                        target=self._run,
+                        args=(copies, slot),
+                        name="copy",
+                        daemon=True,
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+            return copies
+
+    def move(self, src_path, dst_path, on_done=None):
+        """
+        Moves a file, in the background when it has to be copied to another device.
+
+        Args:
+            src_path (str): The path of the file to move.
+            dst_path (str): Its new path, its folder must exist.
+            on_done (function, optional): Called once the file is at its new path.
+        """
+        src_device = self._device(src_path)
+        dst_device = self._device(dst_path)
+        if src_device == dst_device:
+            try:
+                os.rename(src_path, dst_path)
+                if on_done:
+                    on_done()
+                return
+            except OSError as error:
+                if error.errno != errno.EXDEV:
+                    raise
+
+        self.raise_errors()
+        copies = self._queue((src_device, dst_device))
+        with self._lock:
+            self._pending += 1
+        copies.put((src_path, dst_path, on_done))
+
+    def _run(self, copies, slot):
+        while True:
+            task = copies.get()
+            if task is None:
+                return
+            try:
+                with slot:
+                    self._copy(*task)
+            finally:
+                with self._idle:
+                    self._pending -= 1
+                    if not self._pending:
+                        self._idle.notify_all()
+
+    def _copy(self, src_path, dst_path, on_done):
+        try:
+            start = time.perf_counter()
+            copied = _copy_and_replace(src_path, dst_path, self.verify)
+            with self._lock:
+                self.copied_files += 1
+                self.copied_bytes += copied
+                self.copy_time += time.perf_counter() - start
+            if on_done:
+                on_done()
+        except BaseException as error:
+            with self._lock:
+                self._errors.append(error)
+
+    def raise_errors(self):
+        """
+        Raises the first error of the background copies, if any.
+        """
+        with self._lock:
+            if self._errors:
+                raise self._errors[0]
+
+    def join(self):
+        """
+        Waits for every background copy and raises the first of their errors.
+        """
+        with self._idle:
+            while self._pending:
+                self._idle.wait()
+        self.raise_errors()
+
+    def close(self):
+        """
+        Waits for the background copies and stops the copy threads.
+        """
+        with self._lock:
+            queues, self._queues = list(self._queues.values()), {}
+            threads, self._threads = self._threads, []
+        for copies in queues:
+            for _ in range(self.streams_per_device):
+                copies.put(None)
+        for thread in threads:
+            thread.join()
+
+    def throughput(self):
+        """
+        Returns the average copy speed.
+
+        Returns:
+            float: The number of megabytes copied per second of copy, 0 if nothing was copied.
+        """
+        with self._lock:
+            if not self.copy_time:
+                return 0.0
+            return self.copied_bytes / self.copy_time / (1024 * 1024)
+
+
+class LinkEngine(MoveEngine):
+    """
+    Links the files at their new paths instead of moving them, so the source folder is left
+    untouched and sorting only costs metadata operations.
+
+    A file gets a hardlink when its destination is on the same device, or when the filesystem does
+    not support hardlinks, a symlink to its absolute path. Nothing is copied, so it is used in
+    place of a `MoveEngine` and never runs in the background.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.hardlinks = 0
+        self.symlinks = 0
+
+    def move(self, src_path, dst_path, on_done=None):
+        """
+        Links a file at its new path.
+
+        Args:
+            src_path (str): The path of the file to link.
+            dst_path (str): The path of the link, its folder must exist.
+            on_done (function, optional): Called once the link is created.
+        """
+        symbolic = self._device(src_path) != self._device(dst_path)
+        if not symbolic:
+            try:
+                link_file(src_path, dst_path)
+            except OSError as error:
+                if error.errno not in HARDLINK_FALLBACK_ERRNOS:
+                    raise
+                symbolic = True
+        if symbolic:
+            link_file(src_path, dst_path, symbolic=True)
+        with self._lock:
+            if symbolic:
+                self.symlinks += 1
+            else:
+                self.hardlinks += 1
+        if on_done:
+            on_done()
@@ -0,0 +1,225 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+StageStats = namedtuple(
+    "StageStats", ["name", "processed", "busy_time", "throughput", "queued"]
+)
+
+_DONE = object()
+
+
+class Stage:
+    """
+    A step of a `Pipeline`, run by its own thread.
+
+    The stage reads items from `inbox`, calls `function` on each of them and writes the
+    non-`None` results to `outbox`. The first stage has no inbox and iterates over `function()` instead.
+
+    Args:
+        name (str): The name of the stage, used in the statistics.
+        function (function): The function applied to every item.
+        inbox (queue.Queue or None): The queue the items are read from.
+        outbox (queue.Queue): The queue the results are written to.
+        batch_size (int, optional): When set, `function` is called with lists of up to `batch_size`
+            items already waiting in the inbox and returns the list of their results.
+    """
+
+    def __init__(self, name, function, inbox, outbox, batch_size=None):
+        self.name = name
+        self.function = function
+        self.inbox = inbox
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.processed = 0
+        self.busy_time = 0.0
+
+    def stats(self):
+        """
+        Returns the statistics of the stage.
+
+        Returns:
+            StageStats: The number of processed items, the time spent working, the items per second
+                of working time and the number of items waiting in front of the stage.
+        """
+        throughput = self.processed / self.busy_time if self.busy_time else 0.0
+        queued = self.inbox.qsize() if self.inbox is not None else 0
+        return StageStats(self.name, self.processed, self.busy_time, throughput, queued)
+
+
+class Pipeline:
+    """
+    Runs a chain of stages joined by bounded queues.
+
+    Every stage works at its own speed on its own thread; a full queue blocks the stage
+    in front of it, so memory stays bounded whatever the number of items.
+    The results of the last stage are returned to the caller by `run`.
+
+    Args:
+        source (function): Returns the iterable of items feeding the first stage.
+        maxsize (int, optional): The capacity of each queue. Defaults to 256.
+        cancel_event (threading.Event, optional): Cancels the pipeline when set, so another thread can stop it.
+    """
+
+    def __init__(self, source, maxsize=256, cancel_event=None):
+        self.maxsize = maxsize
+        self.cancel_event = threading.Event() if cancel_event is None else cancel_event
+        self.stages = []
+        self._errors = []
+        self._add("scan", source, None)
+
+    def _add(self, name, function, inbox, batch_size=None):
+        stage = Stage(name, function, inbox, queue.Queue(self.maxsize), batch_size)
+        self.stages.append(stage)
+        return stage
+
+    def add_stage(self, name, function, batch_size=None):
+        """
+        Appends a stage to the pipeline.
+
+        Args:
+            name (str): The name of the stage.
+            function (function): Called with each item, returns the item for the next stage or `None` to drop it.
+            batch_size (int, optional): Calls `function` with lists of waiting items instead, see `Stage`.
+
+        Returns:
+            Pipeline: The pipeline itself, so calls can be chained.
+        """
+        self._add(name, function, self.stages[-1].outbox, batch_size)
+        return self
+
+    def cancel(self):
+        """
+        Asks every stage to stop as soon as possible.
+        """
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def stats(self):
+        """
+        Returns the statistics of every stage.
+
+        Returns:
+            list: A `StageStats` per stage, in pipeline order.
+        """
+        return [stage.stats() for stage in self.stages]
+
+    def _put(self, box, item):
+        while not self.cancel_event.is_set():
+            try:
+                box.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, box):
+        while not self.cancel_event.is_set():
+            try:
+                return box.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _run_source(self, stage):
+        iterator = iter(stage.function())
+        while not self.cancel_event.is_set():
+            start = time.perf_counter()
+            item = next(iterator, _DONE)
+            stage.busy_time += time.perf_counter() - start
+            if item is _DONE:
+                break
+            stage.processed += 1
+            if not self._put(stage.outbox, item):
+                break
+
+    def _run_stage(self, stage):
+        while True:
+            item = self._get(stage.inbox)
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            result = stage.function(item)
+            stage.busy_time += time.perf_counter() - start
+            stage.processed += 1
+            if result is not None and not self._put(stage.outbox, result):
+                break
+
+    def _run_batch_stage(self, stage):
+        done = False
+        while not done:
+            item = self._get(stage.inbox)
+            if item is _DONE:
+                break
+            batch = [item]
+            while len(batch) < stage.batch_size:
+                try:
+                    item = stage.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+
+            start = time.perf_counter()
+            results = stage.function(batch)
+            stage.busy_time += time.perf_counter() - start
+            stage.processed += len(batch)
+            for result in results:
+                if result is not None and not self._put(stage.outbox, result):
+                    return
+
+    def _worker(self, stage):
+        try:
+            if stage.inbox is None:
+                self._run_source(stage)
+            elif stage.batch_size:
+                self._run_batch_stage(stage)
+            else:
+                self._run_stage(stage)
+        except BaseException as error:
+            self._errors.append(error)
+            self.cancel_event.set()
+        finally:
+            self._put(stage.outbox, _DONE)
+
+    def run(self):
+        """
+        Starts every stage and yields the results of the last one as they come.
+
+        Raises:
+            Exception: The first error raised by a stage, once every stage has stopped.
+
+        Yields:
+            object: The results of the last stage.
+        """
+        threads = [
+            threading.Thread(
+                target=self._worker, args=(stage,), name=stage.name, daemon=True
+            )
+            for stage in self.stages
+        ]
+        for thread in threads:
+            thread.start()
+
+        finished = False
+        try:
+            while True:
+                item = self._get(self.stages[-1].outbox)
+                if item is _DONE:
+                    break
+                yield item
+            finished = True
+        finally:
+            if not finished:
+                self.cancel_event.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
@@ -0,0 +1,300 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from conversion import conversion_path
+from mover import LinkEngine, move_file
+from layout import layout_subfolders
+
+PlanItem = namedtuple("PlanItem", ["src_path", "game_name", "dst_path", "conv_path"])
+PLAN_FIELDS = PlanItem._fields
+# What to do with the JXR of a capture that also has a PNG: convert it with the others, skip its
+# conversion, or convert it once every capture without PNG is converted.
+PAIRED_CONVERSIONS = ("convert", "skip", "defer")
+
+
+def make_plan_item(
+    src_folder, dst_folder, filename, game_name, do_convert, layout="flat"
+):
+    """
+    Returns the plan item of a file.
+
+    Args:
+        src_folder (str): The path of the source folder.
+        dst_folder (str): The path of the destination folder.
+        filename (str): The name of the file.
+        game_name (str): The name of its game.
+        do_convert (bool): Whether to convert the JXR images to PNG.
+        layout (str, optional): "flat", or "date" to add `YYYY/MM` subfolders. Defaults to "flat".
+
+    Returns:
+        PlanItem: Where the file goes, and where its conversion goes if it needs one.
+    """
+    src_path = os.path.join(src_folder, filename)
+    file_ext = os.path.splitext(filename)[1].lower()[1:]
+    subfolders = layout_subfolders(filename, src_path, layout)
+    dst_path = os.path.join(
+        dst_folder, game_name, file_ext.upper(), *subfolders, filename
+    )
+    conv_path = (
+        conversion_path(dst_folder, game_name, filename, subfolders)
+        if do_convert and file_ext == "jxr"
+        else None
+    )
+    return PlanItem(src_path, game_name, dst_path, conv_path)
+
+
+def has_acceptable_png(paths):
+    """
+    Returns whether a capture has a PNG that can stand in for the conversion of its JXR.
+
+    An empty PNG, as left by an interrupted capture, does not count.
+
+    Args:
+        paths (iterable): The paths of the files of the capture.
+
+    Returns:
+        bool: True if one of the files is a PNG that is not empty.
+    """
+    for path in paths:
+        if path.lower().endswith(".png"):
+            try:
+                if os.path.getsize(path):
+                    return True
+            except OSError:
+                continue
+    return False
+
+
+def plan_directories(plan):
+    """
+    Returns every folder the specified plan writes to.
+
+    Args:
+        plan (list): The `PlanItem` of the plan.
+
+    Returns:
+        list: The sorted paths of the folders.
+    """
+    directories = set()
+    for item in plan:
+        directories.add(os.path.dirname(item.dst_path))
+        if item.conv_path:
+            directories.add(os.path.dirname(item.conv_path))
+    return sorted(directories)
+
+
+class DirectoryCache:
+    """
+    Creates folders at most once, so moving a file does not cost an `os.path.exists` call.
+
+    Args:
+        metrics (RunMetrics, optional): Records the time spent creating folders in the "mkdir" stage.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self._created = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, path):
+        """
+        Creates the specified folder if it was not created or seen yet.
+
+        Args:
+            path (str): The path of the folder.
+        """
+        if path in self._created:
+            return
+        if self.metrics is None:
+            os.makedirs(path, exist_ok=True)
+        else:
+            with self.metrics.timer("mkdir"):
+                os.makedirs(path, exist_ok=True)
+        with self._lock:
+            self._created.add(path)
+
+    def ensure_plan(self, plan):
+        """
+        Creates every folder of the specified plan in a single pass.
+
+        Args:
+            plan (list): The `PlanItem` of the plan.
+        """
+        for path in plan_directories(plan):
+            self.ensure(path)
+
+
+def execute_item(
+    item, pool=None, directories=None, journal=None, mover=None, metrics=None
+):
+    """
+    Moves the file of a plan item and queues its conversion.
+
+    With a `LinkEngine` as `mover`, the file is linked at its new path and recorded as a link.
+
+    Args:
+        item (PlanItem): The item to execute.
+        pool (ConversionPool, optional): The pool converting the JXR images, the conversion is skipped if `None`.
+        directories (DirectoryCache, optional): The folders already created.
+        journal (Journal, optional): Records the move before it happens.
+        mover (MoveEngine, optional): Copies the file in the background when it changes device,
+            it is copied in place if `None`.
+        metrics (RunMetrics, optional): Records the size of the file and the time until it is at its new path,
+            in the "move" stage.
+    """
+    if directories is not None:
+        directories.ensure(os.path.dirname(item.dst_path))
+        if item.conv_path and pool is not None:
+            directories.ensure(os.path.dirname(item.conv_path))
+
+    if metrics is not None:
+        try:
+            size = os.path.getsize(item.src_path)
+        except OSError:
+            size = 0
+        start = time.perf_counter()
+
+    def done():
+        if metrics is not None:
+            metrics.observe("move", time.perf_counter() - start, size)
+        if item.conv_path and pool is not None:
+            pool.submit(item.dst_path, item.conv_path)
+
+    if journal is not None:
+        if isinstance(mover, LinkEngine):
+            journal.link(item.src_path, item.dst_path)
+        else:
+            journal.move(item.src_path, item.dst_path)
+    if mover is not None:
+        mover.move(item.src_path, item.dst_path, done)
+    else:
+        move_file(item.src_path, item.dst_path)
+        done()
+
+
+def execute_plan(
+    plan,
+    pool=None,
+    update_progress=None,
+    cancel_event=None,
+    journal=None,
+    mover=None,
+):
+    """
+    Creates the folders of a plan, then moves its files and queues their conversions.
+
+    Args:
+        plan (list): The `PlanItem` of the plan.
+        pool (ConversionPool, optional): The pool converting the JXR images, the conversions are skipped if `None`.
+        update_progress (function, optional): Called with `(current, total)` after every file.
+        cancel_event (threading.Event, optional): Stops the execution when set.
+        journal (Journal, optional): Records every move before it happens.
+        mover (MoveEngine, optional): Copies the files changing device in the background, it is joined.
+
+    Returns:
+        int: The number of executed items.
+    """
+    directories = DirectoryCache()
+    directories.ensure_plan(plan)
+
+    executed = len(plan)
+    for current, item in enumerate(plan, start=1):
+        if cancel_event is not None and cancel_event.is_set():
+            executed = current - 1
+            break
+        execute_item(item, pool, journal=journal, mover=mover)
+        if update_progress:
+            update_progress(current, len(plan))
+    if mover is not None:
+        mover.join()
+    return executed
+
+
+def export_plan(plan, path):
+    """
+    Saves a plan as JSON or CSV, depending on the extension of `path`.
+
+    Args:
+        plan (list): The `PlanItem` of the plan.
+        path (str): The path of the file, ending with `.json` or `.csv`.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(PLAN_FIELDS)
+            writer.writerows(
+                [item.src_path, item.game_name, item.dst_path, item.conv_path or ""]
+                for item in plan
+            )
+    else:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"items": [item._asdict() for item in plan]},
+                file,
+                ensure_ascii=False,
+                indent=1,
+            )
+
+
+def load_plan(path):
+    """
+    Loads a plan saved by `export_plan`.
+
+    Args:
+        path (str): The path of the JSON or CSV file.
+
+    Returns:
+        list: The `PlanItem` of the plan.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+    else:
+        with open(path, encoding="utf-8") as file:
+            rows = json.load(file)["items"]
+
+    return [
+        PlanItem(
+            row["src_path"], row["game_name"], row["dst_path"], row["conv_path"] or None
+        )
+        for row in rows
+    ]
+
+
+def plan_destination(plan):
+    """
+    Returns the destination folder of a plan, found from the paths of its files.
+
+    Args:
+        plan (list): The `PlanItem` of the plan.
+
+    Returns:
+        str or None: The path of the destination folder, `None` if the plan is empty.
+    """
+    for item in plan:
+        # `dst_folder/game_name/EXT/...`, the `EXT` folder being the first one under the game.
+        folder = os.path.dirname(item.dst_path)
+        while os.path.dirname(folder) != folder:
+            game_folder = os.path.dirname(folder)
+            if os.path.basename(game_folder) == item.game_name:
+                return os.path.dirname(game_folder)
+            folder = game_folder
+    return None
+
+
+def plan_sources(plan):
+    """
+    Returns the source folders of a plan.
+
+    Args:
+        plan (list): The `PlanItem` of the plan.
+
+    Returns:
+        str or list: The path of the source folder, or the paths of the source folders.
+    """
+    folders = list(dict.fromkeys(os.path.dirname(item.src_path) for item in plan))
+    return folders[0] if len(folders) == 1 else folders
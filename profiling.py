@@ -0,0 +1,219 @@
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter, namedtuple
+
+# cProfile and pstats are imported on use, every command line run imports this module.
+DEFAULT_PROFILE_PATH = "games_captures.prof"
+# The delay between two memory snapshots, the largest one is kept to describe the peak.
+MEMORY_SAMPLE_INTERVAL = 1.0
+TOP_COUNT = 15
+
+Hotspot = namedtuple("Hotspot", "function calls own_seconds cumulative_seconds")
+ProfileReport = namedtuple(
+    "ProfileReport", "hotspots modules memory_peak memory_modules profile_path"
+)
+
+
+def module_name(filename):
+    """
+    Returns the name of the module of a source file, as shown in the reports.
+
+    Args:
+        filename (str): The path of the source file, "~" for the built-in functions.
+
+    Returns:
+        str: The module name, like "sort" or "game_names".
+    """
+    if filename == "~":
+        return "<built-in>"
+    if filename.startswith("<frozen "):
+        return filename[len("<frozen ") : -1]
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if name == "__init__":
+        name = os.path.basename(os.path.dirname(filename))
+    return name
+
+
+def _function_label(key):
+    filename, line, function = key
+    if filename == "~":
+        return function
+    return f"{module_name(filename)}:{line}({function})"
+
+
+class RunProfiler:
+    """
+    Profiles a run with cProfile and tracemalloc, on the calling thread and every thread it starts.
+
+    cProfile only follows the thread it is enabled on, so the threads started during the run, like
+    the pipeline stages and the conversion workers, get their own profiler, merged in the report.
+    Use it as a context manager around the run, then read `report()`.
+
+    Args:
+        profile_path (str, optional): The `.prof` file written for snakeviz-style viewers,
+            no CPU profiling if `None`.
+        trace_memory (bool, optional): Whether to trace the memory allocations. Defaults to False.
+        top (int, optional): The number of hotspots and modules in the report. Defaults to 15.
+    """
+
+    def __init__(self, profile_path=None, trace_memory=False, top=TOP_COUNT):
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.top = top
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._peak_snapshot = None
+        self._peak_size = 0
+        self._memory_peak = None
+        self._stats = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _profile_thread(self, frame, event, arg):
+        # Called once by every new thread, before its target: the profiler replaces this hook.
+        import cProfile
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows only one profiler, which then sees every thread.
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self._profiles.append(profile)
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._sampler = threading.Thread(
+                target=self._sample_memory, name="memory-sampler", daemon=True
+            )
+            self._sampler.start()
+        if self.profile_path:
+            import cProfile
+
+            threading.setprofile(self._profile_thread)
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            profile.enable()
+
+    def _take_snapshot(self):
+        size = tracemalloc.get_traced_memory()[0]
+        if size >= self._peak_size:
+            self._peak_size = size
+            self._peak_snapshot = tracemalloc.take_snapshot()
+
+    def _sample_memory(self):
+        while not self._stop.wait(MEMORY_SAMPLE_INTERVAL):
+            self._take_snapshot()
+
+    def stop(self):
+        """
+        Stops the profiling and writes the `.prof` file.
+        """
+        if self.profile_path:
+            import pstats
+
+            threading.setprofile(None)
+            # The profiler of this thread first: the others are already finished.
+            self._profiles[0].disable()
+            with self._lock:
+                profiles = list(self._profiles)
+            self._stats = pstats.Stats(*profiles)
+            self._stats.dump_stats(self.profile_path)
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._take_snapshot()
+            self._memory_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def _module_seconds(self):
+        # The time spent in built-in functions, like the syscalls, goes to the module calling them.
+        seconds = Counter()
+        for key, (_, _, own, _, callers) in self._stats.stats.items():
+            if key[0] != "~" or not callers:
+                seconds[module_name(key[0])] += own
+                continue
+            for caller, values in callers.items():
+                seconds[module_name(caller[0])] += values[2]
+        return seconds.most_common(self.top)
+
+    def _memory_modules(self):
+        sizes = Counter()
+        snapshot = self._peak_snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        for stat in snapshot.statistics("filename"):
+            sizes[module_name(stat.traceback[0].filename)] += stat.size
+        return sizes.most_common(self.top)
+
+    def report(self):
+        """
+        Returns the hotspots of the run, its time and its memory at the peak grouped by module.
+
+        Returns:
+            ProfileReport: The report, with empty lists for what was not profiled.
+        """
+        hotspots = []
+        modules = []
+        if self._stats is not None:
+            entries = sorted(
+                self._stats.stats.items(), key=lambda item: item[1][2], reverse=True
+            )
+            hotspots = [
+                Hotspot(_function_label(key), calls, own, cumulative)
+                for key, (_, calls, own, cumulative, _) in entries[: self.top]
+            ]
+            modules = self._module_seconds()
+        memory_modules = self._memory_modules() if self._peak_snapshot else []
+        return ProfileReport(
+            hotspots,
+            modules,
+            self._memory_peak,
+            memory_modules,
+            self.profile_path,
+        )
+
+
+def format_report(report):
+    """
+    Formats a profiling report for the console or a message box.
+
+    Args:
+        report (ProfileReport): The report of `RunProfiler.report`.
+
+    Returns:
+        list: The lines of the report.
+    """
+    lines = []
+    if report.hotspots:
+        lines.append("Fonctions les plus coûteuses (temps propre, temps cumulé) :")
+        lines.extend(
+            f"  {hotspot.own_seconds:8.3f} s {hotspot.cumulative_seconds:8.3f} s "
+            f"{hotspot.calls:>8}x {hotspot.function}"
+            for hotspot in report.hotspots
+        )
+        lines.append("Temps par module :")
+        lines.extend(f"  {seconds:8.3f} s {name}" for name, seconds in report.modules)
+        lines.append(f"Profil enregistré : {report.profile_path}")
+    if report.memory_peak is not None:
+        lines.append(f"Pic mémoire : {report.memory_peak / (1024 * 1024):.1f} Mo")
+        lines.extend(
+            f"  {size / (1024 * 1024):8.1f} Mo {name}"
+            for name, size in report.memory_modules
+        )
+    return lines
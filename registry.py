@@ -0,0 +1,157 @@
+import json
+import os
+
+from game_names import DEFAULT_GAME_NAME, clean_filename
+
+REGISTRY_FILENAME = ".games_registry.json"
+REGISTRY_VERSION = 1
+GAME_SUBFOLDERS = ("PNG", "JXR", "Conv")
+
+
+def registry_key(filename):
+    """
+    Returns the key under which the game of a file is remembered.
+
+    Captures of the same game only differ by their timestamp, so they share the same key.
+
+    Args:
+        filename (str): The name of the file.
+
+    Returns:
+        str: The cleaned name of the file, without its extension.
+    """
+    return clean_filename(os.path.splitext(filename)[0])
+
+
+class GameRegistry:
+    """
+    Remembers the known games and the past decisions of the sorting operations of a destination folder.
+
+    The registry is stored as a small JSON file at the root of the destination folder, and is seeded
+    from the `GAME_NAME` folders already there.
+
+    Args:
+        path (str): The path of the registry file.
+        games (list, optional): The known game names.
+        names (dict, optional): The game of every already sorted registry key.
+    """
+
+    def __init__(self, path, games=None, names=None):
+        self.path = path
+        self.games = list(games or [])
+        self.names = dict(names or {})
+        self._known = set(self.games)
+
+    @classmethod
+    def load(cls, dst_folder):
+        """
+        Loads the registry of the specified destination folder.
+
+        Args:
+            dst_folder (str): The path of the destination folder.
+
+        Returns:
+            GameRegistry: The registry, seeded with the game folders found in `dst_folder`.
+        """
+        path = os.path.join(dst_folder, REGISTRY_FILENAME)
+        registry = cls(path)
+
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") == REGISTRY_VERSION:
+                for game_name in data.get("games", []):
+                    registry.add_game(game_name)
+                registry.names.update(data.get("names", {}))
+        except (OSError, ValueError):
+            pass
+
+        registry.seed_from_folders(dst_folder)
+        return registry
+
+    def seed_from_folders(self, dst_folder):
+        """
+        Adds the games whose folder already exists in the destination folder.
+
+        Args:
+            dst_folder (str): The path of the destination folder.
+        """
+        try:
+            entries = list(os.scandir(dst_folder))
+        except OSError:
+            return
+
+        for entry in entries:
+            if not entry.is_dir() or entry.name == DEFAULT_GAME_NAME:
+                continue
+            if any(
+                os.path.isdir(os.path.join(entry.path, subfolder))
+                for subfolder in GAME_SUBFOLDERS
+            ):
+                self.add_game(entry.name)
+
+    def add_game(self, game_name):
+        """
+        Adds a game to the known games.
+
+        Args:
+            game_name (str): The name of the game.
+        """
+        if (
+            game_name
+            and game_name != DEFAULT_GAME_NAME
+            and game_name not in self._known
+        ):
+            self._known.add(game_name)
+            self.games.append(game_name)
+
+    def lookup(self, filename):
+        """
+        Returns the game a previous run chose for files like the specified one.
+
+        Args:
+            filename (str): The name of the file.
+
+        Returns:
+            str or None: The name of the game, `None` if no such file was sorted before.
+        """
+        return self.names.get(registry_key(filename))
+
+    def record(self, filename, game_name):
+        """
+        Remembers the game chosen for the specified file.
+
+        Args:
+            filename (str): The name of the file.
+            game_name (str): The name of its game, "Default" is not remembered.
+        """
+        if game_name == DEFAULT_GAME_NAME:
+            return
+        self.add_game(game_name)
+        self.names[registry_key(filename)] = game_name
+
+    def merge(self, common_parts):
+        """
+        Returns the known games followed by the freshly inferred ones.
+
+        Args:
+            common_parts (list): The game names inferred from the files to sort.
+
+        Returns:
+            list: The game names, without duplicates.
+        """
+        return self.games + [part for part in common_parts if part not in self._known]
+
+    def save(self):
+        """
+        Writes the registry, replacing the previous file atomically.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"version": REGISTRY_VERSION, "games": self.games, "names": self.names},
+                file,
+                ensure_ascii=False,
+                indent=1,
+            )
+        os.replace(tmp_path, self.path)
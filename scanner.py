@@ -0,0 +1,291 @@
+import os
+import queue
+import re
+import sys
+import threading
+from fnmatch import translate
+
+SORTED_EXTENSIONS = ("jxr", "png")
+# The records listed ahead of the sort by the scans of `merge_scans`.
+SCAN_QUEUE_SIZE = 1024
+# The files waiting for their sibling in `group_captures`, the oldest is yielded alone past it.
+CAPTURE_WINDOW = 1024
+# The extensions of the two files of an HDR capture.
+CAPTURE_PAIR = {".jxr", ".png"}
+_DONE = object()
+
+
+class FileRecord:
+    """
+    A scanned file, kept as small as possible so millions of them can be in flight.
+
+    The folder string is interned, so every file of a folder shares the same string.
+    Like `os.DirEntry`, a record has a `name`, a `path` and a `stat()` method.
+
+    Args:
+        folder (str): The path of the folder of the file.
+        name (str): The name of the file.
+    """
+
+    __slots__ = ("folder", "name")
+
+    def __init__(self, folder, name):
+        self.folder = folder
+        self.name = name
+
+    @property
+    def path(self):
+        return os.path.join(self.folder, self.name)
+
+    def stat(self):
+        """
+        Returns the `os.stat_result` of the file.
+        """
+        return os.stat(self.path)
+
+    def __repr__(self):
+        return f"FileRecord({self.folder!r}, {self.name!r})"
+
+
+class CaptureUnit:
+    """
+    The files of a capture, sharing their folder and their stem, like the PNG and JXR of an HDR screenshot.
+
+    Like a `FileRecord`, a unit has a `name` and a `path`, those of its PNG.
+
+    Args:
+        records (tuple): The records of its files, the PNG first.
+    """
+
+    __slots__ = ("records",)
+
+    def __init__(self, records):
+        self.records = records
+
+    @property
+    def name(self):
+        return self.records[0].name
+
+    @property
+    def path(self):
+        return self.records[0].path
+
+    def __repr__(self):
+        return f"CaptureUnit({self.records!r})"
+
+
+def unit_records(entry):
+    """
+    Returns the files of a capture unit, or of a single file.
+
+    Args:
+        entry (CaptureUnit, FileRecord or os.DirEntry): The unit or the file.
+
+    Returns:
+        tuple: The records of the files.
+    """
+    return getattr(entry, "records", (entry,))
+
+
+def compile_globs(patterns):
+    """
+    Compiles glob patterns into a single case-insensitive regular expression.
+
+    Args:
+        patterns (iterable): The glob patterns, like `*.png` or `Halo*`.
+
+    Returns:
+        re.Pattern or None: The expression matching any of the patterns, `None` if there is no pattern.
+    """
+    patterns = [translate(pattern) for pattern in patterns or ()]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+def scan_files(
+    src_folder,
+    include=None,
+    exclude=None,
+    max_depth=0,
+    prune=None,
+    extensions=SORTED_EXTENSIONS,
+):
+    """
+    Yields the files to sort of a folder and, optionally, of its subfolders, as they are listed.
+
+    The folders are walked depth first with `os.scandir`, so only the folders being walked are
+    kept in memory. Hidden files and folders are skipped. A glob without `/` is matched against
+    the name of a file, a glob with `/` against its path relative to `src_folder`. The `exclude`
+    globs also skip whole folders.
+
+    Args:
+        src_folder (str): The path of the source folder.
+        include (list, optional): Only the files matching one of these globs are yielded.
+        exclude (list, optional): The files and folders matching one of these globs are skipped.
+        max_depth (int or None, optional): The number of subfolder levels to walk, `None` for no limit.
+            Defaults to 0, only the source folder itself.
+        prune (function, optional): Called with the path of every subfolder, which is skipped if it returns True.
+        extensions (tuple, optional): The extensions of the files to yield, without dot. Defaults to PNG and JXR.
+
+    Yields:
+        FileRecord: The records of the files to sort.
+    """
+    include = compile_globs(include)
+    exclude = compile_globs(exclude)
+    pending = [(sys.intern(src_folder), "", 0)]
+
+    while pending:
+        folder, relative, depth = pending.pop()
+        subfolders = []
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith("."):
+                    continue
+                relative_name = relative + name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if (
+                        (max_depth is None or depth < max_depth)
+                        and not (
+                            exclude
+                            and (exclude.match(name) or exclude.match(relative_name))
+                        )
+                        and not (prune and prune(entry.path))
+                    ):
+                        subfolders.append(
+                            (sys.intern(entry.path), relative_name + "/", depth + 1)
+                        )
+                    continue
+                if os.path.splitext(name)[1].lower()[1:] not in extensions:
+                    continue
+                if include and not (
+                    include.match(name) or include.match(relative_name)
+                ):
+                    continue
+                if exclude and (exclude.match(name) or exclude.match(relative_name)):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                yield FileRecord(folder, name)
+        pending.extend(reversed(subfolders))
+
+
+def group_captures(entries, window=CAPTURE_WINDOW):
+    """
+    Groups the PNG and JXR files sharing a folder and a stem into `CaptureUnit`, as they are listed.
+
+    A file waits for its sibling while fewer than `window` files are waiting, the siblings of a
+    folder being listed close to each other, so the memory used does not depend on the number of
+    files. The files without sibling are yielded as they are.
+
+    Args:
+        entries (iterable): The `FileRecord` or `os.DirEntry` of the files.
+        window (int, optional): The number of files waiting for their sibling. Defaults to 1024.
+
+    Yields:
+        CaptureUnit, FileRecord or os.DirEntry: The units, and the files without sibling.
+    """
+    pending = {}
+    for entry in entries:
+        if type(entry) is FileRecord:
+            folder = entry.folder
+        else:
+            folder = os.path.dirname(entry.path)
+        stem, extension = os.path.splitext(entry.name)
+        key = (folder, stem)
+        sibling = pending.pop(key, None)
+        if sibling is not None:
+            sibling_extension = os.path.splitext(sibling.name)[1].lower()
+            if {extension.lower(), sibling_extension} == CAPTURE_PAIR:
+                yield CaptureUnit(
+                    (entry, sibling)
+                    if extension.lower() == ".png"
+                    else (sibling, entry)
+                )
+                continue
+            yield sibling
+        pending[key] = entry
+        if len(pending) > window:
+            yield pending.pop(next(iter(pending)))
+    yield from pending.values()
+
+
+def merge_scans(scans, queue_size=SCAN_QUEUE_SIZE):
+    """
+    Runs several scans at the same time and yields their records as they are listed.
+
+    The scans are grouped by key, the device of their folder: the scans of a group run one after
+    the other on their own thread, so every device is listed by a single thread and a slow HDD
+    does not hold back the folders of an SSD.
+
+    Args:
+        scans (list): The `(key, function)` of every scan, the function returning an iterator over the records.
+        queue_size (int, optional): The number of records listed ahead of the caller. Defaults to 1024.
+
+    Raises:
+        Exception: The first error raised by a scan, once every scan has stopped.
+
+    Yields:
+        FileRecord: The records of every scan, in the order they are listed.
+    """
+    groups = {}
+    for key, scan in scans:
+        groups.setdefault(key, []).append(scan)
+    records = queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                records.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(group):
+        try:
+            for scan in group:
+                for record in scan():
+                    if not put(record):
+                        return
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            put(_DONE)
+
+    threads = [
+        threading.Thread(target=run, args=(group,), name="scan", daemon=True)
+        for group in groups.values()
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        running = len(threads)
+        while running:
+            record = records.get()
+            if record is _DONE:
+                running -= 1
+                continue
+            yield record
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
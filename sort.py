@@ -1,9 +1,405 @@
+import itertools
 import os
 import time
-import subprocess
 
-from game_names import common_filename_part, find_game_name
-from folders import create_folder_structure
+from game_names import GameMatcher, common_filename_part, stream_common_parts
+from conversion import conversion_path, open_pool
+from pipeline import Pipeline
+from plan import DirectoryCache, execute_item, has_acceptable_png, make_plan_item
+from registry import GAME_SUBFOLDERS, GameRegistry
+from journal import (
+    JOURNAL_FILENAME,
+    Journal,
+    compact_journal,
+    pending_conversions,
+    read_journal,
+)
+from mover import LinkEngine, MoveEngine
+from dedup import find_new_duplicates, link_duplicates
+from thumbnails import build_thumbnails
+from scanner import (
+    SORTED_EXTENSIONS,
+    group_captures,
+    merge_scans,
+    scan_files,
+    unit_records,
+)
+from metrics import RunMetrics
+from steam_apps import default_index
+
+CLASSIFY_BATCH_SIZE = 64
+
+
+def source_folders(src_folder):
+    """
+    Returns the source folders of a sort, given as one path or as a list of paths.
+
+    Args:
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
+
+    Returns:
+        list: The paths of the source folders, without the duplicates, in the given order.
+    """
+    if isinstance(src_folder, str):
+        return [src_folder]
+    folders = {}
+    for folder in src_folder:
+        folders.setdefault(os.path.abspath(folder), folder)
+    return list(folders.values())
+
+
+def build_scanner(src_folder, dst_folder, include=None, exclude=None, max_depth=0):
+    """
+    Builds the function listing the files to sort of one or several source folders.
+
+    The `PNG`, `JXR` and `Conv` folders of the destination are never walked, so sorting into the
+    source folder itself or one of its subfolders does not sort the same files again. Several
+    source folders are scanned at the same time by `merge_scans`, one thread per device, and a
+    source folder inside another one is only walked as a source.
+
+    Args:
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
+        dst_folder (str): The path of the destination folder.
+        include (list, optional): Only the files matching one of these globs are sorted.
+        exclude (list, optional): The files and folders matching one of these globs are skipped.
+        max_depth (int or None, optional): The number of subfolder levels to walk, `None` for no limit. Defaults to 0.
+
+    Returns:
+        function: Called without argument, returns a new iterator over the `FileRecord` of the files to sort.
+    """
+    src_folders = source_folders(src_folder)
+    sources = {os.path.abspath(folder) for folder in src_folders}
+    dst_folder = os.path.abspath(dst_folder)
+
+    def is_sorted_folder(path):
+        path = os.path.abspath(path)
+        return path in sources or (
+            os.path.basename(path) in GAME_SUBFOLDERS
+            and os.path.dirname(os.path.dirname(path)) == dst_folder
+        )
+
+    def scanner(folder):
+        return lambda: scan_files(
+            folder, include, exclude, max_depth, is_sorted_folder
+        )
+
+    if len(src_folders) == 1:
+        return scanner(src_folders[0])
+
+    scans = []
+    for folder in src_folders:
+        try:
+            device = os.stat(folder).st_dev
+        except OSError:
+            device = folder
+        scans.append((device, scanner(folder)))
+    return lambda: merge_scans(scans)
+
+
+def build_classifier(
+    dst_folder,
+    do_convert,
+    names,
+    registry=None,
+    extra_names=(),
+    layout="flat",
+    metrics=None,
+    steam_index=None,
+    paired_conversion="convert",
+):
+    """
+    Builds the function turning scanned files and capture units into plan items.
+
+    With a `registry`, the files already known from previous runs skip the game name inference and
+    keep going to the same folders, and the new decisions are recorded in it. When `names` is a
+    function, the names are streamed twice by `stream_common_parts` instead of being kept in memory.
+    The Steam screenshots of the apps in `steam_index` are named like Game Bar captures for the
+    inference, the matching and the registry, so both go to the same game folder. The files of a
+    `CaptureUnit` are matched once, with the name of its PNG, and go to the same game.
+
+    Args:
+        dst_folder (str): The path of the destination folder.
+        do_convert (bool): Whether to convert the JXR images to PNG.
+        names (list or function): The names of the files to sort, used to infer the game names,
+            or a function returning a new iterator over them.
+        registry (GameRegistry, optional): The games learned by the previous runs.
+        extra_names (list, optional): Names of already sorted files also used to infer the game names.
+        layout (str, optional): "flat", or "date" to add `YYYY/MM` subfolders. Defaults to "flat".
+        metrics (RunMetrics, optional): Records the time spent inferring the game names in the "names" stage
+            and matching the files in the "match" stage.
+        steam_index (SteamAppIndex, optional): Names the games of the Steam screenshots,
+            defaults to the index shipped with the tool.
+        paired_conversion (str, optional): "skip" to not convert the JXR of the units with an acceptable PNG,
+            see `PAIRED_CONVERSIONS`. Defaults to "convert".
+
+    Returns:
+        function: Called with a list of `CaptureUnit`, `FileRecord` or `os.DirEntry`, returns the tuple
+            of `PlanItem` of every unit and file.
+    """
+    start = time.perf_counter()
+    game_bar_name = (steam_index or default_index()).game_bar_name
+    if callable(names):
+        all_names = lambda: map(game_bar_name, itertools.chain(names(), extra_names))
+    else:
+        name_list = [game_bar_name(name) for name in itertools.chain(names, extra_names)]
+        all_names = lambda: name_list
+    if registry is None:
+        inferred_names = all_names
+    else:
+        inferred_names = lambda: (
+            name for name in all_names() if registry.lookup(name) is None
+        )
+
+    if callable(names):
+        common_parts = stream_common_parts(inferred_names)
+    else:
+        common_parts = common_filename_part(list(inferred_names()))
+    matcher = GameMatcher(
+        common_parts if registry is None else registry.merge(common_parts)
+    )
+    if metrics is not None:
+        metrics.observe("names", time.perf_counter() - start, count=len(common_parts))
+
+    def classify(entries):
+        start = time.perf_counter()
+        units = [
+            unit_records(entry)
+            for entry in entries
+            if os.path.splitext(entry.name)[1].lower()[1:] in SORTED_EXTENSIONS
+        ]
+        filenames = [game_bar_name(records[0].name) for records in units]
+        if registry is None:
+            game_names = matcher.match_many(filenames)
+        else:
+            game_names = [registry.lookup(filename) for filename in filenames]
+            matched = iter(
+                matcher.match_many(
+                    [f for f, game in zip(filenames, game_names) if game is None]
+                )
+            )
+            game_names = [game or next(matched) for game in game_names]
+            for filename, game_name in zip(filenames, game_names):
+                registry.record(filename, game_name)
+        if metrics is not None:
+            metrics.observe("match", time.perf_counter() - start, count=len(filenames))
+
+        plan = []
+        for records, game_name in zip(units, game_names):
+            convert = do_convert
+            if (
+                convert
+                and paired_conversion == "skip"
+                and len(records) > 1
+                and has_acceptable_png(record.path for record in records)
+            ):
+                convert = False
+                jxr = next(
+                    (
+                        record
+                        for record in records
+                        if record.name.lower().endswith(".jxr")
+                    ),
+                    None,
+                )
+                if metrics is not None and jxr is not None:
+                    metrics.skip("convert", jxr.stat().st_size)
+            plan.append(
+                tuple(
+                    make_plan_item(
+                        os.path.dirname(record.path),
+                        dst_folder,
+                        record.name,
+                        game_name,
+                        convert,
+                        layout,
+                    )
+                    for record in records
+                )
+            )
+        return plan
+
+    return classify
+
+
+def build_plan(
+    src_folder,
+    dst_folder,
+    do_convert,
+    file_list=None,
+    registry=None,
+    extra_names=(),
+    layout="flat",
+    scan=None,
+    paired_conversion="convert",
+):
+    """
+    Works out where every file of the source folder goes, without touching the filesystem.
+
+    The PNG and JXR files of a capture are classified once, as a `CaptureUnit`.
+
+    Args:
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
+        dst_folder (str): The path of the destination folder.
+        do_convert (bool): Whether to convert the JXR images to PNG.
+        file_list (list, optional): The files to sort, the source folder is scanned if `None`.
+        registry (GameRegistry, optional): The games learned by the previous runs.
+        extra_names (list, optional): Names of already sorted files also used to infer the game names.
+        layout (str, optional): "flat", or "date" to add `YYYY/MM` subfolders. Defaults to "flat".
+        scan (function, optional): Returns a new iterator over the files to sort, see `build_scanner`.
+            Only the top level of the source folders is scanned if `None`.
+        paired_conversion (str, optional): "skip" to not convert the JXR of the captures with an acceptable PNG,
+            see `PAIRED_CONVERSIONS`. Defaults to "convert".
+
+    Returns:
+        list: The `PlanItem` of every file to sort, the files of a capture one after the other.
+    """
+    if file_list is None:
+        file_list = (scan or build_scanner(src_folder, dst_folder))()
+    entries = list(file_list)
+    classify = build_classifier(
+        dst_folder,
+        do_convert,
+        [entry.name for entry in entries],
+        registry,
+        extra_names,
+        layout,
+        paired_conversion=paired_conversion,
+    )
+    units = list(group_captures(entries))
+    return [item for items in classify(units) for item in items]
+
+
+def build_sort_pipeline(
+    src_folder,
+    dst_folder,
+    pool=None,
+    file_list=None,
+    registry=None,
+    extra_names=(),
+    journal=None,
+    mover=None,
+    layout="flat",
+    scan=None,
+    cancel_event=None,
+    metrics=None,
+    paired_conversion="convert",
+    deferred=None,
+    views=(),
+    view_conversions=None,
+):
+    """
+    Builds the scan → classify → move pipeline of a sorting operation.
+
+    The scanned files are grouped into `CaptureUnit` by `group_captures`, so the PNG and JXR of a
+    capture are classified once and moved together. The classify stage turns the units into
+    `PlanItem`, which the move stage executes. The JXR files moved by the last stage are handed
+    to `pool`, which converts them in the background.
+
+    Args:
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
+        dst_folder (str): The path of the destination folder.
+        pool (ConversionPool, optional): The pool converting the JXR images, no conversion if `None`.
+        file_list (list, optional): The files to sort, the source folder is scanned if `None`.
+        registry (GameRegistry, optional): The games learned by the previous runs.
+        extra_names (list, optional): Names of already sorted files also used to infer the game names.
+        journal (Journal, optional): Records every move before it happens.
+        mover (MoveEngine, optional): Copies the files changing device in the background.
+        layout (str, optional): "flat", or "date" to add `YYYY/MM` subfolders. Defaults to "flat".
+        scan (function, optional): Returns a new iterator over the files to sort, see `build_scanner`.
+            Only the top level of the source folders is scanned if `None`.
+        cancel_event (threading.Event, optional): Cancels the pipeline when set.
+        metrics (RunMetrics, optional): Records the counts, bytes and latencies of every stage. The size of
+            every scanned file is then read, so the remaining bytes of the moves and conversions are known.
+        paired_conversion (str, optional): What to do with the JXR of the captures with an acceptable PNG,
+            see `PAIRED_CONVERSIONS`. Defaults to "convert".
+        deferred (list, optional): Receives the `PlanItem` of the deferred conversions with "defer",
+            the caller submits them to `pool` once the files are moved.
+        views (list, optional): The `(layout, folder)` of other trees every file is also linked into,
+            `mover` must be a `LinkEngine`.
+        view_conversions (list, optional): Receives the `(conv_path, view_conv_path)` of the conversions
+            of the files linked into `views`, the caller links them once they are done.
+
+    Returns:
+        Pipeline: The pipeline, its results are the tuples of `PlanItem` of the moved captures.
+    """
+    if file_list is None:
+        source = scan or build_scanner(src_folder, dst_folder)
+        names = lambda: (record.name for record in source())
+    else:
+        source = lambda: file_list
+        names = [entry.name for entry in file_list]
+    units = lambda: group_captures(source())
+    classify = build_classifier(
+        dst_folder,
+        pool is not None,
+        names,
+        registry,
+        extra_names,
+        layout,
+        metrics,
+        paired_conversion=paired_conversion,
+    )
+    directories = DirectoryCache(metrics)
+    defer = paired_conversion == "defer" and pool is not None and deferred is not None
+
+    def measured_source():
+        entries = iter(units())
+        while True:
+            start = time.perf_counter()
+            entry = next(entries, None)
+            if entry is None:
+                return
+            records = unit_records(entry)
+            total_size = 0
+            for record in records:
+                try:
+                    size = record.stat().st_size
+                except OSError:
+                    size = 0
+                total_size += size
+                if pool is not None and record.name.lower().endswith(".jxr"):
+                    metrics.expect("convert", size)
+            metrics.observe(
+                "scan", time.perf_counter() - start, total_size, count=len(records)
+            )
+            metrics.expect("move", total_size)
+            yield entry
+
+    def move(items):
+        later = (
+            defer
+            and len(items) > 1
+            and has_acceptable_png(item.src_path for item in items)
+        )
+        for item in items:
+            if later and item.conv_path:
+                execute_item(item, None, directories, journal, mover, metrics)
+                deferred.append(item)
+            else:
+                execute_item(item, pool, directories, journal, mover, metrics)
+            for view_layout, view_folder in views:
+                view_item = make_plan_item(
+                    os.path.dirname(item.src_path),
+                    view_folder,
+                    os.path.basename(item.src_path),
+                    item.game_name,
+                    item.conv_path is not None,
+                    view_layout,
+                )
+                execute_item(
+                    view_item._replace(conv_path=None), None, directories, journal, mover
+                )
+                if view_item.conv_path and view_conversions is not None:
+                    view_conversions.append((item.conv_path, view_item.conv_path))
+        return items
+
+    return (
+        Pipeline(
+            units if metrics is None else measured_source, cancel_event=cancel_event
+        )
+        .add_stage("classify", classify, batch_size=CLASSIFY_BATCH_SIZE)
+        .add_stage("move", move)
+    )
 
 
 def sort_files(
@@ -11,62 +407,297 @@ def sort_files(
     dst_folder,
     do_convert,
     update_progress,
-    file_list,
-    total_files,
-    check_cancel=False,
+    file_list=None,
+    total_files=None,
+    cancel_event=None,
+    jobs=1,
+    update_conversion=None,
+    converter=None,
+    update_stages=None,
+    use_registry=True,
+    pool=None,
+    registry=None,
+    extra_names=(),
+    use_conversion_cache=True,
+    cache_hash=False,
+    use_journal=True,
+    journal=None,
+    mover=None,
+    copy_streams=2,
+    verify=False,
+    dedup=None,
+    on_duplicates=None,
+    thumbnails=False,
+    on_thumbnails=None,
+    layout="flat",
+    include=None,
+    exclude=None,
+    max_depth=0,
+    metrics=None,
+    report_path=None,
+    prometheus_path=None,
+    paired_conversion="convert",
+    link=False,
+    views=(),
 ):
     """
-    Sorts the files in the specified source folder and moves them to the specified destination folder.
+    Sorts the files in the specified source folders and moves them to the specified destination folder.
+
+    The files are scanned, classified and moved by a `Pipeline`, so the first files move while the
+    folders are still being listed. Several source folders are sorted in one run, with one game
+    name inference and one registry for all their files. The PNG and JXR of a capture are
+    classified once and moved together, and `paired_conversion` chooses when the JXR of a capture
+    that already has a PNG is converted. JXR conversions run in the background on `jobs` workers,
+    and the files going to another device are copied in the background by a `MoveEngine`. Every
+    stage is measured in a `RunMetrics`, and the estimated time remaining comes from the bytes left
+    and the measured throughput of the stages. With `link`, the files are linked by a `LinkEngine`
+    and stay in the source folders, and they can also be linked into other `views` in the same run.
 
     Args:
-        src_folder (str): The path of the source folder.
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
         dst_folder (str): The path of the destination folder.
         do_convert (bool): Whether to convert the JXR images to PNG.
         update_progress (function): A function to update the progress bar.
-        file_list (list): A list of files to sort.
-        total_files (int): The total number of files to sort.
-        check_cancel (bool, optional): Whether to check if the user has cancelled the sorting operation. Defaults to False.
+        file_list (list, optional): A list of files to sort, the source folder is scanned if `None`.
+        total_files (int, optional): The total number of files to sort, the number of files scanned so far if `None`.
+        cancel_event (threading.Event, optional): Cancels the sorting operation when set, from any thread.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        update_conversion (function, optional): A function called with `(completed, submitted)` conversions.
+        converter (list or ProcessConverter or WorkerConverter, optional): The converter, or the
+            converter command. Defaults to `hdrfix.exe`.
+        update_stages (function, optional): A function called with the `StageStats` of every stage.
+        use_registry (bool, optional): Whether to reuse and update the games learned by the previous runs. Defaults to True.
+        pool (ConversionPool, optional): A pool kept by the caller across several sorts, it is not joined.
+        registry (GameRegistry, optional): A registry kept by the caller across several sorts.
+        extra_names (list, optional): Names of already sorted files also used to infer the game names.
+        use_conversion_cache (bool, optional): Whether to skip the conversions that are still up to date. Defaults to True.
+        cache_hash (bool, optional): Whether the conversion cache also compares the content of the JXR files. Defaults to False.
+        use_journal (bool, optional): Whether to record the moves and conversions, so the operation can be resumed or undone. Defaults to True.
+        journal (Journal, optional): A journal kept by the caller across several sorts, it is not closed.
+        mover (MoveEngine, optional): A move engine kept by the caller, to read its throughput. It is joined but not closed.
+        copy_streams (int, optional): The number of parallel copies per device when moving to another device. Defaults to 2.
+        verify (bool, optional): Whether to compare the checksums of the copies before deleting the sources. Defaults to False.
+        dedup (str, optional): "report" to look for duplicates of the sorted files in their folders,
+            "link" to also replace them by hardlinks. No lookup if `None`.
+        on_duplicates (function, optional): Called with the `DuplicateGroup` list and the number of freed bytes.
+        thumbnails (bool, optional): Whether to build the thumbnails of the sorted games once the conversions are done. Defaults to False.
+            Left to the caller when it keeps the `pool`, whose conversions are still running.
+        on_thumbnails (function, optional): Called with the `ThumbnailResult` of the thumbnails.
+        layout (str, optional): "flat", or "date" to sort the captures into `YYYY/MM` subfolders. Defaults to "flat".
+        include (list, optional): Only the files matching one of these globs are sorted.
+        exclude (list, optional): The files and folders matching one of these globs are skipped.
+        max_depth (int or None, optional): The number of subfolder levels of the source folder to walk,
+            `None` for no limit. Defaults to 0, only the source folder itself.
+        metrics (RunMetrics, optional): Kept by the caller to read the measures of the run, a new one is used if `None`.
+        report_path (str, optional): The path of the JSON report written at the end of the run.
+        prometheus_path (str, optional): The path of the Prometheus textfile written at the end of the run.
+        paired_conversion (str, optional): "convert" to convert the JXR of the captures with an acceptable PNG
+            like the others, "skip" to not convert them, "defer" to convert them once the other conversions
+            are queued. Defaults to "convert".
+        link (bool, optional): Whether to link the files instead of moving them, a hardlink on the same device
+            and a symlink otherwise. Defaults to False.
+        views (list, optional): The `(layout, folder)` of other trees the files are also linked into, with
+            their conversions once done. Only with `link`, or a `LinkEngine` as `mover`.
+
+    Returns:
+        list: The `ConversionFailure` of every conversion that did not succeed.
+
+    Raises:
+        ValueError: If `views` are given without linking the files.
     """
-    common_part = common_filename_part(src_folder)
+    if views and not (link or isinstance(mover, LinkEngine)):
+        raise ValueError("Les vues ne peuvent être créées qu'avec des liens")
     start_time = time.time()
+    if metrics is None:
+        metrics = RunMetrics()
+    own_journal = journal is None and use_journal
+    if own_journal:
+        resumed = pending_conversions(
+            read_journal(os.path.join(dst_folder, JOURNAL_FILENAME))
+        )
+        journal = Journal.open(dst_folder)
+        journal.begin(src_folder, dst_folder)
+    own_pool = pool is None
+    if own_pool and do_convert:
+        pool = open_pool(
+            dst_folder,
+            jobs,
+            converter,
+            use_conversion_cache,
+            cache_hash,
+            journal=journal,
+            metrics=metrics,
+        )
+        if own_journal:
+            for src_path, dst_path in resumed:
+                if os.path.exists(src_path):
+                    pool.submit(src_path, dst_path)
+    own_mover = mover is None
+    if own_mover:
+        mover = LinkEngine() if link else MoveEngine(copy_streams, verify)
+    if registry is None and use_registry:
+        registry = GameRegistry.load(dst_folder)
+    deferred = []
+    view_conversions = []
+    pipeline = build_sort_pipeline(
+        src_folder,
+        dst_folder,
+        pool,
+        file_list,
+        registry,
+        extra_names,
+        journal,
+        mover,
+        layout,
+        build_scanner(src_folder, dst_folder, include, exclude, max_depth),
+        cancel_event,
+        metrics,
+        paired_conversion,
+        deferred,
+        views,
+        view_conversions,
+    )
+    scan_stage = metrics.stage("scan")
+    status = "done"
+    moved = []
+    games = set()
+    current_file = 0
 
-    for current_file, entry in enumerate(file_list, start=1):
-        if check_cancel:
-            from gui import cancel_sorting
-
-            if cancel_sorting:
-                break
-
-        filename = entry.name
-        file_ext = os.path.splitext(filename)[1].lower()[1:]
-        game_name = find_game_name(filename, common_part)
-
-        create_folder_structure(dst_folder, game_name, file_ext)
-        src_path = os.path.join(src_folder, filename)
-        dst_path = os.path.join(dst_folder, game_name, file_ext.upper(), filename)
-
-        if file_ext in ["jxr", "png"]:
-            os.rename(src_path, dst_path)
-            if file_ext == "jxr" and do_convert:
-                conv_path = os.path.join(
-                    dst_folder,
-                    game_name,
-                    "Conv",
-                    os.path.splitext(filename)[0] + "-sdr.png",
-                )
-                script_dir = os.path.dirname(os.path.realpath(__file__))
-                hdrfix_path = os.path.join(script_dir, "hdrfix.exe")
-                subprocess.call(
-                    [hdrfix_path, dst_path, conv_path],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.STDOUT,
+    try:
+        for items in pipeline.run():
+            current_file += len(items)
+            games.add(items[0].game_name)
+            if dedup:
+                moved.extend(item.dst_path for item in items)
+            total = total_files if total_files is not None else scan_stage.count
+            elapsed_time = time.time() - start_time
+            estimated_time_remaining = metrics.eta()
+            if estimated_time_remaining is None:
+                estimated_time_remaining = (elapsed_time / current_file) * (
+                    total - current_file
                 )
 
-        elapsed_time = time.time() - start_time
-        estimated_time_remaining = (elapsed_time / current_file) * (
-            total_files - current_file
-        )
+            update_progress(current_file, total, elapsed_time, estimated_time_remaining)
+            if pool and update_conversion:
+                update_conversion(*pool.progress())
+            if update_stages:
+                update_stages(pipeline.stats())
 
-        update_progress(
-            current_file, total_files, elapsed_time, estimated_time_remaining
-        )
+        mover.join()
+        if pool is not None and not pipeline.cancelled:
+            for item in deferred:
+                os.makedirs(os.path.dirname(item.conv_path), exist_ok=True)
+                pool.submit(item.dst_path, item.conv_path)
+            pool.flush()
+        if dedup and moved and not pipeline.cancelled:
+            groups = find_new_duplicates(moved, jobs)
+            freed = link_duplicates(groups)[0] if dedup == "link" else 0
+            if on_duplicates:
+                on_duplicates(groups, freed)
+        if pool is None or not own_pool:
+            failures = []
+        elif pipeline.cancelled:
+            failures = pool.cancel()
+        else:
+            failures = pool.join(update_conversion, cancel_event=cancel_event)
+            for conv_path, view_conv_path in view_conversions:
+                if os.path.exists(conv_path):
+                    os.makedirs(os.path.dirname(view_conv_path), exist_ok=True)
+                    if journal is not None:
+                        journal.link(conv_path, view_conv_path)
+                    mover.move(conv_path, view_conv_path)
+        if pipeline.cancelled:
+            status = "cancelled"
+        elif thumbnails and games and (pool is None or own_pool):
+            result = build_thumbnails(dst_folder, jobs, game_names=games)
+            if on_thumbnails:
+                on_thumbnails(result)
+        return failures
+    except BaseException:
+        status = "failed"
+        if pool is not None and own_pool:
+            pool.cancel()
+        raise
+    finally:
+        if own_mover:
+            mover.close()
+        if registry is not None:
+            registry.save()
+        if own_journal:
+            journal.end(status)
+            journal.close()
+            if status == "done":
+                compact_journal(journal.path)
+        metrics.finish(status)
+        if report_path:
+            metrics.write_json(report_path)
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+
+
+def library_conversions(dst_folder):
+    """
+    Yields the JXR files of an already sorted folder with the path of their conversion.
+
+    The `JXR` folders are walked recursively, and a JXR file in `JXR/YYYY/MM` gets its
+    conversion in `Conv/YYYY/MM`, so both layouts are handled.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+
+    Yields:
+        tuple: The path of the JXR file and the path of its `-sdr.png` file.
+    """
+    with os.scandir(dst_folder) as games:
+        game_names = sorted(entry.name for entry in games if entry.is_dir())
+
+    for game_name in game_names:
+        jxr_folder = os.path.join(dst_folder, game_name, "JXR")
+        for root, dirs, files in os.walk(jxr_folder):
+            dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+            relative = os.path.relpath(root, jxr_folder)
+            subfolders = () if relative == os.curdir else tuple(relative.split(os.sep))
+            for filename in sorted(files):
+                if filename.lower().endswith(".jxr"):
+                    yield os.path.join(root, filename), conversion_path(
+                        dst_folder, game_name, filename, subfolders
+                    )
+
+
+def convert_library(
+    dst_folder,
+    jobs=1,
+    converter=None,
+    force=False,
+    cache_hash=False,
+    update_conversion=None,
+):
+    """
+    Converts the JXR files of an already sorted folder whose conversion is missing or out of date.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        converter (list or ProcessConverter or WorkerConverter, optional): The converter, or the
+            converter command. Defaults to `hdrfix.exe`.
+        force (bool, optional): Whether to convert every file, even the up to date ones. Defaults to False.
+        cache_hash (bool, optional): Whether the conversion cache also compares the content of the JXR files. Defaults to False.
+        update_conversion (function, optional): A function called with `(completed, submitted)` conversions.
+
+    Returns:
+        tuple: The `ConversionFailure` list and the number of skipped up to date conversions.
+    """
+    pool = open_pool(dst_folder, jobs, converter, True, cache_hash, force)
+    directories = DirectoryCache()
+
+    try:
+        for jxr_path, conv_path in library_conversions(dst_folder):
+            directories.ensure(os.path.dirname(conv_path))
+            pool.submit(jxr_path, conv_path)
+            if update_conversion:
+                update_conversion(*pool.progress())
+    except BaseException:
+        pool.cancel()
+        raise
+
+    return pool.join(update_conversion), pool.skipped
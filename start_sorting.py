@@ -1,49 +1,286 @@
-from tqdm import tqdm
+import os
+import threading
+import time
+from console import progress_bar
 
-from sort import sort_files
+from sort import convert_library, sort_files
+from conversion import open_pool
+from plan import execute_plan, plan_destination
+from journal import undo_journal
+from layout import migrate_layout
+from profiling import DEFAULT_PROFILE_PATH, RunProfiler
 
-def start_args_sorting(src_folder, dst_folder, do_convert, total_files, file_list):
+# The minimum delay between two progress messages sent to the gui, in seconds.
+GUI_REFRESH_INTERVAL = 0.1
+
+
+def start_args_sorting(src_folder, dst_folder, do_convert, jobs=1, **sort_options):
     """
     Runs the sorting operation, only used when the script is run with command line arguments.
 
     Args:
-        src_folder (str): The path of the source folder.
+        src_folder (str or list): The path of the source folder, or the paths of the source folders.
         dst_folder (str): The path of the destination folder.
         do_convert (bool): Whether to convert the JXR images to PNG.
-        total_files (int): The total number of files to sort.
-        file_list (list): A list of files to sort.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        **sort_options: The other keyword arguments of `sort_files`.
+
+    Returns:
+        list: The `ConversionFailure` of every conversion that did not succeed.
     """
-    with tqdm(total=total_files, desc="Tri des fichiers", unit="fichier") as pbar:
-        sort_files(
+    with progress_bar(
+        total=0, desc="Tri des fichiers", unit="fichier", position=0
+    ) as pbar, progress_bar(
+        total=0,
+        desc="Conversion JXR",
+        unit="image",
+        position=1,
+        disable=not do_convert,
+    ) as conv_pbar:
+
+        def update_progress(current, total, _, __):
+            pbar.total = total
+            pbar.update(current - pbar.n)
+
+        def update_conversion(completed, submitted):
+            conv_pbar.total = submitted
+            conv_pbar.n = completed
+            conv_pbar.refresh()
+
+        return sort_files(
             src_folder,
             dst_folder,
             do_convert,
-            lambda curr, total, _, __: pbar.update(1),
-            file_list,
-            total_files,
+            update_progress,
+            jobs=jobs,
+            update_conversion=update_conversion,
+            **sort_options,
         )
 
 
 def start_gui_sorting(
-    src_folder, dst_folder, do_convert, update_progress_bar, total_files, file_list
+    src_folder,
+    dst_folder,
+    do_convert,
+    messages,
+    jobs=1,
+    cancel_event=None,
+    profile=False,
+    link=False,
 ):
     """
-    Runs the sorting operation with gui.
+    Runs the sorting operation of the gui on a worker thread, so the window stays responsive.
+
+    Tkinter widgets can only be used from the main thread, so the worker only puts messages in
+    `messages`, which the gui reads with `after()`. The progress is sent at most every
+    `GUI_REFRESH_INTERVAL` seconds, the last values are always sent before the end. The messages are:
+
+    - `("progress", (current, total, elapsed_time, estimated_time_remaining))`
+    - `("conversion", (completed, submitted))`
+    - `("profile", report)` with the `ProfileReport` of the run, when `profile` is set.
+    - `("done", failures)` with the `ConversionFailure` list, or `("error", exception)`, always last.
 
     Args:
         src_folder (str): The path of the source folder.
         dst_folder (str): The path of the destination folder.
         do_convert (bool): Whether to convert the JXR images to PNG.
-        update_progress_bar (function): A function to update the progress bar.
-        total_files (int): The total number of files to sort.
-        file_list (list): A list of files to sort.
-    """
-    sort_files(
-        src_folder,
-        dst_folder,
-        do_convert,
-        update_progress_bar,
-        file_list,
-        total_files,
-        check_cancel=True,
+        messages (queue.Queue): Receives the messages of the worker.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        cancel_event (threading.Event, optional): Cancels the sorting operation when set.
+        profile (bool, optional): Whether to profile the run and its memory, the `.prof` file is
+            written in the destination folder. Defaults to False.
+        link (bool, optional): Whether to link the files instead of moving them, see `sort_files`. Defaults to False.
+
+    Returns:
+        threading.Thread: The started worker thread.
+    """
+    latest = {}
+    sent = {}
+
+    def send(kind, values):
+        latest[kind] = values
+        now = time.monotonic()
+        if now - sent.get(kind, float("-inf")) >= GUI_REFRESH_INTERVAL:
+            sent[kind] = now
+            messages.put((kind, values))
+
+    def run_sort():
+        return sort_files(
+            src_folder,
+            dst_folder,
+            do_convert,
+            lambda *values: send("progress", values),
+            cancel_event=cancel_event,
+            jobs=jobs,
+            update_conversion=lambda *values: send("conversion", values),
+            link=link,
+        )
+
+    def run():
+        try:
+            if profile:
+                profiler = RunProfiler(
+                    os.path.join(dst_folder, DEFAULT_PROFILE_PATH), trace_memory=True
+                )
+                with profiler:
+                    failures = run_sort()
+                latest["profile"] = profiler.report()
+            else:
+                failures = run_sort()
+        except Exception as error:
+            messages.put(("error", error))
+            return
+        for kind, values in latest.items():
+            messages.put((kind, values))
+        messages.put(("done", failures))
+
+    thread = threading.Thread(target=run, name="gui-sorting", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_args_plan(
+    plan,
+    jobs=1,
+    journal=None,
+    mover=None,
+    converter=None,
+    dst_folder=None,
+    use_conversion_cache=True,
+    cache_hash=False,
+):
+    """
+    Executes a move plan, only used when the script is run with command line arguments.
+
+    Args:
+        plan (list): The `PlanItem` of the plan.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        journal (Journal, optional): Records every move and conversion.
+        mover (MoveEngine, optional): Copies the files changing device in the background.
+        converter (ProcessConverter or WorkerConverter, optional): Converts the JXR images, `hdrfix.exe` if `None`.
+        dst_folder (str, optional): The path of the destination folder holding the conversion cache,
+            found from the conversions of the plan if `None`.
+        use_conversion_cache (bool, optional): Whether to skip the conversions that are still up to date. Defaults to True.
+        cache_hash (bool, optional): Whether the conversion cache also compares the content of the JXR files. Defaults to False.
+
+    Returns:
+        list: The `ConversionFailure` of every conversion that did not succeed.
+    """
+    do_convert = any(item.conv_path for item in plan)
+    pool = (
+        open_pool(
+            dst_folder or plan_destination(plan),
+            jobs,
+            converter,
+            use_conversion_cache,
+            cache_hash,
+            journal=journal,
+        )
+        if do_convert
+        else None
     )
+
+    with progress_bar(
+        total=len(plan), desc="Tri des fichiers", unit="fichier", position=0
+    ) as pbar, progress_bar(
+        total=0,
+        desc="Conversion JXR",
+        unit="image",
+        position=1,
+        disable=not do_convert,
+    ) as conv_pbar:
+
+        def update_conversion(completed, submitted):
+            conv_pbar.total = submitted
+            conv_pbar.n = completed
+            conv_pbar.refresh()
+
+        try:
+            execute_plan(
+                plan,
+                pool,
+                lambda current, total: pbar.update(1),
+                journal=journal,
+                mover=mover,
+            )
+        except BaseException:
+            if pool is not None:
+                pool.cancel()
+            raise
+        return pool.join(update_conversion) if pool is not None else []
+
+
+def start_args_converting(
+    dst_folder, jobs=1, force=False, cache_hash=False, converter=None
+):
+    """
+    Converts the missing or out of date JXR conversions of an already sorted folder,
+    only used when the script is run with command line arguments.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        force (bool, optional): Whether to convert every JXR image. Defaults to False.
+        cache_hash (bool, optional): Whether to also compare the content of the JXR images. Defaults to False.
+        converter (ProcessConverter or WorkerConverter, optional): Converts the JXR images, `hdrfix.exe` if `None`.
+
+    Returns:
+        tuple: The `ConversionFailure` list and the number of skipped up to date conversions.
+    """
+    with progress_bar(total=0, desc="Conversion JXR", unit="image") as conv_pbar:
+
+        def update_conversion(completed, submitted):
+            conv_pbar.total = submitted
+            conv_pbar.n = completed
+            conv_pbar.refresh()
+
+        return convert_library(
+            dst_folder,
+            jobs,
+            converter,
+            force=force,
+            cache_hash=cache_hash,
+            update_conversion=update_conversion,
+        )
+
+
+def start_args_migrating(dst_folder, layout="date", journal=None):
+    """
+    Moves the captures of an already sorted folder to another layout,
+    only used when the script is run with command line arguments.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        layout (str, optional): "date" for `YYYY/MM` subfolders, "flat" to remove them. Defaults to "date".
+        journal (Journal, optional): Records every move.
+
+    Returns:
+        tuple: The number of moved files and the list of the `(src_path, dst_path)` that could not be moved.
+    """
+    with progress_bar(total=0, desc="Réorganisation", unit="fichier") as pbar:
+
+        def update_progress(current, total):
+            pbar.total = total
+            pbar.update(current - pbar.n)
+
+        return migrate_layout(dst_folder, layout, journal, update_progress)
+
+
+def start_args_undo(dst_folder):
+    """
+    Undoes the sorting operations recorded in the journal of a destination folder,
+    only used when the script is run with command line arguments.
+
+    Args:
+        dst_folder (str): The path of the destination folder.
+
+    Returns:
+        tuple: The number of restored files and the list of the `(src_path, dst_path)` that could not be restored.
+    """
+    with progress_bar(total=0, desc="Restauration", unit="fichier") as pbar:
+
+        def update_progress(current, total):
+            pbar.total = total
+            pbar.update(current - pbar.n)
+
+        return undo_journal(dst_folder, update_progress)
@@ -0,0 +1,230 @@
+"""
+Offline index of the Steam app IDs, used to name the games of the Steam screenshots.
+
+Usage: python steam_apps.py build SOURCE [--out steam_apps.idx]
+
+SOURCE is a `.tsv` file of `app_id<TAB>name` lines, or a saved copy of the JSON returned by the
+Steam `ISteamApps/GetAppList` API.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import warnings
+from functools import lru_cache
+
+INDEX_FILENAME = "steam_apps.idx"
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), INDEX_FILENAME
+)
+INDEX_MAGIC = b"GCSA"
+INDEX_VERSION = 1
+# The magic, the version and the number of apps.
+HEADER = struct.Struct("<4sII")
+# The app ID, then the offset and the length of its UTF-8 name in the names area.
+RECORD = struct.Struct("<III")
+# `APPID_YYYYMMDDhhmmss_N.ext`, the names of the Steam screenshots.
+STEAM_NAME_PATTERN = re.compile(
+    r"(\d+)_(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2})_\d+(\.[A-Za-z0-9]+)?"
+)
+# The characters Windows does not allow in file names, replaced like the Game Bar does.
+INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+
+
+class SteamAppIndex:
+    """
+    Looks up game names by Steam app ID in a sorted binary index, without loading it.
+
+    The index is memory-mapped and searched by bisection, so opening it costs nothing and only the
+    pages of the looked up records are read. A missing index finds no game, and so does a
+    truncated or corrupted one, with a warning.
+
+    Args:
+        path (str, optional): The path of the index file. Defaults to `DEFAULT_INDEX_PATH`.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.count = 0
+        self._map = None
+        try:
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size >= HEADER.size:
+                    self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            return
+        if self._map is None:
+            return
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            return
+        if HEADER.size + count * RECORD.size > len(self._map):
+            self._corrupted()
+            self.close()
+            return
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.count = 0
+
+    def _corrupted(self):
+        warnings.warn(
+            f"L'index des jeux Steam est corrompu, il est ignoré : {self.path}",
+            stacklevel=3,
+        )
+        # The map stays open for the lookups already running on other threads.
+        self.count = 0
+
+    def _app_id(self, position):
+        return RECORD.unpack_from(self._map, HEADER.size + position * RECORD.size)[0]
+
+    def lookup(self, app_id):
+        """
+        Returns the name of a Steam app.
+
+        Args:
+            app_id (int): The Steam app ID.
+
+        Returns:
+            str or None: The name of the app, `None` if it is not in the index.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._app_id(middle) < app_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or self._app_id(low) != app_id:
+            return None
+        _, offset, length = RECORD.unpack_from(
+            self._map, HEADER.size + low * RECORD.size
+        )
+        start = HEADER.size + self.count * RECORD.size + offset
+        if start + length > len(self._map):
+            self._corrupted()
+            return None
+        try:
+            return self._map[start : start + length].decode("utf-8")
+        except UnicodeDecodeError:
+            self._corrupted()
+            return None
+
+    def game_bar_name(self, filename):
+        """
+        Renames a Steam screenshot like a Game Bar capture of the same game.
+
+        `1091500_20230927184252_1.png` becomes `Cyberpunk 2077 27_09_2023 18_42_52.png`, so the game
+        name inference and the matching treat both kinds of captures the same way.
+
+        Args:
+            filename (str): The name of the file.
+
+        Returns:
+            str: The Game Bar style name, or `filename` if it is not a Steam screenshot of a known app.
+        """
+        match = STEAM_NAME_PATTERN.fullmatch(filename)
+        if not match or not self.count:
+            return filename
+        app_id, year, month, day, hour, minute, second, extension = match.groups()
+        name = self.lookup(int(app_id))
+        if not name:
+            return filename
+        name = INVALID_FILENAME_CHARS.sub("_", name)
+        return (
+            f"{name} {day}_{month}_{year} {hour}_{minute}_{second}{extension or ''}"
+        )
+
+
+@lru_cache(maxsize=1)
+def default_index():
+    """
+    Returns the index shipped with the tool, opened on first use.
+
+    Returns:
+        SteamAppIndex: The index of `DEFAULT_INDEX_PATH`.
+    """
+    return SteamAppIndex()
+
+
+def read_app_list(path):
+    """
+    Reads the app IDs and names of a `.tsv` list or of a GetAppList JSON file.
+
+    Args:
+        path (str): The path of the list.
+
+    Returns:
+        dict: The name of every app ID, the last name winning for duplicated IDs.
+    """
+    apps = {}
+    with open(path, encoding="utf-8") as file:
+        if path.lower().endswith(".json"):
+            for app in json.load(file)["applist"]["apps"]:
+                apps[int(app["appid"])] = app["name"]
+            return apps
+        for line in file:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            app_id, name = line.split("\t", 1)
+            apps[int(app_id)] = name
+    return apps
+
+
+def build_index(apps, path=DEFAULT_INDEX_PATH):
+    """
+    Writes a sorted binary index, replacing the previous file atomically.
+
+    Args:
+        apps (dict): The name of every app ID, the apps without name are skipped.
+        path (str, optional): The path of the index. Defaults to `DEFAULT_INDEX_PATH`.
+
+    Returns:
+        int: The number of apps in the index.
+    """
+    records = []
+    names = bytearray()
+    for app_id, name in sorted(apps.items()):
+        name = name.strip()
+        if not name:
+            continue
+        encoded = name.encode("utf-8")
+        records.append(RECORD.pack(app_id, len(names), len(encoded)))
+        names += encoded
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(records)))
+        file.write(b"".join(records))
+        file.write(names)
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser(
+        "build", help="Build the index from an app list"
+    )
+    build_parser.add_argument("source")
+    build_parser.add_argument("--out", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    count = build_index(read_app_list(args.source), args.out)
+    print(f"{count} apps written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from tests import RichTestRunner, unittest
-from game_names import clean_filename
+from game_names import clean_filename, clean_many
 
 class TestCleanFilename(unittest.TestCase):
     def test_remove_dates(self):
@@ -28,10 +28,54 @@ class TestCleanFilename(unittest.TestCase):
             clean_filename(
                 "Cyberpunk 2077 (C) 2020 by CD Projekt RED 18_12_2023 15_48_04"
             ),
-            # I would really like it to only be "Cyberpunk 2077"
-            "Cyberpunk 2077 (C) 2020 by CD Projekt RED",
+            "Cyberpunk 2077",
         )
 
+    def test_timestamp_and_extension(self):
+        self.assertEqual(
+            clean_filename("Halo Infinite 01_02_2024 10_00_00.png"),
+            "Halo Infinite.png",
+        )
+        self.assertEqual(
+            clean_filename("Halo_Infinite_ 01_02_2024 10_00_00.png"),
+            "Halo Infinite .png",
+        )
+        self.assertEqual(
+            clean_filename("Forza Horizon 5 01_02_2024 10_00_00.jxr"),
+            "Forza Horizon 5.jxr",
+        )
+
+    def test_end_of_name_removed_before_timestamp(self):
+        self.assertEqual(
+            clean_filename("Halo - Season 2 01_02_2024 10_00_00.png"), "Halo"
+        )
+        self.assertEqual(
+            clean_filename("Cyberpunk 2077 (C) 2020 18_12_2023 15_48_04.png"),
+            "Cyberpunk 2077",
+        )
+
+    def test_same_head_cached(self):
+        first = clean_filename("Sea Thieves 01_02_2024 10_00_00.png")
+        second = clean_filename("Sea Thieves 03_04_2024 11_22_33")
+
+        self.assertEqual((first, second), ("Sea Thieves.png", "Sea Thieves"))
+
+
+class TestCleanMany(unittest.TestCase):
+    def test_order_and_duplicates(self):
+        names = [
+            "Halo Infinite 01_02_2024 10_00_00.png",
+            "1091500_20230927184252_1",
+            "Halo Infinite 01_02_2024 10_00_00.png",
+            "example   file",
+        ]
+
+        self.assertEqual(
+            clean_many(names),
+            ["Halo Infinite.png", "1091500", "Halo Infinite.png", "example file"],
+        )
+        self.assertEqual(clean_many(iter(names)), [clean_filename(n) for n in names])
+
 
 if __name__ == "__main__":
     unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -1,20 +1,68 @@
+import os
+import tempfile
+
 from tests import RichTestRunner, unittest
 from game_names import common_filename_part
 
+FILE_NAMES = [
+    "Skull And Bones 16_02_2024 21_03_12.png",
+    "Avatar Frontiers of Pandora™ 07_12_2023 20_14_55.png",
+    "Cyberpunk 2077 (C) 2020 by CD Projekt RED 18_12_2023 15_48_04.png",
+    "Skull And Bones 16_02_2024 21_03_12.jxr",
+    "Avatar Frontiers of Pandora™ 07_12_2023 20_14_55.jxr",
+    "Cyberpunk 2077 (C) 2020 by CD Projekt RED 18_12_2023 15_48_04.jxr",
+    "Skull And Bones 17_02_2024 19_40_01.png",
+    "Avatar Frontiers of Pandora™ 08_12_2023 22_01_31.png",
+    "Cyberpunk 2077 (C) 2020 by CD Projekt RED 20_12_2023 01_12_44.png",
+    "Photos 01_01_2024.png",
+    "Minecraft 05_01_2024 10_00_00.png",
+]
+
 
 class TestCommonFilenameParts(unittest.TestCase):
     def test_common_parts(self):
         self.assertEqual(
-            common_filename_part(
-                "C:/Users/proki/OneDrive/Dev/Games-Captures-Organizer/test_folder"
-            ),
+            common_filename_part(FILE_NAMES),
             [
                 "Avatar Frontiers of Pandora™",
-                "Cyberpunk 2077 (C) 2020 by CD Projekt RED",
+                "Cyberpunk 2077",
                 "Skull And Bones",
             ],
         )
 
+    def test_common_parts_from_folder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for name in FILE_NAMES:
+                with open(os.path.join(folder, name), "w"):
+                    pass
+
+            self.assertEqual(
+                common_filename_part(os.scandir(folder)),
+                common_filename_part(folder),
+            )
+            self.assertEqual(
+                common_filename_part(folder), common_filename_part(FILE_NAMES)
+            )
+
+    def test_same_day_captures(self):
+        self.assertEqual(
+            common_filename_part(
+                [f"Halo Infinite 01_02_2024 10_00_0{i}.png" for i in range(3)]
+            ),
+            ["Halo Infinite"],
+        )
+
+    def test_names_starting_with_spaces(self):
+        self.assertEqual(
+            common_filename_part([" Foo 1.png", " Foo 2.png", " Foo 3.png"]), []
+        )
+
+    def test_min_count(self):
+        self.assertEqual(common_filename_part(FILE_NAMES[:4]), [])
+        self.assertEqual(
+            common_filename_part(FILE_NAMES[:4], min_count=2), ["Skull And Bones"]
+        )
+
 
 if __name__ == "__main__":
     unittest.main(testRunner=RichTestRunner, verbosity=2)
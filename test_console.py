@@ -0,0 +1,31 @@
+import subprocess
+
+from tests import RichTestRunner, unittest
+from console import NullProgressBar, progress_bar
+from benchmarks.bench_startup import COMMANDS, ROOT, loaded_modules
+
+
+class TestConsole(unittest.TestCase):
+    def test_no_progress_bar_without_terminal(self):
+        with progress_bar(total=0, desc="Tri des fichiers") as pbar:
+            pbar.total = 10
+            pbar.update(3)
+            pbar.refresh()
+
+        self.assertIsInstance(pbar, NullProgressBar)
+        self.assertEqual(pbar.n, 3)
+
+    def test_headless_run_does_not_load_the_gui(self):
+        self.assertEqual(loaded_modules(COMMANDS["headless"]), "")
+
+    def test_plain_output_without_terminal(self):
+        result = subprocess.run(
+            COMMANDS["headless"], cwd=ROOT, capture_output=True, text=True
+        )
+
+        self.assertIn("Le dossier source n'existe pas.", result.stdout)
+        self.assertNotIn("\x1b[", result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,247 @@
+import os
+import sys
+import tempfile
+
+from tests import RichTestRunner, unittest
+from conversion import ConversionPool, WorkerConverter
+from sort import sort_files
+
+STUB_CONVERTER = [
+    sys.executable,
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "hdrfix_stub.py"),
+]
+STUB_WORKER = STUB_CONVERTER + ["--worker"]
+
+
+class TestConversionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_file(self, name):
+        path = os.path.join(self.folder, name)
+        with open(path, "wb") as f:
+            f.write(b"jxr")
+        return path
+
+    def test_conversions_run_and_failures_are_collected(self):
+        pool = ConversionPool(jobs=3, command=STUB_CONVERTER)
+        for name in ["a.jxr", "b.jxr", "corrupt.jxr"]:
+            src = self.make_file(name)
+            pool.submit(src, src + "-sdr.png")
+
+        progress = []
+        failures = pool.join(lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(progress[-1], (3, 3))
+        self.assertTrue(os.path.exists(os.path.join(self.folder, "a.jxr-sdr.png")))
+        self.assertEqual(len(failures), 1)
+        self.assertTrue(failures[0].src_path.endswith("corrupt.jxr"))
+        self.assertEqual(failures[0].returncode, 1)
+        self.assertIn("cannot decode", failures[0].message)
+
+    def test_raising_converter_fails_its_jobs(self):
+        pool = ConversionPool(converter=RaisingConverter())
+        for name in ["a.jxr", "b.jxr", "c.jxr"]:
+            pool.submit(self.make_file(name), name + "-sdr.png")
+
+        failures = pool.join()
+
+        self.assertEqual(pool.progress(), (3, 3))
+        self.assertEqual(len(failures), 3)
+        self.assertIsNone(failures[0].returncode)
+        self.assertIn("broke", failures[0].message)
+
+    def test_missing_converter_is_reported(self):
+        pool = ConversionPool(command=[os.path.join(self.folder, "missing.exe")])
+        pool.submit(self.make_file("a.jxr"), "a-sdr.png")
+
+        failures = pool.join()
+
+        self.assertEqual(len(failures), 1)
+        self.assertIsNone(failures[0].returncode)
+
+
+class RaisingConverter:
+    command = ["raising"]
+    batch_size = 2
+
+    def convert(self, jobs):
+        raise OSError("the converter broke")
+
+    def close(self):
+        pass
+
+
+class TestWorkerConverter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_jobs(self, names):
+        jobs = []
+        for name in names:
+            path = os.path.join(self.folder, name)
+            with open(path, "wb") as f:
+                f.write(b"jxr")
+            jobs.append((path, path + "-sdr.png"))
+        return jobs
+
+    def test_batches_run_on_one_worker(self):
+        converter = WorkerConverter(STUB_WORKER, batch_size=4)
+        pool = ConversionPool(converter=converter)
+        names = [f"{i}.jxr" for i in range(5)] + ["corrupt.jxr"]
+        for src, dst in self.make_jobs(names):
+            pool.submit(src, dst)
+
+        failures = pool.join()
+
+        self.assertEqual(converter.started, 1)
+        self.assertEqual(pool.progress(), (6, 6))
+        self.assertTrue(os.path.exists(os.path.join(self.folder, "4.jxr-sdr.png")))
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0].returncode, 1)
+        self.assertIn("cannot decode", failures[0].message)
+
+    def test_crash_only_fails_its_file(self):
+        converter = WorkerConverter(STUB_WORKER, batch_size=3)
+        jobs = self.make_jobs(["a.jxr", "crash.jxr", "b.jxr"])
+
+        results = converter.convert(jobs)
+        converter.close()
+
+        self.assertEqual([result.returncode for result in results], [0, None, 0])
+        self.assertIn("arrêté", results[1].message)
+        self.assertGreaterEqual(converter.restarts, 1)
+        self.assertTrue(os.path.exists(jobs[2][1]))
+
+    def test_dead_worker_is_restarted(self):
+        converter = WorkerConverter(STUB_WORKER, health_interval=0)
+        first, second = self.make_jobs(["a.jxr", "b.jxr"])
+        self.assertEqual(converter.convert([first])[0].returncode, 0)
+        worker = converter._workers[0]
+        worker.kill()
+
+        self.assertEqual(converter.convert([second])[0].returncode, 0)
+        converter.close()
+
+        self.assertEqual(converter.started, 2)
+        self.assertEqual(converter.restarts, 1)
+
+    def test_missing_worker_is_reported(self):
+        converter = WorkerConverter([os.path.join(self.folder, "missing.exe")])
+
+        results = converter.convert(self.make_jobs(["a.jxr", "b.jxr"]))
+
+        self.assertEqual([result.returncode for result in results], [None, None])
+
+
+class TestSortFilesConversion(unittest.TestCase):
+    def test_sort_files_converts_in_background(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            names = [f"Game 01_02_2024 10_00_0{i}" for i in range(4)]
+            for name in names:
+                for ext in ["png", "jxr"]:
+                    with open(os.path.join(src, f"{name}.{ext}"), "wb") as f:
+                        f.write(b"data")
+            file_list = list(os.scandir(src))
+
+            failures = sort_files(
+                src,
+                dst,
+                True,
+                lambda *_: None,
+                file_list,
+                len(file_list),
+                jobs=2,
+                converter=STUB_CONVERTER,
+            )
+
+            self.assertEqual(failures, [])
+            converted = os.listdir(os.path.join(dst, "Game", "Conv"))
+            self.assertEqual(sorted(converted), [f"{n}-sdr.png" for n in names])
+
+
+class RecordingPool(ConversionPool):
+    """
+    Remembers the order the conversions were submitted in.
+    """
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.order = []
+
+    def submit(self, src_path, dst_path):
+        self.order.append(os.path.basename(src_path))
+        return super().submit(src_path, dst_path)
+
+
+class TestPairedConversion(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "src")
+        self.dst = os.path.join(self.tmp.name, "dst")
+        os.makedirs(self.src)
+        os.makedirs(self.dst)
+        captures = {"0": b"png", "1": b"png", "2": b"", "3": None, "4": None}
+        for i, png in captures.items():
+            name = f"Game 01_02_2024 10_00_0{i}"
+            with open(os.path.join(self.src, name + ".jxr"), "wb") as f:
+                f.write(b"jxr")
+            if png is not None:
+                with open(os.path.join(self.src, name + ".png"), "wb") as f:
+                    f.write(png)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def converted(self):
+        return sorted(os.listdir(os.path.join(self.dst, "Game", "Conv")))
+
+    def test_skip_conversion_of_captures_with_png(self):
+        failures = sort_files(
+            self.src,
+            self.dst,
+            True,
+            lambda *_: None,
+            converter=STUB_CONVERTER,
+            paired_conversion="skip",
+        )
+
+        self.assertEqual(failures, [])
+        self.assertEqual(len(os.listdir(os.path.join(self.dst, "Game", "JXR"))), 5)
+        # An empty PNG does not replace the conversion.
+        self.assertEqual(
+            self.converted(),
+            [f"Game 01_02_2024 10_00_0{i}-sdr.png" for i in ("2", "3", "4")],
+        )
+
+    def test_defer_conversion_of_captures_with_png(self):
+        pool = RecordingPool(command=STUB_CONVERTER)
+
+        sort_files(
+            self.src,
+            self.dst,
+            True,
+            lambda *_: None,
+            pool=pool,
+            paired_conversion="defer",
+        )
+        failures = pool.join()
+
+        self.assertEqual(failures, [])
+        self.assertEqual(len(self.converted()), 5)
+        self.assertEqual(
+            sorted(pool.order[-2:]),
+            [f"Game 01_02_2024 10_00_0{i}.jxr" for i in ("0", "1")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,86 @@
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from conversion import ConversionCache, open_pool
+from sort import convert_library
+from test_conversion import STUB_CONVERTER
+
+
+def write(path, content=b"jxr"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+
+
+class TestConversionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.src = os.path.join(self.root, "Game", "JXR", "a.jxr")
+        self.dst = os.path.join(self.root, "Game", "Conv", "a-sdr.png")
+        write(self.src)
+        write(self.dst, b"png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_until_source_changes(self):
+        cache = ConversionCache.load(self.root, STUB_CONVERTER)
+        self.assertFalse(cache.is_fresh(self.src, self.dst))
+
+        cache.record(self.src, self.dst)
+        cache.save()
+        cache = ConversionCache.load(self.root, STUB_CONVERTER)
+        self.assertTrue(cache.is_fresh(self.src, self.dst))
+
+        write(self.src, b"changed")
+        self.assertFalse(cache.is_fresh(self.src, self.dst))
+
+    def test_missing_output_is_stale(self):
+        cache = ConversionCache.load(self.root, STUB_CONVERTER)
+        cache.record(self.src, self.dst)
+        os.remove(self.dst)
+
+        self.assertFalse(cache.is_fresh(self.src, self.dst))
+
+    def test_converter_change_is_stale(self):
+        cache = ConversionCache.load(self.root, STUB_CONVERTER)
+        cache.record(self.src, self.dst)
+        cache.version = "other"
+
+        self.assertFalse(cache.is_fresh(self.src, self.dst))
+
+    def test_hash_accepts_touched_source(self):
+        cache = ConversionCache.load(self.root, STUB_CONVERTER, use_hash=True)
+        cache.record(self.src, self.dst)
+        stat = os.stat(self.src)
+        os.utime(self.src, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        self.assertTrue(cache.is_fresh(self.src, self.dst))
+
+
+class TestConvertLibrary(unittest.TestCase):
+    def test_only_stale_conversions_run(self):
+        with tempfile.TemporaryDirectory() as root:
+            for name in ["a", "b", "c"]:
+                write(os.path.join(root, "Game", "JXR", f"{name}.jxr"))
+
+            failures, skipped = convert_library(root, 2, STUB_CONVERTER)
+            self.assertEqual((failures, skipped), ([], 0))
+            self.assertEqual(len(os.listdir(os.path.join(root, "Game", "Conv"))), 3)
+
+            os.remove(os.path.join(root, "Game", "Conv", "b-sdr.png"))
+            failures, skipped = convert_library(root, 2, STUB_CONVERTER)
+            self.assertEqual((failures, skipped), ([], 2))
+
+            failures, skipped = convert_library(root, 2, STUB_CONVERTER, force=True)
+            self.assertEqual((failures, skipped), ([], 0))
+
+    def test_pool_without_cache(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.assertIsNone(open_pool(root, use_cache=False).cache)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,125 @@
+import os
+import tempfile
+from unittest import mock
+
+import dedup
+from tests import RichTestRunner, unittest
+from dedup import (
+    PARTIAL_BLOCK_SIZE,
+    dedup_library,
+    duplicate_size,
+    find_duplicates,
+    find_new_duplicates,
+    link_duplicates,
+)
+from sort import sort_files
+
+
+def write(folder, name, data):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as file:
+        file.write(data)
+    return path
+
+
+class TestFindDuplicates(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+        self.data = os.urandom(3 * PARTIAL_BLOCK_SIZE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_identical_files_are_grouped(self):
+        a = write(self.folder, "a.png", self.data)
+        b = write(self.folder, "b.png", self.data)
+        write(self.folder, "c.png", os.urandom(len(self.data)))
+        write(self.folder, "d.png", self.data[:-1])
+
+        groups = find_duplicates(
+            [os.path.join(self.folder, name) for name in os.listdir(self.folder)]
+        )
+
+        self.assertEqual(groups, [dedup.DuplicateGroup(len(self.data), [a, b])])
+        self.assertEqual(duplicate_size(groups), len(self.data))
+
+    def test_only_the_middle_differs(self):
+        middle = bytearray(self.data)
+        middle[len(middle) // 2] ^= 0xFF
+        paths = [
+            write(self.folder, "a.png", self.data),
+            write(self.folder, "b.png", bytes(middle)),
+        ]
+
+        self.assertEqual(find_duplicates(paths), [])
+
+    def test_unique_sizes_are_never_read(self):
+        paths = [write(self.folder, f"{i}.png", os.urandom(100 + i)) for i in range(5)]
+
+        with mock.patch.object(dedup, "partial_digest") as partial, mock.patch.object(
+            dedup, "file_digest"
+        ) as full:
+            self.assertEqual(find_duplicates(paths), [])
+
+        partial.assert_not_called()
+        full.assert_not_called()
+
+    def test_small_files_are_not_hashed_twice(self):
+        paths = [write(self.folder, f"{i}.png", b"same") for i in range(2)]
+
+        with mock.patch.object(dedup, "file_digest") as full:
+            self.assertEqual(len(find_duplicates(paths)), 1)
+
+        full.assert_not_called()
+
+    def test_duplicates_are_linked(self):
+        write(self.folder, "a.png", self.data)
+        write(self.folder, "b.png", self.data)
+
+        groups, (freed, failed) = dedup_library(self.folder, link=True)
+
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(freed, len(self.data))
+        self.assertEqual(failed, [])
+        a, b = groups[0].paths
+        self.assertTrue(os.path.samefile(a, b))
+        self.assertEqual(dedup_library(self.folder)[0], [])
+
+    def test_new_duplicates_only(self):
+        old = [write(self.folder, f"old{i}.png", self.data) for i in range(2)]
+        new = write(self.folder, "new.png", b"new")
+        copy = write(self.folder, "copy.png", b"new")
+
+        groups = find_new_duplicates([new])
+
+        self.assertEqual([group.paths for group in groups], [[copy, new]])
+        self.assertEqual(link_duplicates([]), (0, []))
+        self.assertEqual(len(find_duplicates(old)), 1)
+
+
+class TestSortDedup(unittest.TestCase):
+    def test_sort_reports_duplicates(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            data = os.urandom(1024)
+            for i in range(3):
+                write(src, f"Halo 01_02_2024 10_00_0{i}.png", data if i else b"x")
+            found = []
+
+            sort_files(
+                src,
+                dst,
+                False,
+                lambda *_: None,
+                dedup="report",
+                on_duplicates=lambda groups, freed: found.append((groups, freed)),
+            )
+
+            groups, freed = found[0]
+            self.assertEqual(len(groups), 1)
+            self.assertEqual(len(groups[0].paths), 2)
+            self.assertEqual(freed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,59 @@
+from tests import RichTestRunner, unittest
+from game_names import GameMatcher, find_game_name
+
+COMMON_PARTS = [
+    "Avatar Frontiers of Pandora™",
+    "Cyberpunk 2077",
+    "Skull And Bones",
+    "Halo",
+    "Halo Infinite",
+]
+
+
+class TestGameMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = GameMatcher(COMMON_PARTS)
+
+    def test_real_case(self):
+        self.assertEqual(
+            self.matcher.match("Skull And Bones 01_02_2024 10_00_00.png"),
+            "Skull And Bones",
+        )
+
+    def test_longest_game_wins(self):
+        self.assertEqual(
+            self.matcher.match("Halo Infinite 01_02_2024 10_00_00.png"),
+            "Halo Infinite",
+        )
+        self.assertEqual(self.matcher.match("Halo 01_02_2024 10_00_00.png"), "Halo")
+
+    def test_default(self):
+        self.assertEqual(self.matcher.match("Unknown 01_02_2024.png"), "Default")
+        self.assertEqual(self.matcher.match("Screenshot Halo.png"), "Default")
+        self.assertEqual(self.matcher.match("Ce PC 01_02_2024.png"), "Default")
+
+    def test_match_many(self):
+        names = [
+            "Cyberpunk 2077 01_02_2024 10_00_00.jxr",
+            "Photos 01_02_2024.png",
+            "Avatar Frontiers of Pandora™ 01_02_2024 10_00_00.png",
+        ]
+        self.assertEqual(
+            self.matcher.match_many(names),
+            ["Cyberpunk 2077", "Default", "Avatar Frontiers of Pandora™"],
+        )
+
+    def test_same_results_as_find_game_name(self):
+        names = [
+            "Skull And Bones 01_02_2024 10_00_00.png",
+            "Cyberpunk 2077 18_12_2023 15_48_04.jxr",
+            "Minecraft 01_02_2024.png",
+        ]
+        self.assertEqual(
+            self.matcher.match_many(names),
+            [find_game_name(name, COMMON_PARTS) for name in names],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,197 @@
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from journal import (
+    JOURNAL_FILENAME,
+    Journal,
+    compact_journal,
+    pending_conversions,
+    read_journal,
+    undo_journal,
+)
+from args import args_execute_plan
+from plan import export_plan
+from sort import build_plan, sort_files
+from test_conversion import STUB_CONVERTER
+
+
+def touch(folder, name):
+    with open(os.path.join(folder, name), "w"):
+        pass
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_records_are_read_back(self):
+        journal = Journal.open(self.folder, sync_every=2)
+        journal.begin("src", "dst")
+        journal.move("src/a.jxr", "dst/a.jxr")
+        journal.queued("dst/a.jxr", "dst/a-sdr.png")
+        journal.queued("dst/b.jxr", "dst/b-sdr.png")
+        journal.converted("dst/a.jxr", "dst/a-sdr.png", 0)
+        journal.close()
+        with open(os.path.join(self.folder, JOURNAL_FILENAME), "a") as file:
+            file.write('{"op": "move", "src"')
+
+        records = read_journal(os.path.join(self.folder, JOURNAL_FILENAME))
+
+        self.assertEqual(
+            [record["op"] for record in records],
+            ["begin", "move", "queue", "queue", "convert"],
+        )
+        self.assertEqual(pending_conversions(records), [("dst/b.jxr", "dst/b-sdr.png")])
+
+    def test_finished_conversions_are_not_pending(self):
+        records = [
+            {"op": "begin"},
+            {"op": "queue", "src": "a.jxr", "dst": "a.png"},
+            {"op": "queue", "src": "b.jxr", "dst": "b.png"},
+            {"op": "queue", "src": "c.jxr", "dst": "c.png"},
+            {"op": "convert", "src": "a.jxr", "dst": "a.png", "code": 1},
+            {"src": "b.jxr", "dst": "b.png"},
+        ]
+        self.assertEqual(
+            pending_conversions(records), [("b.jxr", "b.png"), ("c.jxr", "c.png")]
+        )
+        records.append({"op": "end", "status": "done"})
+        self.assertEqual(pending_conversions(records), [])
+
+    def test_compact_keeps_what_undo_needs(self):
+        journal = Journal.open(self.folder)
+        journal.begin("src", self.folder)
+        journal.move("a.jxr", "b.jxr")
+        journal.queued("b.jxr", "b.png")
+        journal.converted("b.jxr", "b.png", 0)
+        journal.queued("c.jxr", "c.png")
+        journal.converted("c.jxr", "c.png", 0, cached=True)
+        journal.end()
+        journal.close()
+
+        self.assertEqual(compact_journal(journal.path), 1)
+
+        records = read_journal(journal.path)
+        self.assertEqual(
+            [record["op"] for record in records],
+            ["begin", "move", "queue", "queue", "convert", "end"],
+        )
+        self.assertTrue(records[4]["cached"])
+        self.assertEqual(compact_journal(journal.path), 0)
+
+
+class TestJournaledSort(unittest.TestCase):
+    def test_undo_restores_the_source_folder(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            names = [
+                f"Halo 01_02_2024 10_00_0{i}.{ext}"
+                for i in range(3)
+                for ext in ["png", "jxr"]
+            ]
+            for name in names:
+                touch(src, name)
+
+            sort_files(src, dst, True, lambda *_: None, converter=STUB_CONVERTER)
+            self.assertEqual(os.listdir(src), [])
+            self.assertEqual(len(os.listdir(os.path.join(dst, "Halo", "Conv"))), 3)
+
+            restored, skipped = undo_journal(dst)
+
+            self.assertEqual((restored, skipped), (6, []))
+            self.assertEqual(sorted(os.listdir(src)), sorted(names))
+            self.assertEqual(os.listdir(os.path.join(dst, "Halo", "Conv")), [])
+            self.assertFalse(os.path.exists(os.path.join(dst, JOURNAL_FILENAME)))
+
+    def test_executed_plan_can_be_undone(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            names = [f"Halo 01_02_2024 10_00_0{i}.png" for i in range(3)]
+            for name in names:
+                touch(src, name)
+            plan_path = os.path.join(src, "plan.json")
+            export_plan(build_plan(src, dst, False), plan_path)
+
+            args_execute_plan(plan_path)
+            self.assertEqual(os.listdir(src), ["plan.json"])
+            records = read_journal(os.path.join(dst, JOURNAL_FILENAME))
+            self.assertEqual(
+                (records[0]["op"], records[-1]["status"]), ("begin", "done")
+            )
+
+            self.assertEqual(undo_journal(dst), (3, []))
+            self.assertEqual(sorted(os.listdir(src)), names + ["plan.json"])
+
+    def test_undo_removes_the_links(self):
+        with tempfile.TemporaryDirectory() as folder:
+            src = os.path.join(folder, "src")
+            dst = os.path.join(folder, "dst")
+            view = os.path.join(folder, "view")
+            os.makedirs(src)
+            os.makedirs(dst)
+            names = [
+                f"Halo 01_02_2024 10_00_0{i}.{ext}"
+                for i in range(3)
+                for ext in ["png", "jxr"]
+            ]
+            for name in names:
+                touch(src, name)
+
+            sort_files(
+                src,
+                dst,
+                True,
+                lambda *_: None,
+                converter=STUB_CONVERTER,
+                link=True,
+                views=[("date", view)],
+            )
+            os.remove(os.path.join(src, names[0]))
+
+            restored, skipped = undo_journal(dst)
+
+            # The links of a deleted source are now the only copies of the file, so they are kept.
+            kept = os.path.join(dst, "Halo", "PNG", names[0])
+            self.assertEqual(restored, 13)
+            self.assertEqual(len(skipped), 2)
+            self.assertIn((os.path.join(src, names[0]), kept), skipped)
+            self.assertEqual(sorted(os.listdir(src)), sorted(names[1:]))
+            self.assertEqual(os.listdir(os.path.join(dst, "Halo", "Conv")), [])
+            self.assertEqual(os.listdir(os.path.join(dst, "Halo", "JXR")), [])
+            self.assertTrue(os.path.exists(kept))
+            self.assertEqual(
+                [name for _, _, files in os.walk(view) for name in files], [names[0]]
+            )
+
+    def test_interrupted_conversions_are_resumed(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            jxr_path = os.path.join(dst, "Halo", "JXR", "Halo 01_02_2024 10_00_00.jxr")
+            conv_path = os.path.join(
+                dst, "Halo", "Conv", "Halo 01_02_2024 10_00_00-sdr.png"
+            )
+            os.makedirs(os.path.dirname(jxr_path))
+            os.makedirs(os.path.dirname(conv_path))
+            touch(os.path.dirname(jxr_path), os.path.basename(jxr_path))
+            journal = Journal.open(dst)
+            journal.queued(jxr_path, conv_path)
+            journal.close()
+
+            sort_files(src, dst, True, lambda *_: None, converter=STUB_CONVERTER)
+
+            self.assertTrue(os.path.exists(conv_path))
+            records = read_journal(os.path.join(dst, JOURNAL_FILENAME))
+            self.assertEqual(pending_conversions(records), [])
+            self.assertEqual(records[-1]["status"], "done")
+
+    def test_without_journal(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            touch(src, "Halo 01_02_2024 10_00_00.png")
+            sort_files(src, dst, False, lambda *_: None, use_journal=False)
+            self.assertFalse(os.path.exists(os.path.join(dst, JOURNAL_FILENAME)))
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+
+from tests import RichTestRunner, unittest
+from conversion import CONVERSION_CACHE_FILENAME, ConversionCache
+from journal import Journal, undo_journal
+from layout import capture_date, layout_subfolders, migrate_layout
+from sort import library_conversions, sort_files
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w"):
+        pass
+    return path
+
+
+class TestCaptureDate(unittest.TestCase):
+    def test_dates(self):
+        cases = {
+            "Halo 02_03_2024 10_00_00.png": (2024, 3),
+            "Halo 12_31_2023 23_59_59.jxr": (2023, 12),
+            "Halo 5_1_24 1_2_3.png": (2024, 1),
+            "Halo Infinite.png": None,
+            "Halo 40_40_2024 10_00_00.png": None,
+        }
+        for filename, expected in cases.items():
+            with self.subTest(filename=filename):
+                self.assertEqual(capture_date(filename), expected)
+
+    def test_mtime_fallback(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = touch(os.path.join(folder, "Halo.png"))
+            mtime = time.mktime((2021, 7, 15, 12, 0, 0, 0, 0, -1))
+            os.utime(path, (mtime, mtime))
+
+            self.assertEqual(
+                layout_subfolders("Halo.png", path, "date"), ("2021", "07")
+            )
+            self.assertEqual(layout_subfolders("Halo.png", path, "flat"), ())
+
+
+class TestDateLayout(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "src")
+        self.dst = os.path.join(self.tmp.name, "dst")
+        os.makedirs(self.dst)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sort_into_date_folders(self):
+        for day in range(1, 4):
+            touch(os.path.join(self.src, f"Halo 0{day}_02_2024 10_00_00.png"))
+            touch(os.path.join(self.src, f"Halo 0{day}_02_2024 10_00_00.jxr"))
+
+        sort_files(self.src, self.dst, False, lambda *_: None, layout="date")
+
+        for ext in ("PNG", "JXR"):
+            self.assertEqual(
+                len(os.listdir(os.path.join(self.dst, "Halo", ext, "2024", "02"))), 3
+            )
+        conversions = list(library_conversions(self.dst))
+        self.assertEqual(len(conversions), 3)
+        self.assertEqual(
+            os.path.dirname(conversions[0][1]),
+            os.path.join(self.dst, "Halo", "Conv", "2024", "02"),
+        )
+
+    def test_migrate_and_undo(self):
+        game = os.path.join(self.dst, "Halo")
+        jxr = touch(os.path.join(game, "JXR", "Halo 01_02_2024 10_00_00.jxr"))
+        conv = touch(os.path.join(game, "Conv", "Halo 01_02_2024 10_00_00-sdr.png"))
+        png = touch(os.path.join(game, "PNG", "Halo 05_03_2023 10_00_00.png"))
+        cache = ConversionCache.load(self.dst)
+        cache.record(jxr, conv)
+        cache.save()
+        journal = Journal.open(self.dst)
+
+        moved, skipped = migrate_layout(self.dst, "date", journal)
+        journal.close()
+
+        self.assertEqual((moved, skipped), (3, []))
+        new_jxr = os.path.join(game, "JXR", "2024", "02", os.path.basename(jxr))
+        new_conv = os.path.join(game, "Conv", "2024", "02", os.path.basename(conv))
+        self.assertTrue(os.path.exists(new_jxr))
+        self.assertTrue(os.path.exists(new_conv))
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(game, "PNG", "2023", "03", os.path.basename(png))
+            )
+        )
+        self.assertTrue(ConversionCache.load(self.dst).is_fresh(new_jxr, new_conv))
+        self.assertEqual(migrate_layout(self.dst, "date"), (0, []))
+
+        undo_journal(self.dst)
+        self.assertTrue(os.path.exists(jxr))
+        self.assertTrue(os.path.exists(png))
+
+    def test_migrate_back_to_flat_removes_empty_folders(self):
+        game = os.path.join(self.dst, "Halo")
+        touch(os.path.join(game, "PNG", "2024", "02", "Halo 01_02_2024 10_00_00.png"))
+
+        self.assertEqual(migrate_layout(self.dst, "flat"), (1, []))
+
+        self.assertEqual(
+            os.listdir(os.path.join(game, "PNG")), ["Halo 01_02_2024 10_00_00.png"]
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dst, CONVERSION_CACHE_FILENAME))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from benchmarks.library import generate_library, generate_names
+from benchmarks.suite import compare
+from game_names import common_filename_part
+
+
+class TestGenerateNames(unittest.TestCase):
+    def test_pairs_and_games(self):
+        names = generate_names(1000, games=20)
+
+        self.assertEqual(len(names), 1000)
+        self.assertEqual(len(set(names)), 1000)
+        self.assertEqual(names[0].rsplit(".", 1)[0], names[1].rsplit(".", 1)[0])
+        self.assertLessEqual(len(common_filename_part(names)), 20)
+
+    def test_seed(self):
+        self.assertEqual(generate_names(100, seed=1), generate_names(100, seed=1))
+        self.assertNotEqual(generate_names(100, seed=1), generate_names(100, seed=2))
+
+    def test_steam_names(self):
+        names = generate_names(200, steam=1.0)
+
+        self.assertTrue(all(name.endswith("_1.png") for name in names))
+        self.assertTrue(all(name.split("_")[0].isdigit() for name in names))
+
+
+class TestGenerateLibrary(unittest.TestCase):
+    def test_payloads(self):
+        with tempfile.TemporaryDirectory() as folder:
+            names = generate_library(folder, 10, payload="sparse")
+            sizes = {
+                name.rsplit(".", 1)[-1]: os.path.getsize(os.path.join(folder, name))
+                for name in names
+            }
+
+            self.assertEqual(sorted(os.listdir(folder)), sorted(names))
+            self.assertEqual(sizes, {"png": 12 * 1024 * 1024, "jxr": 8 * 1024 * 1024})
+
+
+class TestCompare(unittest.TestCase):
+    def test_regressions(self):
+        results = {"a@10": 1.2, "b@10": 1.3, "c@10": 5.0}
+        baselines = {"a@10": 1.0, "b@10": 1.0}
+
+        self.assertEqual(compare(results, baselines, 0.25), [("b@10", 1.3, 1.0)])
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
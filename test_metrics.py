@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from metrics import Histogram, RunMetrics
+from sort import sort_files
+from test_conversion import STUB_CONVERTER
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(b"x" * size)
+
+
+class TestHistogram(unittest.TestCase):
+    def test_cumulative_buckets(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(
+            histogram.cumulative(), [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+        )
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+
+class TestRunMetrics(unittest.TestCase):
+    def test_eta_uses_the_slowest_stage(self):
+        metrics = RunMetrics()
+        self.assertIsNone(metrics.eta())
+
+        for stage, rate in (("move", 1000), ("convert", 10)):
+            metrics.expect(stage, 200)
+            stage_metrics = metrics.stage(stage)
+            stage_metrics.bytes = 100
+            stage_metrics.first, stage_metrics.last = 0.0, 100 / rate
+
+        self.assertAlmostEqual(metrics.eta(), 10.0)
+
+        metrics.skip("convert", 100)
+        self.assertAlmostEqual(metrics.eta(), 0.1)
+
+    def test_prometheus_lines(self):
+        metrics = RunMetrics()
+        metrics.observe("convert", 0.2, 1000)
+        metrics.exit_code(0)
+        metrics.exit_code(None)
+        metrics.finish("done")
+
+        lines = metrics.prometheus_lines()
+
+        self.assertIn('games_captures_run_status{status="done"} 1', lines)
+        self.assertIn('games_captures_stage_bytes{stage="convert"} 1000', lines)
+        self.assertIn(
+            'games_captures_stage_latency_seconds_bucket{stage="convert",le="0.5"} 1',
+            lines,
+        )
+        self.assertIn('games_captures_conversion_exit_codes{code="error"} 1', lines)
+
+
+class TestSortReport(unittest.TestCase):
+    def test_sort_files_writes_the_reports(self):
+        with tempfile.TemporaryDirectory() as folder:
+            src = os.path.join(folder, "src")
+            dst = os.path.join(folder, "dst")
+            os.makedirs(dst)
+            for i in range(3):
+                write(os.path.join(src, f"Halo 01_02_2024 10_00_0{i}.png"), 100)
+                write(os.path.join(src, f"Halo 01_02_2024 10_00_0{i}.jxr"), 50)
+            write(os.path.join(src, "Halo 01_02_2024 10_00_09 corrupt.jxr"), 50)
+            report_path = os.path.join(folder, "report.json")
+            prometheus_path = os.path.join(folder, "sort.prom")
+
+            sort_files(
+                src,
+                dst,
+                True,
+                lambda *_: None,
+                converter=STUB_CONVERTER,
+                report_path=report_path,
+                prometheus_path=prometheus_path,
+            )
+
+            with open(report_path) as file:
+                report = json.load(file)
+            stages = report["stages"]
+            self.assertEqual(report["status"], "done")
+            self.assertEqual(
+                (stages["scan"]["count"], stages["scan"]["bytes"]), (7, 500)
+            )
+            self.assertEqual(
+                (stages["move"]["count"], stages["move"]["bytes"]), (7, 500)
+            )
+            self.assertEqual(stages["convert"]["count"], 4)
+            # The PNG and JXR of a capture are matched once.
+            self.assertEqual(stages["match"]["count"], 4)
+            self.assertGreaterEqual(stages["mkdir"]["count"], 3)
+            self.assertEqual(report["exit_codes"], {"0": 3, "1": 1})
+            with open(prometheus_path) as file:
+                self.assertIn('stage="move"', file.read())
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
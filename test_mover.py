@@ -0,0 +1,343 @@
+import errno
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from unittest import mock
+
+import mover
+from tests import RichTestRunner, unittest
+from mover import LinkEngine, MoveEngine, copy_file, move_file
+from sort import sort_files
+
+
+def write(folder, name, data):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as file:
+        file.write(data)
+    return path
+
+
+class CrossDeviceEngine(MoveEngine):
+    """
+    Sees the source and destination folders as two devices, so every move is a copy.
+    """
+
+    def __init__(self, dst_folder, **options):
+        super().__init__(**options)
+        self.dst_folder = dst_folder
+
+    def _device(self, path):
+        return 2 if path.startswith(self.dst_folder) else 1
+
+
+class FolderDeviceEngine(MoveEngine):
+    """
+    Sees every folder of `devices` as its own device.
+    """
+
+    def __init__(self, devices, **options):
+        super().__init__(**options)
+        self.devices = devices
+
+    def _device(self, path):
+        return next(
+            device for folder, device in self.devices.items() if path.startswith(folder)
+        )
+
+
+class TestCopy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+        self.data = os.urandom(3 * 1024 * 1024 + 17)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copy_keeps_content_and_mtime(self):
+        src = write(self.folder, "a.jxr", self.data)
+        os.utime(src, (1_000_000, 1_000_000))
+        dst = os.path.join(self.folder, "b.jxr")
+
+        self.assertEqual(copy_file(src, dst), len(self.data))
+
+        with open(dst, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+        self.assertEqual(os.stat(dst).st_mtime, 1_000_000)
+
+    def test_copy_falls_back_when_kernel_copy_is_unsupported(self):
+        src = write(self.folder, "a.jxr", self.data)
+        dst = os.path.join(self.folder, "b.jxr")
+        unsupported = OSError(errno.EXDEV, "Invalid cross-device link")
+
+        with mock.patch.object(
+            mover, "_copy_file_range", side_effect=unsupported
+        ), mock.patch.object(mover, "_sendfile", side_effect=unsupported):
+            copy_file(src, dst)
+
+        with open(dst, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_copy_goes_on_when_a_method_stops_short(self):
+        src = write(self.folder, "a.jxr", self.data)
+        dst = os.path.join(self.folder, "b.jxr")
+        calls = []
+
+        def stops_short(src_fd, dst_fd, count):
+            calls.append(count)
+            return mover._read_write(src_fd, dst_fd, 1000) if len(calls) == 1 else 0
+
+        with mock.patch.object(mover, "_copy_file_range", stops_short):
+            self.assertEqual(copy_file(src, dst), len(self.data))
+
+        with open(dst, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_short_copy_keeps_the_source(self):
+        src = write(self.folder, "a.jxr", self.data)
+        dst = os.path.join(self.folder, "b.jxr")
+        stopped = mock.Mock(return_value=0)
+
+        cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+
+        with mock.patch.object(
+            os, "rename", side_effect=cross_device
+        ), mock.patch.multiple(
+            mover, _copy_file_range=stopped, _sendfile=stopped, _read_write=stopped
+        ):
+            with self.assertRaises(OSError) as context:
+                move_file(src, dst)
+
+        self.assertEqual(context.exception.errno, errno.EIO)
+        self.assertTrue(os.path.exists(src))
+        self.assertFalse(os.path.exists(dst))
+        self.assertFalse(os.path.exists(dst + ".part"))
+
+    def test_move_file_copies_across_devices(self):
+        src = write(self.folder, "a.jxr", self.data)
+        dst = os.path.join(self.folder, "b.jxr")
+
+        with mock.patch.object(
+            os, "rename", side_effect=OSError(errno.EXDEV, "Invalid cross-device link")
+        ):
+            move_file(src, dst, verify=True)
+
+        self.assertFalse(os.path.exists(src))
+        self.assertFalse(os.path.exists(dst + ".part"))
+        with open(dst, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+
+class TestMoveEngine(unittest.TestCase):
+    def setUp(self):
+        self.src_tmp = tempfile.TemporaryDirectory()
+        self.dst_tmp = tempfile.TemporaryDirectory()
+        self.src = self.src_tmp.name
+        self.dst = self.dst_tmp.name
+
+    def tearDown(self):
+        self.src_tmp.cleanup()
+        self.dst_tmp.cleanup()
+
+    def test_same_device_moves_are_renames(self):
+        src = write(self.src, "a.png", b"png")
+        engine = MoveEngine()
+        done = []
+
+        engine.move(src, os.path.join(self.dst, "a.png"), lambda: done.append(True))
+        engine.join()
+
+        self.assertEqual(done, [True])
+        self.assertEqual(engine.copied_files, 0)
+        self.assertEqual(engine.throughput(), 0.0)
+
+    def test_cross_device_moves_are_copied_in_parallel(self):
+        engine = CrossDeviceEngine(self.dst, streams_per_device=3, verify=True)
+        done = []
+        for i in range(8):
+            src = write(self.src, f"{i}.png", bytes([i]) * 1024)
+            engine.move(
+                src, os.path.join(self.dst, f"{i}.png"), lambda i=i: done.append(i)
+            )
+        engine.join()
+        engine.close()
+
+        self.assertEqual(sorted(done), list(range(8)))
+        self.assertEqual(os.listdir(self.src), [])
+        self.assertEqual(len(os.listdir(self.dst)), 8)
+        self.assertEqual(engine.copied_files, 8)
+        self.assertEqual(engine.copied_bytes, 8 * 1024)
+        self.assertGreater(engine.throughput(), 0)
+
+    def test_failed_verification_keeps_the_source(self):
+        src = write(self.src, "a.png", b"png")
+        dst = os.path.join(self.dst, "a.png")
+        engine = CrossDeviceEngine(self.dst, verify=True)
+
+        with mock.patch.object(mover, "file_digest", side_effect=["a", "b"]):
+            engine.move(src, dst)
+            with self.assertRaises(OSError):
+                engine.join()
+        engine.close()
+
+        self.assertTrue(os.path.exists(src))
+        self.assertEqual(os.listdir(self.dst), [])
+
+    def test_slow_device_does_not_hold_back_the_others(self):
+        slow = os.path.join(self.src, "hdd")
+        fast = os.path.join(self.src, "ssd")
+        os.makedirs(slow)
+        os.makedirs(fast)
+        engine = FolderDeviceEngine({slow: 1, fast: 3, self.dst: 2})
+        release = threading.Event()
+        lock = threading.Lock()
+        active = Counter()
+        peak = Counter()
+        copy = mover._copy_and_replace
+
+        def slow_copy(src_path, dst_path, verify):
+            device = 1 if src_path.startswith(slow) else 3
+            with lock:
+                active[device] += 1
+                peak[device] = max(peak[device], active[device])
+            try:
+                if device == 1:
+                    release.wait(5)
+                return copy(src_path, dst_path, verify)
+            finally:
+                with lock:
+                    active[device] -= 1
+
+        done = []
+        with mock.patch.object(mover, "_copy_and_replace", slow_copy):
+            for i in range(6):
+                engine.move(
+                    write(slow, f"{i}.jxr", b"jxr"), os.path.join(self.dst, f"{i}.jxr")
+                )
+                engine.move(
+                    write(fast, f"{i}.png", b"png"),
+                    os.path.join(self.dst, f"{i}.png"),
+                    lambda i=i: done.append(i),
+                )
+            deadline = time.monotonic() + 5
+            while len(done) < 6 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(sorted(done), list(range(6)))
+            release.set()
+            engine.join()
+        engine.close()
+
+        self.assertEqual(peak[1], 2)
+        self.assertLessEqual(peak[3], 2)
+        self.assertEqual(len(os.listdir(self.dst)), 12)
+
+    def test_sort_across_devices(self):
+        for i in range(3):
+            write(self.src, f"Halo 01_02_2024 10_00_0{i}.png", b"png")
+        engine = CrossDeviceEngine(self.dst)
+
+        sort_files(self.src, self.dst, False, lambda *_: None, mover=engine)
+        engine.close()
+
+        self.assertEqual(engine.copied_files, 3)
+        self.assertEqual(len(os.listdir(os.path.join(self.dst, "Halo", "PNG"))), 3)
+
+    def test_failed_sort_closes_its_engine_once(self):
+        write(self.src, "Halo 01_02_2024 10_00_00.png", b"png")
+        failure = OSError(errno.EACCES, "Permission denied")
+
+        with mock.patch.object(
+            MoveEngine, "close", autospec=True
+        ) as close, mock.patch("sort.execute_item", side_effect=failure):
+            with self.assertRaises(OSError) as context:
+                sort_files(self.src, self.dst, False, lambda *_: None)
+
+        self.assertIs(context.exception, failure)
+        self.assertEqual(close.call_count, 1)
+
+
+class CrossDeviceLinkEngine(LinkEngine):
+    def __init__(self, dst_folder):
+        super().__init__()
+        self.dst_folder = dst_folder
+
+    def _device(self, path):
+        return 2 if path.startswith(self.dst_folder) else 1
+
+
+class TestLinkEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "src")
+        self.dst = os.path.join(self.tmp.name, "dst")
+        os.makedirs(self.src)
+        os.makedirs(self.dst)
+        self.file = write(self.src, "a.png", b"png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_device_gets_a_hardlink(self):
+        engine = LinkEngine()
+        dst = os.path.join(self.dst, "a.png")
+        done = []
+
+        engine.move(self.file, dst, lambda: done.append(True))
+        engine.move(self.file, dst)
+
+        self.assertEqual(done, [True])
+        self.assertTrue(os.path.samefile(self.file, dst))
+        self.assertFalse(os.path.islink(dst))
+        self.assertEqual((engine.hardlinks, engine.symlinks), (2, 0))
+        self.assertEqual(os.listdir(self.dst), ["a.png"])
+
+    def test_other_device_gets_a_symlink(self):
+        engine = CrossDeviceLinkEngine(self.dst)
+        dst = os.path.join(self.dst, "a.png")
+
+        engine.move(self.file, dst)
+
+        self.assertTrue(os.path.islink(dst))
+        self.assertEqual(os.readlink(dst), os.path.abspath(self.file))
+        self.assertEqual((engine.hardlinks, engine.symlinks), (0, 1))
+
+    def test_symlink_when_hardlinks_are_not_supported(self):
+        engine = LinkEngine()
+        dst = os.path.join(self.dst, "a.png")
+
+        with mock.patch.object(
+            os, "link", side_effect=OSError(errno.EPERM, "Operation not permitted")
+        ):
+            engine.move(self.file, dst)
+
+        self.assertTrue(os.path.islink(dst))
+        self.assertEqual(engine.symlinks, 1)
+
+    def test_sort_with_links_and_views(self):
+        for i in range(3):
+            write(self.src, f"Halo 01_02_2024 10_00_0{i}.png", b"png")
+        before = sorted(os.listdir(self.src))
+        view = os.path.join(self.tmp.name, "view")
+
+        sort_files(
+            self.src,
+            self.dst,
+            False,
+            lambda *_: None,
+            link=True,
+            views=[("date", view)],
+        )
+
+        self.assertEqual(sorted(os.listdir(self.src)), before)
+        self.assertEqual(len(os.listdir(os.path.join(self.dst, "Halo", "PNG"))), 3)
+        self.assertEqual(
+            len(os.listdir(os.path.join(view, "Halo", "PNG", "2024", "02"))), 3
+        )
+        with self.assertRaises(ValueError):
+            sort_files(self.src, self.dst, False, lambda *_: None, views=[("date", view)])
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,123 @@
+import os
+import queue
+import tempfile
+import threading
+
+from tests import RichTestRunner, unittest
+from pipeline import Pipeline
+from sort import sort_files
+from start_sorting import start_gui_sorting
+
+
+class TestPipeline(unittest.TestCase):
+    def test_stages_are_chained(self):
+        pipeline = (
+            Pipeline(lambda: range(1000), maxsize=4)
+            .add_stage("double", lambda n: n * 2)
+            .add_stage("odd", lambda n: n if n % 4 else None)
+        )
+
+        results = list(pipeline.run())
+
+        self.assertEqual(results, [n * 2 for n in range(1000) if n % 2])
+        stats = {stage.name: stage for stage in pipeline.stats()}
+        self.assertEqual(stats["scan"].processed, 1000)
+        self.assertEqual(stats["odd"].processed, 1000)
+
+    def test_cancel_stops_every_stage(self):
+        def endless():
+            n = 0
+            while True:
+                n += 1
+                yield n
+
+        pipeline = Pipeline(endless, maxsize=2).add_stage("copy", lambda n: n)
+        results = []
+        for n in pipeline.run():
+            results.append(n)
+            if n == 10:
+                pipeline.cancel()
+
+        self.assertTrue(pipeline.cancelled)
+        self.assertLess(len(results), 20)
+
+    def test_stage_errors_are_raised(self):
+        def fail(n):
+            if n == 5:
+                raise ValueError("boom")
+            return n
+
+        pipeline = Pipeline(lambda: range(100)).add_stage("fail", fail)
+
+        with self.assertRaises(ValueError):
+            list(pipeline.run())
+
+
+class TestStreamingSort(unittest.TestCase):
+    def test_cancel_event_stops_the_pipeline(self):
+        event = threading.Event()
+        pipeline = Pipeline(lambda: iter(int, 1), cancel_event=event)
+
+        for count, _ in enumerate(pipeline.run(), start=1):
+            if count == 10:
+                event.set()
+
+        self.assertTrue(pipeline.cancelled)
+
+    def test_sort_files_scans_the_source_folder(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            for i in range(5):
+                with open(os.path.join(src, f"Game 01_02_2024 10_00_0{i}.png"), "w"):
+                    pass
+            progress = []
+
+            sort_files(src, dst, False, lambda *args: progress.append(args[:2]))
+
+            self.assertEqual(progress[-1], (5, 5))
+            self.assertEqual(len(os.listdir(os.path.join(dst, "Game", "PNG"))), 5)
+            self.assertEqual(os.listdir(src), [])
+
+
+class TestGuiSorting(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "src")
+        self.dst = os.path.join(self.tmp.name, "dst")
+        os.makedirs(self.src)
+        os.makedirs(self.dst)
+        for i in range(50):
+            with open(
+                os.path.join(self.src, f"Game 01_02_2024 10_00_{i:02d}.png"), "w"
+            ):
+                pass
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_worker(self, cancel_event=None):
+        messages = queue.Queue()
+        start_gui_sorting(
+            self.src, self.dst, False, messages, cancel_event=cancel_event
+        ).join(timeout=10)
+        return [messages.get_nowait() for _ in range(messages.qsize())]
+
+    def test_progress_is_throttled_and_ends_with_done(self):
+        messages = self.run_worker()
+
+        progress = [values for kind, values in messages if kind == "progress"]
+        self.assertLess(len(progress), 50)
+        self.assertEqual(progress[-1][:2], (50, 50))
+        self.assertEqual(messages[-1], ("done", []))
+
+    def test_cancelled_before_start(self):
+        event = threading.Event()
+        event.set()
+
+        messages = self.run_worker(event)
+
+        self.assertEqual(messages[-1], ("done", []))
+        self.assertEqual(len(os.listdir(self.src)), 50)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+import tempfile
+
+from tests import RichTestRunner, unittest
+from conversion import CONVERSION_CACHE_FILENAME
+from plan import (
+    PlanItem,
+    execute_plan,
+    export_plan,
+    load_plan,
+    plan_destination,
+    plan_directories,
+)
+from sort import build_plan
+from start_sorting import start_args_plan
+
+STUB_CONVERTER = [
+    sys.executable,
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "hdrfix_stub.py"),
+]
+
+NAMES = [f"Halo Infinite 01_02_2024 10_00_0{i}" for i in range(3)]
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "src")
+        self.dst = os.path.join(self.tmp.name, "dst")
+        os.makedirs(self.src)
+        os.makedirs(self.dst)
+        for name in NAMES:
+            for ext in ["png", "jxr"]:
+                with open(os.path.join(self.src, f"{name}.{ext}"), "w"):
+                    pass
+        with open(os.path.join(self.src, "notes.txt"), "w"):
+            pass
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_plan_does_not_touch_files(self):
+        plan = build_plan(self.src, self.dst, True)
+
+        self.assertEqual(len(plan), 6)
+        self.assertEqual(os.listdir(self.dst), [])
+        self.assertEqual(len(os.listdir(self.src)), 7)
+        jxr = [item for item in plan if item.src_path.endswith(".jxr")]
+        self.assertTrue(all(item.conv_path for item in jxr))
+        self.assertEqual(
+            plan_directories(plan),
+            [
+                os.path.join(self.dst, "Halo Infinite", folder)
+                for folder in ["Conv", "JXR", "PNG"]
+            ],
+        )
+
+    def test_export_and_load(self):
+        plan = build_plan(self.src, self.dst, False)
+        for extension in ["json", "csv"]:
+            path = os.path.join(self.tmp.name, f"plan.{extension}")
+            export_plan(plan, path)
+            self.assertEqual(load_plan(path), plan)
+
+    def test_execute_plan(self):
+        plan = build_plan(self.src, self.dst, False)
+        progress = []
+
+        executed = execute_plan(
+            plan, update_progress=lambda *args: progress.append(args)
+        )
+
+        self.assertEqual(executed, 6)
+        self.assertEqual(progress[-1], (6, 6))
+        self.assertEqual(os.listdir(self.src), ["notes.txt"])
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.dst, "Halo Infinite", "JXR"))), 3
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dst, "Halo Infinite", "Conv"))
+        )
+
+    def test_plan_destination(self):
+        plan = build_plan(self.src, self.dst, True, layout="date")
+
+        self.assertEqual(plan_destination(plan), self.dst)
+        self.assertEqual(
+            plan_destination(build_plan(self.src, self.dst, False)), self.dst
+        )
+        self.assertIsNone(plan_destination([]))
+
+    def test_executed_plan_updates_the_conversion_cache(self):
+        plan = build_plan(self.src, self.dst, True)
+
+        failures = start_args_plan(plan, converter=STUB_CONVERTER)
+
+        self.assertEqual(failures, [])
+        with open(os.path.join(self.dst, CONVERSION_CACHE_FILENAME)) as file:
+            self.assertEqual(len(json.load(file)["entries"]), 3)
+
+    def test_plan_item_without_conversion(self):
+        item = PlanItem("a.png", "Game", "Game/PNG/a.png", None)
+        self.assertEqual(plan_directories([item]), ["Game/PNG"])
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,68 @@
+import os
+import pstats
+import tempfile
+import threading
+
+from tests import RichTestRunner, unittest
+from benchmarks.library import generate_library
+from profiling import RunProfiler, format_report, module_name
+from sort import sort_files
+
+
+def busy(count):
+    return sum(str(n).count("7") for n in range(count))
+
+
+class TestModuleName(unittest.TestCase):
+    def test_names(self):
+        self.assertEqual(module_name(os.path.join("repo", "game_names.py")), "game_names")
+        self.assertEqual(module_name(os.path.join("repo", "json", "__init__.py")), "json")
+        self.assertEqual(module_name("<frozen posixpath>"), "posixpath")
+        self.assertEqual(module_name("~"), "<built-in>")
+
+
+class TestRunProfiler(unittest.TestCase):
+    def test_threads_are_profiled(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "run.prof")
+            with RunProfiler(path) as profiler:
+                thread = threading.Thread(target=busy, args=(20000,))
+                thread.start()
+                thread.join()
+
+            functions = {key[2] for key in pstats.Stats(path).stats}
+            report = profiler.report()
+
+        self.assertIn("busy", functions)
+        self.assertTrue(report.hotspots)
+        self.assertIsNone(report.memory_peak)
+
+    def test_sort_files_report(self):
+        with tempfile.TemporaryDirectory() as folder:
+            src, dst = os.path.join(folder, "src"), os.path.join(folder, "dst")
+            generate_library(src, 60, games=3)
+            os.makedirs(dst)
+            path = os.path.join(folder, "sort.prof")
+
+            with RunProfiler(path, trace_memory=True) as profiler:
+                sort_files(src, dst, False, lambda *args: None)
+            report = profiler.report()
+
+        modules = {name for name, _ in report.modules}
+        self.assertTrue({"sort", "game_names"} <= modules)
+        self.assertGreater(report.memory_peak, 0)
+        self.assertTrue(report.memory_modules)
+        self.assertIn(f"Profil enregistré : {path}", format_report(report))
+
+    def test_memory_only(self):
+        with RunProfiler(trace_memory=True) as profiler:
+            data = [bytes(1024) for _ in range(1000)]
+        report = profiler.report()
+
+        self.assertEqual(report.hotspots, [])
+        self.assertGreaterEqual(report.memory_peak, 1024 * 1000)
+        del data
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from registry import REGISTRY_FILENAME, GameRegistry
+from sort import sort_files
+
+
+def touch(folder, name):
+    with open(os.path.join(folder, name), "w"):
+        pass
+
+
+class TestGameRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dst = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_seeded_from_existing_folders(self):
+        os.makedirs(os.path.join(self.dst, "Halo Infinite", "PNG"))
+        os.makedirs(os.path.join(self.dst, "Default", "PNG"))
+        os.makedirs(os.path.join(self.dst, "Not a game"))
+
+        registry = GameRegistry.load(self.dst)
+
+        self.assertEqual(registry.games, ["Halo Infinite"])
+
+    def test_decisions_are_saved_and_reloaded(self):
+        registry = GameRegistry.load(self.dst)
+        registry.record("Halo Infinite 01_02_2024 10_00_00.png", "Halo Infinite")
+        registry.record("Photos 01_02_2024.png", "Default")
+        registry.save()
+
+        reloaded = GameRegistry.load(self.dst)
+
+        self.assertEqual(reloaded.games, ["Halo Infinite"])
+        self.assertEqual(
+            reloaded.lookup("Halo Infinite 05_06_2024 12_00_00.jxr"), "Halo Infinite"
+        )
+        self.assertIsNone(reloaded.lookup("Photos 01_02_2024.png"))
+
+    def test_corrupted_file_is_ignored(self):
+        with open(os.path.join(self.dst, REGISTRY_FILENAME), "w") as file:
+            file.write("{not json")
+
+        self.assertEqual(GameRegistry.load(self.dst).games, [])
+
+    def test_merge(self):
+        registry = GameRegistry("unused", games=["Halo Infinite"])
+        self.assertEqual(
+            registry.merge(["Skull And Bones", "Halo Infinite"]),
+            ["Halo Infinite", "Skull And Bones"],
+        )
+
+
+class TestIncrementalSort(unittest.TestCase):
+    def test_few_new_captures_go_to_known_game(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            for i in range(3):
+                touch(src, f"Halo Infinite 01_02_2024 10_00_0{i}.png")
+            sort_files(src, dst, False, lambda *_: None)
+
+            touch(src, "Halo Infinite 02_03_2024 11_00_00.png")
+            sort_files(src, dst, False, lambda *_: None)
+
+            self.assertEqual(
+                len(os.listdir(os.path.join(dst, "Halo Infinite", "PNG"))), 4
+            )
+            with open(os.path.join(dst, REGISTRY_FILENAME), encoding="utf-8") as file:
+                self.assertEqual(json.load(file)["games"], ["Halo Infinite"])
+
+    def test_without_registry(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            os.makedirs(os.path.join(dst, "Halo Infinite", "PNG"))
+            touch(src, "Halo Infinite 02_03_2024 11_00_00.png")
+
+            sort_files(src, dst, False, lambda *_: None, use_registry=False)
+
+            self.assertEqual(
+                os.listdir(os.path.join(dst, "Default", "PNG")),
+                ["Halo Infinite 02_03_2024 11_00_00.png"],
+            )
+            self.assertFalse(os.path.exists(os.path.join(dst, REGISTRY_FILENAME)))
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
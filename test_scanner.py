@@ -0,0 +1,211 @@
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from game_names import common_filename_part, stream_common_parts
+from scanner import (
+    CaptureUnit,
+    FileRecord,
+    group_captures,
+    merge_scans,
+    scan_files,
+)
+from sort import build_scanner, sort_files
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w"):
+        pass
+    return path
+
+
+class TestScanFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = self.tmp.name
+        touch(os.path.join(self.src, "Halo 1.png"))
+        touch(os.path.join(self.src, "notes.txt"))
+        touch(os.path.join(self.src, ".hidden.png"))
+        touch(os.path.join(self.src, "2024", "Forza 1.jxr"))
+        touch(os.path.join(self.src, "2024", "old", "Halo 2.PNG"))
+        touch(os.path.join(self.src, ".trash", "Halo 3.png"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def names(self, **options):
+        return sorted(entry.name for entry in scan_files(self.src, **options))
+
+    def test_depth(self):
+        self.assertEqual(self.names(), ["Halo 1.png"])
+        self.assertEqual(self.names(max_depth=1), ["Forza 1.jxr", "Halo 1.png"])
+        self.assertEqual(
+            self.names(max_depth=None), ["Forza 1.jxr", "Halo 1.png", "Halo 2.PNG"]
+        )
+
+    def test_globs(self):
+        self.assertEqual(
+            self.names(max_depth=None, include=["halo*"]), ["Halo 1.png", "Halo 2.PNG"]
+        )
+        self.assertEqual(
+            self.names(max_depth=None, exclude=["2024/old"]),
+            ["Forza 1.jxr", "Halo 1.png"],
+        )
+        self.assertEqual(
+            self.names(max_depth=None, include=["2024/*.jxr"]), ["Forza 1.jxr"]
+        )
+
+    def test_prune(self):
+        pruned = os.path.join(self.src, "2024")
+        self.assertEqual(
+            self.names(max_depth=None, prune=lambda path: path == pruned),
+            ["Halo 1.png"],
+        )
+
+    def test_records(self):
+        entry = next(scan_files(os.path.join(self.src, "2024")))
+        self.assertIsInstance(entry, FileRecord)
+        self.assertFalse(hasattr(entry, "__dict__"))
+        self.assertEqual(entry.path, os.path.join(self.src, "2024", "Forza 1.jxr"))
+        self.assertEqual(entry.stat().st_size, 0)
+
+
+class TestGroupCaptures(unittest.TestCase):
+    def units(self, names, **options):
+        records = [FileRecord(*name.rsplit("/", 1)) for name in names]
+        return [
+            [record.name for record in getattr(unit, "records", (unit,))]
+            for unit in group_captures(records, **options)
+        ]
+
+    def test_siblings_are_grouped(self):
+        units = self.units(
+            ["a/Halo 1.jxr", "a/Forza 1.png", "a/Halo 1.png", "b/Forza 1.jxr"]
+        )
+        self.assertEqual(
+            sorted(units),
+            [["Forza 1.jxr"], ["Forza 1.png"], ["Halo 1.png", "Halo 1.jxr"]],
+        )
+
+    def test_same_extension_is_not_a_sibling(self):
+        self.assertEqual(
+            sorted(self.units(["a/Halo 1.png", "a/Halo 1.PNG"])),
+            [["Halo 1.PNG"], ["Halo 1.png"]],
+        )
+
+    def test_window(self):
+        names = ["a/Halo 1.png", "a/Halo 2.png", "a/Halo 3.png", "a/Halo 1.jxr"]
+        self.assertEqual(len(self.units(names)), 3)
+        self.assertEqual(len(self.units(names, window=1)), 4)
+
+    def test_unit(self):
+        records = [FileRecord("a", "1.png"), FileRecord("a", "1.jxr")]
+        unit = next(group_captures(records))
+        self.assertIsInstance(unit, CaptureUnit)
+        self.assertEqual(unit.name, "1.png")
+        self.assertEqual(unit.path, os.path.join("a", "1.png"))
+
+
+class TestStreamCommonParts(unittest.TestCase):
+    def test_same_as_common_filename_part(self):
+        names = [
+            f"{game} {day:02d}_01_2024 10_00_00.png"
+            for game in ("Halo Infinite", "Forza Horizon 5", "Forza Motorsport")
+            for day in range(1, 6)
+        ] + ["Celeste 01_01_2024 10_00_00.png"]
+
+        self.assertEqual(
+            sorted(stream_common_parts(lambda: iter(names))),
+            sorted(common_filename_part(names)),
+        )
+
+    def test_names_starting_with_spaces(self):
+        for names in (
+            [" Foo 1.png", " Foo 2.png", " Foo 3.png"],
+            [" Foo 1.png", " Foo 2.png", "Foo 3.png", "Bar 1.png"],
+        ):
+            self.assertEqual(
+                stream_common_parts(lambda: iter(names)), common_filename_part(names)
+            )
+
+
+class TestRecursiveSort(unittest.TestCase):
+    def test_sort_subfolders_in_place(self):
+        with tempfile.TemporaryDirectory() as folder:
+            touch(os.path.join(folder, "Halo 1.png"))
+            touch(os.path.join(folder, "2024", "Halo 2.png"))
+            touch(os.path.join(folder, "Halo", "PNG", "Halo 0.png"))
+
+            names = sorted(
+                entry.name for entry in build_scanner(folder, folder, max_depth=None)()
+            )
+            self.assertEqual(names, ["Halo 1.png", "Halo 2.png"])
+
+            sort_files(folder, folder, False, lambda *_: None, max_depth=None)
+
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(folder, "Halo", "PNG"))),
+                ["Halo 0.png", "Halo 1.png", "Halo 2.png"],
+            )
+
+
+class TestMultipleSources(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+        self.game_bar = os.path.join(self.folder, "Captures")
+        self.backup = os.path.join(self.folder, "Backup")
+        self.dst = os.path.join(self.folder, "Sorted")
+        os.makedirs(self.dst)
+        for day in range(1, 4):
+            name = f"Halo Infinite 0{day}_01_2024 10_00_00"
+            touch(os.path.join(self.game_bar, name + ".png"))
+            touch(os.path.join(self.backup, name + ".jxr"))
+        touch(os.path.join(self.backup, "Captures", "Celeste 01_01_2024 10_00_00.png"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_merge_scans(self):
+        def scan(count):
+            return lambda: (FileRecord("folder", str(i)) for i in range(count))
+
+        records = merge_scans([(1, scan(3)), (2, scan(500)), (1, scan(2))])
+        self.assertEqual(len([record.name for record in records]), 505)
+
+    def test_merge_scans_raises_errors(self):
+        def failing():
+            yield FileRecord("folder", "a.png")
+            raise OSError("disk removed")
+
+        with self.assertRaises(OSError):
+            list(merge_scans([(1, failing), (2, lambda: iter(()))]))
+
+    def test_nested_sources_are_scanned_once(self):
+        scan = build_scanner(
+            [
+                self.backup,
+                os.path.join(self.backup, "Captures"),
+                self.game_bar,
+                self.game_bar + os.sep,
+            ],
+            self.dst,
+            max_depth=None,
+        )
+        paths = sorted(record.path for record in scan())
+        self.assertEqual(len(paths), 7)
+        self.assertEqual(len(set(paths)), 7)
+
+    def test_sort_several_sources(self):
+        sort_files([self.game_bar, self.backup], self.dst, False, lambda *_: None)
+
+        self.assertEqual(os.listdir(self.game_bar), [])
+        self.assertEqual(os.listdir(self.backup), ["Captures"])
+        game_folder = os.path.join(self.dst, "Halo Infinite")
+        self.assertEqual(len(os.listdir(os.path.join(game_folder, "PNG"))), 3)
+        self.assertEqual(len(os.listdir(os.path.join(game_folder, "JXR"))), 3)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
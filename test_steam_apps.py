@@ -0,0 +1,102 @@
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from sort import sort_files
+from steam_apps import HEADER, RECORD, SteamAppIndex, build_index, read_app_list
+
+
+class TestSteamAppIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "apps.idx")
+        build_index(
+            {
+                1091500: "Cyberpunk 2077",
+                220: "Half-Life 2",
+                1774580: "STAR WARS Jedi: Survivor",
+                5: " ",
+            },
+            self.path,
+        )
+        self.index = SteamAppIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_lookup(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.lookup(220), "Half-Life 2")
+        self.assertEqual(self.index.lookup(1091500), "Cyberpunk 2077")
+        self.assertIsNone(self.index.lookup(5))
+        self.assertIsNone(self.index.lookup(1))
+        self.assertIsNone(self.index.lookup(2**31))
+
+    def test_game_bar_name(self):
+        self.assertEqual(
+            self.index.game_bar_name("1774580_20230927184252_1.png"),
+            "STAR WARS Jedi_ Survivor 27_09_2023 18_42_52.png",
+        )
+        for name in ("42_20230927184252_1.png", "Halo 01_02_2024 10_00_00.png"):
+            self.assertEqual(self.index.game_bar_name(name), name)
+
+    def test_missing_or_invalid_index(self):
+        invalid = os.path.join(self.tmp.name, "invalid.idx")
+        with open(invalid, "wb") as file:
+            file.write(b"not an index at all")
+
+        for path in (os.path.join(self.tmp.name, "missing.idx"), invalid):
+            index = SteamAppIndex(path)
+            self.assertEqual(len(index), 0)
+            self.assertIsNone(index.lookup(220))
+
+    def test_truncated_index(self):
+        with open(self.path, "rb") as file:
+            data = file.read()
+        truncated = os.path.join(self.tmp.name, "truncated.idx")
+        with open(truncated, "wb") as file:
+            file.write(data[: HEADER.size + RECORD.size])
+        cut_names = os.path.join(self.tmp.name, "cut_names.idx")
+        with open(cut_names, "wb") as file:
+            file.write(data[:-5])
+
+        with self.assertWarns(UserWarning):
+            index = SteamAppIndex(truncated)
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.lookup(220))
+
+        index = SteamAppIndex(cut_names)
+        self.assertEqual(index.lookup(220), "Half-Life 2")
+        with self.assertWarns(UserWarning):
+            self.assertIsNone(index.lookup(1774580))
+        self.assertEqual(len(index), 0)
+        index.close()
+
+    def test_read_app_list(self):
+        path = os.path.join(self.tmp.name, "apps.json")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write('{"applist": {"apps": [{"appid": 220, "name": "Half-Life 2"}]}}')
+
+        self.assertEqual(read_app_list(path), {220: "Half-Life 2"})
+
+
+class TestSteamSorting(unittest.TestCase):
+    def test_steam_and_game_bar_captures_share_a_folder(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            names = [f"Cyberpunk 2077 01_02_2024 10_00_0{i}.png" for i in range(3)]
+            names += [f"1091500_2024020310000{i}_1.png" for i in range(2)]
+            for name in names:
+                with open(os.path.join(src, name), "w"):
+                    pass
+
+            sort_files(src, dst, False, lambda *args: None)
+
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(dst, "Cyberpunk 2077", "PNG"))),
+                sorted(names),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
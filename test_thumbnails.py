@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+
+from tests import RichTestRunner, unittest
+from thumbnails import (
+    THUMBNAILS_FOLDER,
+    THUMBNAILS_INDEX,
+    build_thumbnails,
+    contact_sheet_name,
+    thumbnails_available,
+)
+
+if thumbnails_available():
+    from PIL import Image
+
+
+def make_image(folder, name, color=(255, 0, 0)):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    Image.new("RGB", (640, 360), color).save(path)
+    return path
+
+
+@unittest.skipUnless(thumbnails_available(), "Pillow n'est pas installé")
+class TestThumbnails(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dst = self.tmp.name
+        self.game = os.path.join(self.dst, "Halo")
+        self.thumbnails = os.path.join(self.game, THUMBNAILS_FOLDER)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_index(self):
+        with open(os.path.join(self.thumbnails, THUMBNAILS_INDEX)) as file:
+            return json.load(file)
+
+    def test_thumbnails_and_contact_sheet(self):
+        make_image(os.path.join(self.game, "PNG"), "a.png")
+        make_image(os.path.join(self.game, "Conv"), "b-sdr.png")
+        os.makedirs(os.path.join(self.game, "JXR"))
+
+        result = build_thumbnails(self.dst, size=64)
+
+        self.assertEqual((result.made, result.reused, result.failures), (2, 0, []))
+        with Image.open(os.path.join(self.thumbnails, "PNG", "a.jpg")) as image:
+            self.assertEqual(image.size, (64, 36))
+        index = self.read_index()
+        self.assertEqual(
+            [item["source"] for item in index["items"]],
+            ["PNG/a.png", "Conv/b-sdr.png"],
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.thumbnails, contact_sheet_name(0)))
+        )
+
+    def test_only_changed_images_are_rebuilt(self):
+        make_image(os.path.join(self.game, "PNG"), "a.png")
+        path = make_image(os.path.join(self.game, "PNG"), "b.png")
+        build_thumbnails(self.dst, size=64)
+
+        self.assertEqual(build_thumbnails(self.dst, size=64)[:2], (0, 2))
+
+        make_image(os.path.join(self.game, "PNG"), "b.png", (0, 255, 0))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(build_thumbnails(self.dst, size=64)[:2], (1, 1))
+
+    def test_deleted_images_lose_their_thumbnail(self):
+        make_image(os.path.join(self.game, "PNG"), "a.png")
+        path = make_image(os.path.join(self.game, "PNG"), "b.png")
+        build_thumbnails(self.dst, size=64)
+
+        os.remove(path)
+        build_thumbnails(self.dst, size=64)
+
+        self.assertEqual(os.listdir(os.path.join(self.thumbnails, "PNG")), ["a.jpg"])
+        self.assertEqual(len(self.read_index()["items"]), 1)
+
+    def test_unreadable_images_are_reported(self):
+        make_image(os.path.join(self.game, "PNG"), "a.png")
+        with open(os.path.join(self.game, "PNG", "broken.png"), "wb") as file:
+            file.write(b"not a png")
+
+        result = build_thumbnails(self.dst, size=64)
+
+        self.assertEqual(result.made, 1)
+        self.assertEqual(len(result.failures), 1)
+        self.assertEqual(len(self.read_index()["items"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,137 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from tests import RichTestRunner, unittest
+from journal import JOURNAL_FILENAME, read_journal
+from watch import CaptureWatcher, watch
+
+STUB_CONVERTER = [
+    sys.executable,
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "hdrfix_stub.py"),
+]
+
+
+def touch(folder, name, content=b""):
+    with open(os.path.join(folder, name), "wb") as file:
+        file.write(content)
+
+
+class TestCaptureWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_files_are_ready_once_settled(self):
+        touch(self.folder, "Halo 01_02_2024 10_00_00.png")
+        touch(self.folder, "notes.txt")
+        watcher = CaptureWatcher(self.folder, settle=3)
+
+        self.assertEqual(watcher.poll(now=100), [])
+        self.assertEqual(watcher.poll(now=102), [])
+        ready = watcher.poll(now=103)
+
+        self.assertEqual(
+            [entry.name for entry in ready], ["Halo 01_02_2024 10_00_00.png"]
+        )
+
+    def test_files_being_written_are_delayed(self):
+        touch(self.folder, "Halo 01_02_2024 10_00_00.png", b"a")
+        watcher = CaptureWatcher(self.folder, settle=3)
+        watcher.poll(now=100)
+
+        touch(self.folder, "Halo 01_02_2024 10_00_00.png", b"ab")
+
+        self.assertEqual(watcher.poll(now=103), [])
+        self.assertEqual(len(watcher.poll(now=106)), 1)
+
+
+class TestWatch(unittest.TestCase):
+    def test_new_captures_are_sorted(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            for i in range(3):
+                touch(src, f"Halo Infinite 01_02_2024 10_00_0{i}.png")
+            stop_event = threading.Event()
+            batches = []
+            thread = threading.Thread(
+                target=watch,
+                args=(src, dst, False),
+                kwargs={
+                    "interval": 0.02,
+                    "settle": 0.05,
+                    "stop_event": stop_event,
+                    "on_batch": lambda count, error: batches.append((count, error)),
+                },
+            )
+            thread.start()
+            try:
+                deadline = time.monotonic() + 5
+                while os.listdir(src) and time.monotonic() < deadline:
+                    time.sleep(0.02)
+            finally:
+                stop_event.set()
+                thread.join()
+
+            self.assertEqual(os.listdir(src), [])
+            self.assertEqual(sum(count for count, _ in batches), 3)
+            self.assertEqual(
+                len(os.listdir(os.path.join(dst, "Halo Infinite", "PNG"))), 3
+            )
+
+    def make_captures(self, src):
+        for name in ["Halo 01_02_2024 10_00_00", "Halo 01_02_2024 10_00_01 corrupt"]:
+            touch(src, f"{name}.jxr", b"jxr")
+
+    def test_failures_are_returned_and_batches_journaled(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            self.make_captures(src)
+            stop_event = threading.Event()
+
+            failures = watch(
+                src,
+                dst,
+                True,
+                interval=0.01,
+                settle=0,
+                stop_event=stop_event,
+                converter=STUB_CONVERTER,
+                on_batch=lambda count, error: stop_event.set(),
+            )
+
+            self.assertEqual(len(failures), 1)
+            self.assertIn("corrupt", failures[0].src_path)
+            records = read_journal(os.path.join(dst, JOURNAL_FILENAME))
+            self.assertEqual(records[0]["op"], "begin")
+            ends = [record for record in records if record["op"] == "end"]
+            self.assertEqual([record["status"] for record in ends], ["done"])
+
+    def test_ctrl_c_stops_the_watch(self):
+        with tempfile.TemporaryDirectory() as src, tempfile.TemporaryDirectory() as dst:
+            self.make_captures(src)
+
+            def interrupt(count, error):
+                raise KeyboardInterrupt
+
+            failures = watch(
+                src,
+                dst,
+                True,
+                interval=0.01,
+                settle=0,
+                converter=STUB_CONVERTER,
+                on_batch=interrupt,
+            )
+
+            self.assertIsInstance(failures, list)
+            self.assertEqual(os.listdir(src), [])
+            records = read_journal(os.path.join(dst, JOURNAL_FILENAME))
+            self.assertIn("end", [record["op"] for record in records])
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=RichTestRunner, verbosity=2)
@@ -0,0 +1,339 @@
+import json
+import os
+from collections import namedtuple
+from importlib.util import find_spec
+
+THUMBNAILS_FOLDER = ".thumbnails"
+THUMBNAILS_INDEX = "index.json"
+CONTACT_SHEET_PREFIX = "contact_sheet_"
+THUMBNAILS_VERSION = 1
+THUMBNAIL_SIZE = 320
+CONTACT_SHEET_CELL = 128
+CONTACT_SHEET_COLUMNS = 10
+CONTACT_SHEET_ROWS = 10
+THUMBNAIL_SUBFOLDERS = ("PNG", "Conv")
+
+ThumbnailResult = namedtuple("ThumbnailResult", ["made", "reused", "failures"])
+
+
+def thumbnails_available():
+    """
+    Returns whether Pillow is installed, the thumbnails cannot be built without it.
+
+    Pillow is only imported by the functions building the images, so the sorts without thumbnails
+    start faster.
+
+    Returns:
+        bool: True if the thumbnails can be built.
+    """
+    return find_spec("PIL") is not None
+
+
+def make_thumbnail(src_path, dst_path, size=THUMBNAIL_SIZE):
+    """
+    Writes a JPEG thumbnail of an image, run in the worker processes.
+
+    Args:
+        src_path (str): The path of the PNG image.
+        dst_path (str): The path of the thumbnail.
+        size (int, optional): The maximum width and height of the thumbnail. Defaults to 320.
+
+    Returns:
+        str or None: The error message if the image could not be read, otherwise `None`.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(src_path) as image:
+            image.draft("RGB", (size, size))
+            image.thumbnail((size, size), reducing_gap=2.0)
+            tmp_path = dst_path + ".tmp"
+            image.convert("RGB").save(tmp_path, "JPEG", quality=85)
+        os.replace(tmp_path, dst_path)
+    except (OSError, ValueError) as error:
+        return str(error)
+    return None
+
+
+def thumbnail_sources(game_folder):
+    """
+    Yields the images of a game folder that get a thumbnail, including those in `YYYY/MM` subfolders.
+
+    Args:
+        game_folder (str): The path of the game folder.
+
+    Yields:
+        tuple: The path of the image relative to the game folder, and its `os.stat_result`.
+    """
+    for subfolder in THUMBNAIL_SUBFOLDERS:
+        folder = os.path.join(game_folder, subfolder)
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+            for filename in sorted(files):
+                if filename.lower().endswith(".png"):
+                    path = os.path.join(root, filename)
+                    source = os.path.relpath(path, game_folder).replace(os.sep, "/")
+                    yield source, os.stat(path)
+
+
+def thumbnail_path(game_folder, source):
+    """
+    Returns the path of the thumbnail of an image.
+
+    Args:
+        game_folder (str): The path of the game folder.
+        source (str): The path of the image relative to the game folder.
+
+    Returns:
+        str: The path of the JPEG thumbnail in the `.thumbnails` folder of the game.
+    """
+    *folders, filename = source.split("/")
+    return os.path.join(
+        game_folder,
+        THUMBNAILS_FOLDER,
+        *folders,
+        os.path.splitext(filename)[0] + ".jpg",
+    )
+
+
+def load_index(game_folder, size):
+    """
+    Loads the thumbnail index of a game folder.
+
+    Args:
+        game_folder (str): The path of the game folder.
+        size (int): The thumbnail size, an index built with another size is ignored.
+
+    Returns:
+        dict: The `{"mtime_ns", "size"}` of every image with a thumbnail, by relative path.
+    """
+    path = os.path.join(game_folder, THUMBNAILS_FOLDER, THUMBNAILS_INDEX)
+    try:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != THUMBNAILS_VERSION or data.get("size") != size:
+        return {}
+    return {
+        item["source"]: {"mtime_ns": item["mtime_ns"], "size": item["bytes"]}
+        for item in data.get("items", [])
+    }
+
+
+def contact_sheet_name(page):
+    """
+    Returns the filename of a page of contact sheet.
+
+    Args:
+        page (int): The number of the page, starting at 0.
+
+    Returns:
+        str: The filename, in the `.thumbnails` folder of the game.
+    """
+    return f"{CONTACT_SHEET_PREFIX}{page + 1:03d}.jpg"
+
+
+def save_index(game_folder, size, items):
+    """
+    Writes the thumbnail index of a game folder and its contact sheets.
+
+    The contact sheets are grids of small thumbnails, in the order of `items`, so a viewer can show
+    a whole game with a few small images. The index gives the page and cell of every image.
+
+    Args:
+        game_folder (str): The path of the game folder.
+        size (int): The thumbnail size.
+        items (list): The `(source, stat)` of every image with a thumbnail.
+    """
+    from PIL import Image
+
+    folder = os.path.join(game_folder, THUMBNAILS_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    per_page = CONTACT_SHEET_COLUMNS * CONTACT_SHEET_ROWS
+    pages = -(-len(items) // per_page)
+    index_items = []
+
+    for page in range(pages):
+        page_items = items[page * per_page : (page + 1) * per_page]
+        rows = -(-len(page_items) // CONTACT_SHEET_COLUMNS)
+        sheet = Image.new(
+            "RGB",
+            (CONTACT_SHEET_COLUMNS * CONTACT_SHEET_CELL, rows * CONTACT_SHEET_CELL),
+        )
+        for cell, (source, stat) in enumerate(page_items):
+            path = thumbnail_path(game_folder, source)
+            with Image.open(path) as thumbnail:
+                thumbnail.draft("RGB", (CONTACT_SHEET_CELL, CONTACT_SHEET_CELL))
+                thumbnail.thumbnail((CONTACT_SHEET_CELL, CONTACT_SHEET_CELL))
+                x = (cell % CONTACT_SHEET_COLUMNS) * CONTACT_SHEET_CELL
+                y = (cell // CONTACT_SHEET_COLUMNS) * CONTACT_SHEET_CELL
+                sheet.paste(
+                    thumbnail,
+                    (
+                        x + (CONTACT_SHEET_CELL - thumbnail.width) // 2,
+                        y + (CONTACT_SHEET_CELL - thumbnail.height) // 2,
+                    ),
+                )
+            index_items.append(
+                {
+                    "source": source,
+                    "thumbnail": os.path.relpath(path, folder).replace(os.sep, "/"),
+                    "mtime_ns": stat.st_mtime_ns,
+                    "bytes": stat.st_size,
+                    "page": page,
+                    "cell": cell,
+                }
+            )
+        sheet.save(os.path.join(folder, contact_sheet_name(page)), "JPEG", quality=80)
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.startswith(CONTACT_SHEET_PREFIX) and entry.name not in {
+                contact_sheet_name(page) for page in range(pages)
+            }:
+                os.remove(entry.path)
+
+    tmp_path = os.path.join(folder, THUMBNAILS_INDEX + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "version": THUMBNAILS_VERSION,
+                "size": size,
+                "cell": CONTACT_SHEET_CELL,
+                "columns": CONTACT_SHEET_COLUMNS,
+                "contact_sheets": [contact_sheet_name(page) for page in range(pages)],
+                "items": index_items,
+            },
+            file,
+            ensure_ascii=False,
+            indent=1,
+        )
+    os.replace(tmp_path, os.path.join(folder, THUMBNAILS_INDEX))
+
+
+def game_folders(dst_folder, game_names=None):
+    """
+    Returns the game folders of a sorted folder.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        game_names (iterable, optional): Only these games, every game if `None`.
+
+    Returns:
+        list: The paths of the game folders, sorted by name.
+    """
+    if game_names is None:
+        with os.scandir(dst_folder) as entries:
+            game_names = [
+                entry.name
+                for entry in entries
+                if entry.is_dir() and not entry.name.startswith(".")
+            ]
+    return [
+        os.path.join(dst_folder, game_name)
+        for game_name in sorted(set(game_names))
+        if any(
+            os.path.isdir(os.path.join(dst_folder, game_name, subfolder))
+            for subfolder in THUMBNAIL_SUBFOLDERS
+        )
+    ]
+
+
+def build_thumbnails(
+    dst_folder,
+    jobs=1,
+    size=THUMBNAIL_SIZE,
+    game_names=None,
+    update_progress=None,
+):
+    """
+    Builds the missing or out of date thumbnails and contact sheets of a sorted folder.
+
+    Every game folder gets a `.thumbnails` folder holding a JPEG thumbnail of each PNG and converted
+    PNG, a contact sheet and an index. An image is only decoded again when its modification time or
+    size changed since its thumbnail was made, and the contact sheet of a game is only rebuilt when
+    one of its thumbnails changed. The images are decoded on a pool of `jobs` processes.
+
+    Args:
+        dst_folder (str): The path of the sorted folder.
+        jobs (int, optional): The number of images decoded at the same time. Defaults to 1.
+        size (int, optional): The maximum width and height of the thumbnails. Defaults to 320.
+        game_names (iterable, optional): Only the folders of these games, every game if `None`.
+        update_progress (function, optional): Called with `(completed, total)` thumbnails.
+
+    Returns:
+        ThumbnailResult: The number of made and reused thumbnails, and the `(path, message)` of the images that could not be read.
+
+    Raises:
+        ImportError: If Pillow is not installed.
+    """
+    if not thumbnails_available():
+        raise ImportError("Pillow est nécessaire pour créer les miniatures")
+
+    games = {}
+    tasks = []
+    reused = 0
+    for game_folder in game_folders(dst_folder, game_names):
+        index = load_index(game_folder, size)
+        items = list(thumbnail_sources(game_folder))
+        stale = []
+        for source, stat in items:
+            known = index.get(source)
+            if (
+                known
+                and known["mtime_ns"] == stat.st_mtime_ns
+                and known["size"] == stat.st_size
+                and os.path.exists(thumbnail_path(game_folder, source))
+            ):
+                reused += 1
+            else:
+                stale.append(source)
+        removed = set(index) - {source for source, _ in items}
+        for source in removed:
+            try:
+                os.remove(thumbnail_path(game_folder, source))
+            except OSError:
+                pass
+        if stale or removed:
+            games[game_folder] = items
+            for source in stale:
+                dst_path = thumbnail_path(game_folder, source)
+                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                tasks.append((game_folder, source, dst_path))
+
+    failures = []
+    failed = set()
+    if tasks:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = [
+                executor.submit(
+                    make_thumbnail,
+                    os.path.join(game_folder, *source.split("/")),
+                    dst_path,
+                    size,
+                )
+                for game_folder, source, dst_path in tasks
+            ]
+            for completed, ((game_folder, source, _), future) in enumerate(
+                zip(tasks, futures), start=1
+            ):
+                error = future.result()
+                if error is not None:
+                    failures.append(
+                        (os.path.join(game_folder, *source.split("/")), error)
+                    )
+                    failed.add((game_folder, source))
+                if update_progress:
+                    update_progress(completed, len(tasks))
+
+    for game_folder, items in games.items():
+        save_index(
+            game_folder,
+            size,
+            [item for item in items if (game_folder, item[0]) not in failed],
+        )
+
+    return ThumbnailResult(len(tasks) - len(failures), reused, failures)
@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import deque
+
+from conversion import open_pool
+from journal import Journal
+from registry import GameRegistry
+from scanner import scan_files
+from sort import build_scanner, sort_files
+from thumbnails import build_thumbnails
+
+WATCH_HISTORY_SIZE = 2000
+
+
+class CaptureWatcher:
+    """
+    Polls a folder and reports the captures that are done being written.
+
+    A capture is ready once its size and modification time did not change for `settle` seconds,
+    so files still being written by the Game Bar are left alone. Only the PNG and JXR captures
+    are reported, and only `os.scandir` is used, which works on every OS without any notification API.
+
+    Args:
+        src_folder (str): The path of the watched folder.
+        settle (float, optional): The number of seconds a file must stay unchanged. Defaults to 3.
+        scan (function, optional): Returns a new iterator over the files to watch, see `build_scanner`.
+            Only the top level of the folder is watched if `None`.
+    """
+
+    def __init__(self, src_folder, settle=3.0, scan=None):
+        self.src_folder = src_folder
+        self.settle = settle
+        self.scan = scan or (lambda: scan_files(src_folder))
+        self._seen = {}
+
+    def poll(self, now=None):
+        """
+        Takes a snapshot of the folder and returns the captures ready to be sorted.
+
+        Args:
+            now (float, optional): The current time, defaults to `time.monotonic()`.
+
+        Returns:
+            list: The `FileRecord` of the ready captures.
+        """
+        now = time.monotonic() if now is None else now
+        seen = {}
+        ready = []
+
+        for entry in self.scan():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self._seen.get(entry.path)
+            since = previous[1] if previous and previous[0] == signature else now
+            seen[entry.path] = (signature, since)
+            if now - since >= self.settle:
+                ready.append(entry)
+
+        self._seen = seen
+        return ready
+
+
+def watch(
+    src_folder,
+    dst_folder,
+    do_convert,
+    jobs=1,
+    interval=2.0,
+    settle=3.0,
+    stop_event=None,
+    on_batch=None,
+    converter=None,
+    use_registry=True,
+    use_conversion_cache=True,
+    cache_hash=False,
+    use_journal=True,
+    update_conversion=None,
+    **sort_options,
+):
+    """
+    Sorts the captures of the source folder as they are written, until `stop_event` is set.
+
+    The conversion pool, the game registry and the names of the recently sorted captures are
+    kept between two batches, so a new capture is sorted within `interval + settle` seconds.
+    Every batch is recorded between its own begin and end records in the journal. Once stopped,
+    the remaining conversions are waited for, then the thumbnails are built. Ctrl+C stops the
+    watch too, but drops the conversions not started yet, which the next sort resumes.
+
+    Args:
+        src_folder (str): The path of the watched folder.
+        dst_folder (str): The path of the destination folder.
+        do_convert (bool): Whether to convert the JXR images to PNG.
+        jobs (int, optional): The number of conversions to run at the same time. Defaults to 1.
+        interval (float, optional): The delay between two polls, in seconds. Defaults to 2.
+        settle (float, optional): The number of seconds a file must stay unchanged. Defaults to 3.
+        stop_event (threading.Event, optional): Stops the watch when set.
+        on_batch (function, optional): Called with the number of sorted files and the error of every batch.
+        converter (list or ProcessConverter or WorkerConverter, optional): The converter, or the
+            converter command. Defaults to `hdrfix.exe`.
+        use_registry (bool, optional): Whether to reuse and update the games learned by the previous runs. Defaults to True.
+        use_conversion_cache (bool, optional): Whether to skip the conversions that are still up to date. Defaults to True.
+        cache_hash (bool, optional): Whether the conversion cache also compares the content of the JXR files. Defaults to False.
+        use_journal (bool, optional): Whether to record the moves and conversions, so they can be undone. Defaults to True.
+        update_conversion (function, optional): Called with `(completed, submitted)` while the last conversions are waited for.
+        **sort_options: The other keyword arguments of `sort_files`.
+
+    Returns:
+        list: The `ConversionFailure` of every conversion that did not succeed.
+    """
+    stop_event = stop_event or threading.Event()
+    watcher = CaptureWatcher(
+        src_folder,
+        settle,
+        build_scanner(
+            src_folder,
+            dst_folder,
+            sort_options.get("include"),
+            sort_options.get("exclude"),
+            sort_options.get("max_depth", 0),
+        ),
+    )
+    journal = Journal.open(dst_folder) if use_journal else None
+    pool = (
+        open_pool(
+            dst_folder,
+            jobs,
+            converter,
+            use_conversion_cache,
+            cache_hash,
+            journal=journal,
+        )
+        if do_convert
+        else None
+    )
+    registry = GameRegistry.load(dst_folder) if use_registry else None
+    history = deque(maxlen=WATCH_HISTORY_SIZE)
+
+    def sort_batch(ready):
+        error = None
+        status = "cancelled"
+        if journal is not None:
+            journal.begin(src_folder, dst_folder)
+        try:
+            sort_files(
+                src_folder,
+                dst_folder,
+                do_convert,
+                lambda *_: None,
+                file_list=ready,
+                pool=pool,
+                registry=registry,
+                extra_names=list(history),
+                use_registry=use_registry,
+                use_journal=use_journal,
+                journal=journal,
+                **sort_options,
+            )
+            status = "done"
+        except OSError as exception:
+            error = exception
+            status = "failed"
+        finally:
+            if journal is not None:
+                journal.end(status)
+        history.extend(entry.name for entry in ready)
+        if on_batch:
+            on_batch(len(ready), error)
+
+    interrupted = False
+    try:
+        try:
+            while not stop_event.is_set():
+                ready = watcher.poll()
+                if ready:
+                    sort_batch(ready)
+                stop_event.wait(interval)
+        except KeyboardInterrupt:
+            interrupted = True
+        if pool is None:
+            failures = []
+        elif interrupted:
+            failures = pool.cancel()
+        else:
+            failures = pool.join(update_conversion)
+            if sort_options.get("thumbnails"):
+                result = build_thumbnails(dst_folder, jobs)
+                if sort_options.get("on_thumbnails"):
+                    sort_options["on_thumbnails"](result)
+    except BaseException:
+        if pool is not None:
+            pool.cancel()
+        raise
+    finally:
+        if journal is not None:
+            journal.close()
+
+    return failures